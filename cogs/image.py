@@ -9,8 +9,9 @@ import aiohttp
 # `pip install -U Pillow`
 from PIL import Image, ImageDraw
 
-# partial lets us prepare a new function with args for run_in_executor
-from functools import partial
+# partial lets us prepare a new function with args for run_in_executor, and
+# lru_cache lets us keep the prepared overlay templates around between requests.
+from functools import lru_cache, partial
 
 # BytesIO allows us to convert bytes into a file-like byte stream.
 from io import BytesIO
@@ -18,6 +19,62 @@ from io import BytesIO
 # this just allows for nice function annotation, and stops my IDE from complaining.
 from typing import Union
 
+# this gives us smaller copies of our images, once they have been made.
+from neko3 import asset_optimizer
+
+# the size of the image we send back. Discord's CDN will scale avatars to any power
+# of two from 16 to 4096 for us, so we ask for exactly this size.
+FRAME_SIZE = 512
+
+# the overlay we draw over the top of each avatar.
+OVERLAY_PATH = 'ST_design.png'
+
+
+@lru_cache(maxsize=4)
+def get_overlay(size: tuple) -> Image.Image:
+    # decoding and resizing the overlay is the slowest part of making a frame, and it
+    # is the same every time, so we only do it once per size and keep the result.
+    with Image.open(asset_optimizer.resolve(OVERLAY_PATH)) as st:
+        return st.convert("RGBA").resize(size, Image.LANCZOS)
+
+
+@lru_cache(maxsize=4)
+def get_circle_mask(size: tuple) -> Image.Image:
+    # this is the mask image we will be using to create the circle cutout
+    # effect on the avatar.
+    mask = Image.new("L", size, 0)
+
+    # ImageDraw lets us draw on the image, in this instance, we will be
+    # using it to draw a white circle on the mask image.
+    mask_draw = ImageDraw.Draw(mask)
+
+    # draw the white circle from 0, 0 to the bottom right corner of the image
+    mask_draw.ellipse([(0, 0), size], fill=255)
+    return mask
+
+
+def load_avatar(avatar_bytes: bytes, size: tuple) -> Image.Image:
+    # we must use BytesIO to load the image here as PIL expects a stream instead of
+    # just raw bytes.
+    im = Image.open(BytesIO(avatar_bytes))
+
+    # for JPEGs, this lets PIL decode straight to a smaller size, which is much faster
+    # than decoding the whole thing and shrinking it afterwards. This does nothing for
+    # other formats.
+    im.draft("RGB", size)
+
+    # this ensures that the user's avatar lacks an alpha channel, as we're
+    # going to be substituting our own here.
+    im = im.convert("RGB")
+
+    if im.size != size:
+        # the CDN should have sent the right size already, but it may not have if the
+        # avatar was smaller than we asked for.
+        im = im.resize(size, Image.LANCZOS)
+
+    return im
+
+
 class ImageCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
 
@@ -27,11 +84,15 @@ class ImageCog(commands.Cog):
         # create a ClientSession to be used for downloading avatars
         self.session = aiohttp.ClientSession(loop=bot.loop)
 
+        # make a smaller copy of the overlay in the background for next time.
+        asset_optimizer.optimize_in_background([OVERLAY_PATH])
+
 
     async def get_avatar(self, user: Union[discord.User, discord.Member]) -> bytes:
 
-        # generally an avatar will be 1024x1024, but we shouldn't rely on this
-        avatar_url = user.avatar_url_as(format="png")
+        # ask the CDN for the avatar at the size we need, so we don't have to download a
+        # bigger image than we need and then shrink it ourselves.
+        avatar_url = user.avatar_url_as(format="png", size=FRAME_SIZE)
 
         async with self.session.get(str(avatar_url)) as response:
             # this gives us our response object, and now we can read the bytes from it.
@@ -41,39 +102,21 @@ class ImageCog(commands.Cog):
 
     @staticmethod
     def processing(avatar_bytes: bytes, colour: tuple) -> BytesIO:
+        size = (FRAME_SIZE, FRAME_SIZE)
 
-        # we must use BytesIO to load the image here as PIL expects a stream instead of
-        # just raw bytes.
-        with Image.open(BytesIO(avatar_bytes)) as im:
+        with load_avatar(avatar_bytes, size) as rgb_avatar:
 
-            # this creates a new image the same size as the user's avatar, with the
+            # this creates a new image the same size as the frame, with the
             # background colour being the user's colour.
-            with Image.new("RGB", im.size, colour) as background:
-
-                # this ensures that the user's avatar lacks an alpha channel, as we're
-                # going to be substituting our own here.
-                rgb_avatar = im.convert("RGB")
-
-                # this is the mask image we will be using to create the circle cutout
-                # effect on the avatar.
-                with Image.new("L", im.size, 0) as mask:
-
-                    # ImageDraw lets us draw on the image, in this instance, we will be
-                    # using it to draw a white circle on the mask image.
-                    mask_draw = ImageDraw.Draw(mask)
-
-                    # draw the white circle from 0, 0 to the bottom right corner of the image
-                    mask_draw.ellipse([(0, 0), im.size], fill=255)
+            with Image.new("RGB", size, colour) as background:
 
-                    # paste the alpha-less avatar on the background using the new circle mask
-                    # we just created.
-                    background.paste(rgb_avatar, (0, 0), mask=mask)
-                    with Image.open('ST_design.png') as st:
-                        framest=st.resize(im.size,Image.ANTIALIAS)
-                        background.paste(framest,(0,0),framest)
+                # paste the alpha-less avatar on the background using the circle mask,
+                # then draw the overlay on top. Both are only made once per size.
+                background.paste(rgb_avatar, (0, 0), mask=get_circle_mask(size))
+                overlay = get_overlay(size)
+                background.paste(overlay, (0, 0), overlay)
 
                 # prepare the stream to save this image into
-                
                 final_buffer = BytesIO()
                 # save into the stream, using png format.
                 background.save(final_buffer, "png")
@@ -108,8 +151,10 @@ class ImageCog(commands.Cog):
             fn = partial(self.processing, avatar_bytes, member_colour)
 
             # this runs our processing in an executor, stopping it from blocking the thread loop.
+            # we use the bot's own thread pool if it has one, otherwise the default executor.
             # as we already seeked back the buffer in the other thread, we're good to go
-            final_buffer = await self.bot.loop.run_in_executor(None, fn)
+            executor = getattr(self.bot, "thread_pool", None)
+            final_buffer = await self.bot.loop.run_in_executor(executor, fn)
 
             # prepare the file
             file = discord.File(filename="circle.png", fp=final_buffer)
@@ -3,11 +3,13 @@ import random
 import asyncio
 import discord
 from discord.ext import commands, tasks
+from neko3 import statistics
 
 class Prescence(commands.Cog):
 
     def __init__(self, bot):
         self.bot = bot
+        self.presence_name = None
         self.prescence_default.start()
         self.ctfu_rgblighting.start()
 
@@ -16,7 +18,17 @@ class Prescence(commands.Cog):
 
     @tasks.loop(seconds=60.0)
     async def prescence_default(self):
-    	await self.bot.change_presence(activity=discord.Activity(type=discord.ActivityType.listening, name=f'{len(self.bot.users)} users.'))
+        # Only bother Discord when the number we show has actually changed.
+        name = f'{statistics.get_aggregator(self.bot).snapshot().users} users.'
+        if name != self.presence_name:
+            await self.bot.change_presence(activity=discord.Activity(type=discord.ActivityType.listening, name=name))
+            self.presence_name = name
+
+    @commands.Cog.listener("on_ready")
+    @commands.Cog.listener("on_resumed")
+    async def forget_presence(self):
+        # Discord may have dropped our presence while we were disconnected, so set it again next time.
+        self.presence_name = None
 
     @tasks.loop(seconds=600.0)
     async def ctfu_rgblighting(self):
@@ -12,13 +12,23 @@ from PIL import Image, ImageDraw
 # partial lets us prepare a new function with args for run_in_executor
 from functools import partial
 
+# this lets us make sure only one request downloads the frame.
+import asyncio
+
 # BytesIO allows us to convert bytes into a file-like byte stream.
 from io import BytesIO
 
 # this just allows for nice function annotation, and stops my IDE from complaining.
 from typing import Union
 
-class TestImageCog:
+# the size of the image we send back. Discord's CDN will scale avatars to any power
+# of two from 16 to 4096 for us, so we ask for exactly this size.
+FRAME_SIZE = 1024
+
+FRAME_URL = 'https://cdn.discordapp.com/attachments/490068620903448577/491394502053855268/ST_design.png'
+
+
+class TestImageCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
 
         # we need to include a reference to the bot here so we can access its loop later.
@@ -27,45 +37,73 @@ class TestImageCog:
         # create a ClientSession to be used for downloading avatars
         self.session = aiohttp.ClientSession(loop=bot.loop)
 
+        # the frame, decoded and resized to FRAME_SIZE. The frame never changes, so we
+        # only download and prepare it the first time someone needs it.
+        self.frame = None
+        self.frame_lock = asyncio.Lock()
+
+    def cog_unload(self):
+        self.bot.loop.create_task(self.session.close())
 
     async def get_avatar(self, user: Union[discord.User, discord.Member]) -> bytes:
 
-        # generally an avatar will be 1024x1024, but we shouldn't rely on this
-        avatar_url = user.avatar_url_as(format="png")
+        # ask the CDN for the avatar at the size we need, so we don't have to download a
+        # bigger image than we need and then shrink it ourselves.
+        avatar_url = user.avatar_url_as(format="png", size=FRAME_SIZE)
 
-        async with self.session.get(avatar_url) as response:
+        async with self.session.get(str(avatar_url)) as response:
             # this gives us our response object, and now we can read the bytes from it.
             avatar_bytes = await response.read()
 
         return avatar_bytes
-    async def get_frame(self) -> bytes:
-        frame_url = 'https://cdn.discordapp.com/attachments/490068620903448577/491394502053855268/ST_design.png'
-        async with self.session.get(frame_url) as response:
-            frame_bytes = await response.read()
-        return frame_bytes
+
+    async def get_frame(self) -> Image.Image:
+        async with self.frame_lock:
+            if self.frame is None:
+                async with self.session.get(FRAME_URL) as response:
+                    response.raise_for_status()
+                    frame_bytes = await response.read()
+
+                self.frame = await self.bot.loop.run_in_executor(
+                    getattr(self.bot, "thread_pool", None), partial(self.prepare_frame, frame_bytes)
+                )
+
+        return self.frame
+
+    @staticmethod
+    def prepare_frame(frame_bytes: bytes) -> Image.Image:
+        with Image.open(BytesIO(frame_bytes)) as frame:
+            return frame.convert("RGBA").resize((FRAME_SIZE, FRAME_SIZE), Image.LANCZOS)
 
     @staticmethod
-    def processing(avatar_bytes: bytes) -> BytesIO:
+    def processing(avatar_bytes: bytes, frame: Image.Image) -> BytesIO:
+        size = (FRAME_SIZE, FRAME_SIZE)
+
         # we must use BytesIO to load the image here as PIL expects a stream instead of
         # just raw bytes.
         with Image.open(BytesIO(avatar_bytes)) as im:
-            im.resize((950, 950))
 
-            # this creates a new image the same size as the user's avatar, with the
-            # background colour being the user's colour.
-            with Image.open(bytesIO(frame_bytes)) as frame:
-                frame.resize((1024, 1024))
+            # for JPEGs, this lets PIL decode straight to a smaller size. This does
+            # nothing for other formats.
+            im.draft("RGB", size)
 
-                # this ensures that the user's avatar lacks an alpha channel, as we're
-                # going to be substituting our own here.
-                rgb_avatar = im.convert("RGB")
-                rgb_avatar.paste(frame, (0, 0), frame)
+            # this ensures that the user's avatar lacks an alpha channel, as we're
+            # going to be substituting our own here.
+            rgb_avatar = im.convert("RGB")
 
-                # prepare the stream to save this image into
-                final_buffer = BytesIO()
+            if rgb_avatar.size != size:
+                # the CDN should have sent the right size already, but it may not have if
+                # the avatar was smaller than we asked for.
+                rgb_avatar = rgb_avatar.resize(size, Image.LANCZOS)
 
-                # save into the stream, using png format.
-                frame.save(final_buffer, "png")
+            # draw the frame on top of the avatar.
+            rgb_avatar.paste(frame, (0, 0), frame)
+
+            # prepare the stream to save this image into
+            final_buffer = BytesIO()
+
+            # save into the stream, using png format.
+            rgb_avatar.save(final_buffer, "png")
 
         # seek back to the start of the stream
         final_buffer.seek(0)
@@ -85,14 +123,16 @@ class TestImageCog:
 
             # grab the user's avatar as bytes
             avatar_bytes = await self.get_avatar(member)
-
+            frame = await self.get_frame()
 
             # create partial function so we don't have to stack the args in run_in_executor
-            fn = partial(self.processing, avatar_bytes)
+            fn = partial(self.processing, avatar_bytes, frame)
 
             # this runs our processing in an executor, stopping it from blocking the thread loop.
+            # we use the bot's own thread pool if it has one, otherwise the default executor.
             # as we already seeked back the buffer in the other thread, we're good to go
-            final_buffer = await self.bot.loop.run_in_executor(None, fn)
+            executor = getattr(self.bot, "thread_pool", None)
+            final_buffer = await self.bot.loop.run_in_executor(executor, fn)
 
             # prepare the file
             file = discord.File(filename="frame.png", fp=final_buffer)
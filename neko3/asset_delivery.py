@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Nekozilla is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Nekozilla is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Nekozilla.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Sends bundled image files without uploading the same bytes over and over.
+
+The first time a file is sent, it is uploaded as an attachment, and the CDN
+URL Discord gives back is remembered against the SHA-256 hash of the file.
+Later sends just reference that URL in an embed. If the URL stops resolving,
+the file is uploaded again.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import time
+import typing
+import urllib.parse
+
+import aiofiles
+import aiohttp
+import discord
+
+from neko3 import files
+from neko3 import logging_utils
+from neko3 import resources
+from neko3 import singleton
+
+__all__ = ("AssetDelivery",)
+
+# Where remembered URLs are persisted between restarts.
+URLS_FILE = "asset_urls.json"
+# How long a URL is trusted for before we check it still resolves, in seconds.
+VERIFY_INTERVAL = 60 * 60
+
+
+class AssetDelivery(logging_utils.Loggable, metaclass=singleton.SingletonMeta):
+    """
+    Remembers where each file we have sent lives on Discord's CDN.
+
+    This is a singleton, so every cog shares the same URLs.
+    """
+
+    def __init__(self):
+        # Maps a SHA-256 hex digest to the attachment URL and when we last knew it worked.
+        self.urls: typing.Optional[typing.Dict[str, typing.List]] = None
+        # Maps (path, mtime, size) to the SHA-256 hex digest, so files are only hashed once.
+        self._digests = {}
+        self._lock = asyncio.Lock()
+
+    async def _load_urls(self):
+        if self.urls is None:
+            try:
+                async with aiofiles.open(files.in_cache_dir(URLS_FILE)) as fp:
+                    self.urls = json.loads(await fp.read())
+            except (OSError, ValueError):
+                self.urls = {}
+
+    async def _save_urls(self):
+        path = files.in_cache_dir(URLS_FILE)
+        async with aiofiles.open(path + ".tmp", "w") as fp:
+            await fp.write(json.dumps(self.urls))
+        os.replace(path + ".tmp", path)
+
+    async def _digest(self, path) -> str:
+        stat = os.stat(path)
+        key = path, stat.st_mtime_ns, stat.st_size
+        if key not in self._digests:
+            self._digests[key] = hashlib.sha256(resources.registry.get(path).data).hexdigest()
+        return self._digests[key]
+
+    @staticmethod
+    def _has_expired(url) -> bool:
+        # Signed CDN URLs carry their expiry time as a hex timestamp in the "ex" parameter.
+        expiry = urllib.parse.parse_qs(urllib.parse.urlparse(url).query).get("ex")
+        try:
+            return expiry is not None and int(expiry[0], 16) <= time.time()
+        except ValueError:
+            return False
+
+    async def _still_resolves(self, url) -> bool:
+        if self._has_expired(url):
+            return False
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.head(url) as resp:
+                    return resp.status == 200
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            return False
+
+    async def _get_url(self, digest) -> typing.Optional[str]:
+        entry = self.urls.get(digest)
+        if entry is None:
+            return None
+
+        url, verified_at = entry
+        if verified_at + VERIFY_INTERVAL > time.time():
+            return url
+
+        if await self._still_resolves(url):
+            entry[1] = time.time()
+            return url
+
+        self.logger.info("%s no longer resolves, so will upload it again", url)
+        del self.urls[digest]
+        return None
+
+    async def send(self, destination: discord.abc.Messageable, path, *, file_name=None, embed=None, **kwargs):
+        """
+        Sends the file at the given path as the image in an embed.
+
+        :param destination: where to send the file.
+        :param path: the path of the file to send.
+        :param file_name: the name to upload the file with. Defaults to the
+            name of the file at the path.
+        :param embed: the embed to put the image in. Defaults to a new empty
+            embed.
+        :param kwargs: any other arguments to pass to ``send``.
+        :return: the sent message.
+        """
+        file_name = file_name or os.path.basename(path)
+        embed = embed or discord.Embed()
+
+        async with self._lock:
+            await self._load_urls()
+            digest = await self._digest(path)
+            url = await self._get_url(digest)
+
+        if url is not None:
+            embed.set_image(url=url)
+            return await destination.send(embed=embed, **kwargs)
+
+        file = discord.File(resources.registry.get(path).open(), file_name)
+
+        embed.set_image(url=f"attachment://{file_name}")
+        message = await destination.send(file=file, embed=embed, **kwargs)
+
+        if message.attachments:
+            async with self._lock:
+                self.urls[digest] = [message.attachments[0].url, time.time()]
+                await self._save_urls()
+
+        return message
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Nekozilla is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Nekozilla is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Nekozilla.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Shrinks bundled images before we send or load them.
+
+Each image is scaled down to fit within the largest size Discord will
+usefully display, then re-encoded a few different ways, keeping whichever
+is smallest. Lossless images are only ever re-encoded losslessly. Results
+are stored in the cache directory, named after the SHA-256 hash of the
+source, so this only does any real work once per image.
+
+Features call ``resolve`` to get the path of the optimized variant of a
+file, which is the original path until ``optimize_all`` has processed it.
+
+To optimize every bundled asset ahead of time, run::
+
+    python -m neko3.asset_optimizer
+"""
+import asyncio
+import functools
+import hashlib
+import io
+import logging
+import os
+import threading
+import typing
+
+from PIL import Image
+
+from neko3 import files
+
+__all__ = ("resolve", "optimize", "optimize_all", "optimize_in_background", "bundled_assets")
+
+# Neither side of an optimized image will be larger than this, in pixels.
+MAX_DIMENSION = 1024
+# Quality used when re-encoding lossy images.
+JPEG_QUALITY = 85
+# Bump this if the encoding settings change, so old variants are ignored.
+OPTIMIZER_VERSION = 1
+
+_logger = logging.getLogger(__name__)
+
+# Maps (source path, mtime, size) to the path of the variant to use instead.
+_resolved: typing.Dict[typing.Tuple[str, int, int], str] = {}
+_lock = threading.Lock()
+
+
+def _key(path):
+    stat = os.stat(path)
+    return os.path.abspath(path), stat.st_mtime_ns, stat.st_size
+
+
+def resolve(path) -> str:
+    """
+    Gets the path of the optimized variant of the given file, if it has been
+    made, or the path itself otherwise. This does no IO beyond a stat.
+    """
+    try:
+        return _resolved.get(_key(path), path)
+    except OSError:
+        return path
+
+
+def _encodings(img: Image.Image, lossless: bool) -> typing.Iterator[typing.Tuple[str, bytes]]:
+    def encode(fmt, **kwargs):
+        with io.BytesIO() as fp:
+            img.save(fp, fmt, **kwargs)
+            return fp.getvalue()
+
+    yield ".png", encode("PNG", optimize=True)
+
+    if not lossless and img.mode in ("RGB", "L"):
+        yield ".jpg", encode("JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+
+
+def optimize(path, *, max_dimension=MAX_DIMENSION) -> str:
+    """
+    Makes the optimized variant of the given image if it does not already
+    exist, and returns its path. If nothing we can produce is smaller than
+    the original, the original path is returned instead.
+
+    :param path: the image to optimize.
+    :param max_dimension: the largest either side of the result may be.
+    """
+    key = _key(path)
+
+    with open(path, "rb") as fp:
+        data = fp.read()
+
+    digest = hashlib.sha256(data).hexdigest()
+    prefix = files.in_cache_dir("assets", f"v{OPTIMIZER_VERSION}", f"{digest}-{max_dimension}")
+
+    for extension in (".png", ".jpg", ".original"):
+        if os.path.exists(prefix + extension):
+            result = path if extension == ".original" else prefix + extension
+            break
+    else:
+        with Image.open(io.BytesIO(data)) as img:
+            lossless = img.format != "JPEG"
+            img.draft(img.mode, (max_dimension, max_dimension))
+            img.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+            extension, best = min(_encodings(img, lossless), key=lambda pair: len(pair[1]))
+
+        if len(best) < len(data):
+            result = prefix + extension
+            with open(result + ".tmp", "wb") as fp:
+                fp.write(best)
+            os.replace(result + ".tmp", result)
+            _logger.info("Optimized %s from %s to %s bytes", path, len(data), len(best))
+        else:
+            # Remember that this one cannot be improved on, so we do not try again next time.
+            result = path
+            open(prefix + ".original", "w").close()
+
+    with _lock:
+        _resolved[key] = result
+
+    return result
+
+
+def optimize_all(paths, *, max_dimension=MAX_DIMENSION) -> int:
+    """
+    Optimizes each of the given images, skipping any that cannot be read.
+    This is slow the first time, so should be run in an executor.
+
+    :return: the number of images that were processed.
+    """
+    count = 0
+    for path in paths:
+        try:
+            optimize(path, max_dimension=max_dimension)
+            count += 1
+        except Exception as ex:
+            _logger.warning("Could not optimize %s: %s", path, ex)
+    return count
+
+
+def optimize_in_background(paths, *, max_dimension=MAX_DIMENSION) -> asyncio.Future:
+    """
+    Runs ``optimize_all`` in the default executor. Until each image is done,
+    ``resolve`` keeps returning its original path, so callers never wait.
+    """
+    call = functools.partial(optimize_all, list(paths), max_dimension=max_dimension)
+    return asyncio.get_event_loop().run_in_executor(None, call)
+
+
+def bundled_assets() -> typing.List[str]:
+    """Lists every image bundled with the features in this package."""
+    features = files.in_here("features")
+    paths = []
+    for root, _, file_names in os.walk(features):
+        for file_name in file_names:
+            if file_name.lower().endswith((".png", ".jpg", ".jpeg")):
+                paths.append(os.path.join(root, file_name))
+    return sorted(paths)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    assets = bundled_assets()
+    print(f"Processed {optimize_all(assets)} of {len(assets)} bundled images")
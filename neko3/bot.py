@@ -35,6 +35,7 @@ from neko3 import logging_utils
 from neko3 import pagination
 from neko3 import permission_bits
 from neko3 import properties
+from neko3 import task_registry
 
 __all__ = ("BotInterrupt", "Bot")
 
@@ -59,6 +60,10 @@ class Bot(commands.Bot, logging_utils.Loggable):
     - ``permbits`` - optional. An integer bitfield
         representing the default permissions to invite the bot with when
         generating OAuth2 URLs.
+    - ``commands_version`` - an integer that is incremented each time a
+        command is added or removed, or an extension is loaded or unloaded.
+        Anything derived from the command tree can compare this to decide
+        whether it needs rebuilding.
 
     Properties
     ----------
@@ -110,6 +115,7 @@ class Bot(commands.Bot, logging_utils.Loggable):
         self._on_exit_coros = []
 
         self.command_invoke_count = 0
+        self.commands_version = 0
 
         self.activity_semaphore = asyncio.Semaphore()
 
@@ -144,6 +150,20 @@ class Bot(commands.Bot, logging_utils.Loggable):
             self._on_exit_funcs.append(func)
         return func
 
+    def create_task(self, coro, *, name=None, owner=None, long_lived=False) -> asyncio.Task:
+        """
+        Creates a task on the bot's event loop, and registers it with the task
+        registry so that it shows up in the event loop summary.
+
+        :param coro: the coroutine to run.
+        :param name: a name for the task. Defaults to the coroutine's name.
+        :param owner: the cog responsible for the task.
+        :param long_lived: true if the task runs for as long as its owner does.
+        """
+        return task_registry.registry.create_task(
+            coro, loop=self.loop, name=name, owner=owner, long_lived=long_lived, nested_by=1
+        )
+
     @properties.cached_property()
     def invite(self):
         perm_bits = getattr(self, "permbits", 0)
@@ -297,6 +317,7 @@ class Bot(commands.Bot, logging_utils.Loggable):
         """Logs and adds a command."""
         self._recursively_log_command(command, 'Adding command "%s%s"')
         super().add_command(command)
+        self.commands_version += 1
         self.dispatch("add_command", command)
 
     def remove_command(self, name):
@@ -305,6 +326,7 @@ class Bot(commands.Bot, logging_utils.Loggable):
         command = self.get_command(name)
         self._recursively_log_command(command, "Removing command %s%r")
         super().remove_command(name)
+        self.commands_version += 1
         self.dispatch("remove_command", command)
 
     def load_extension(self, name):
@@ -317,6 +339,7 @@ class Bot(commands.Bot, logging_utils.Loggable):
         """
         self.logger.debug(f"Loading extension {name!r}")
         super().load_extension(name)
+        self.commands_version += 1
         extension = self.extensions[name]
         self.dispatch("load_extension", extension)
         return extension
@@ -326,6 +349,7 @@ class Bot(commands.Bot, logging_utils.Loggable):
         self.logger.debug(f"Unloading extension {name!r}")
         self.dispatch("unload_extension", name)
         super().unload_extension(name)
+        self.commands_version += 1
 
     async def on_connect(self):
         await self._show_initializing()
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Nekozilla is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Nekozilla is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Nekozilla.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+In-memory caches with expiry and size bounds.
+"""
+import asyncio
+import collections
+import functools
+import time
+import typing
+
+from neko3 import logging_utils
+
+__all__ = ("TTLCache", "PrefetchBuffer", "AsyncResultCache")
+
+KeyT = typing.TypeVar("KeyT")
+ValueT = typing.TypeVar("ValueT")
+
+
+class TTLCache(typing.MutableMapping[KeyT, ValueT]):
+    """
+    A mapping where each entry expires ``ttl`` seconds after it was last
+    written. If ``max_size`` is given, the least recently used entries are
+    evicted first once the cache is full.
+
+    Expired entries are dropped lazily as they are encountered, so this never
+    needs a background task to keep itself tidy.
+
+    Note. This is not thread-safe.
+
+    :param ttl: the time in seconds an entry lives for.
+    :param max_size: the maximum number of entries to hold, or None to not
+        bound the size.
+    """
+
+    def __init__(self, ttl: float, max_size: typing.Optional[int] = None) -> None:
+        self.ttl = ttl
+        self.max_size = max_size
+        self._data: typing.MutableMapping[KeyT, typing.Tuple[float, ValueT]] = collections.OrderedDict()
+
+    def __getitem__(self, key: KeyT) -> ValueT:
+        expires_at, value = self._data[key]
+        if expires_at < time.monotonic():
+            del self._data[key]
+            raise KeyError(key)
+        self._data.move_to_end(key)
+        return value
+
+    def __setitem__(self, key: KeyT, value: ValueT) -> None:
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        if self.max_size is not None:
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def __delitem__(self, key: KeyT) -> None:
+        del self._data[key]
+
+    def __contains__(self, key: object) -> bool:
+        try:
+            self[key]
+        except KeyError:
+            return False
+        else:
+            return True
+
+    def __len__(self) -> int:
+        self.purge()
+        return len(self._data)
+
+    def __iter__(self) -> typing.Iterator[KeyT]:
+        self.purge()
+        return iter(list(self._data))
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} ttl={self.ttl} max_size={self.max_size} entries={len(self)}>"
+
+    def purge(self) -> int:
+        """Drops every expired entry and returns how many were removed."""
+        now = time.monotonic()
+        expired = [k for k, (expires_at, _) in self._data.items() if expires_at < now]
+        for key in expired:
+            del self._data[key]
+        return len(expired)
+
+
+class PrefetchBuffer(logging_utils.Loggable, typing.Generic[ValueT]):
+    """
+    A bounded buffer of items fetched ahead of time, for commands that show
+    something random from a slow upstream source. Taking an item from the
+    buffer is instant unless it is empty. Once it drops below ``low_water``
+    items, it is refilled in the background.
+
+    :param fetch: coroutine function that fetches a batch of new items. Each
+        call may return any number of items.
+    :param max_size: the maximum number of items to hold.
+    :param low_water: refill once fewer than this many items remain.
+    :param ttl: the time in seconds an item is considered fresh for. Stale
+        items are discarded rather than handed out.
+    """
+
+    def __init__(
+        self,
+        fetch: typing.Callable[[], typing.Awaitable[typing.Iterable[ValueT]]],
+        *,
+        max_size: int = 20,
+        low_water: int = 5,
+        ttl: float = 30 * 60,
+    ) -> None:
+        self.fetch = fetch
+        self.max_size = max_size
+        self.low_water = low_water
+        self.ttl = ttl
+        self._entries: typing.Deque[typing.Tuple[float, ValueT]] = collections.deque()
+        self._refill_task: typing.Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        self._purge()
+        return len(self._entries)
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} fetch={self.fetch!r} size={len(self)}/{self.max_size}>"
+
+    def _purge(self) -> None:
+        # Items are appended in the order they expire, so stale ones are always at the front.
+        now = time.monotonic()
+        while self._entries and self._entries[0][0] < now:
+            self._entries.popleft()
+
+    def _on_refill_done(self, task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            self.logger.error("Failed to prefetch using %s", self.fetch, exc_info=task.exception())
+
+    async def _refill(self) -> int:
+        # Returns the number of items added.
+        added = 0
+        while len(self) < self.max_size:
+            batch = list(await self.fetch())
+            if not batch:
+                break
+
+            expires_at = time.monotonic() + self.ttl
+            for item in batch[: self.max_size - len(self._entries)]:
+                self._entries.append((expires_at, item))
+                added += 1
+
+        return added
+
+    def start(self) -> asyncio.Task:
+        """Starts refilling the buffer in the background, if it is not already doing so."""
+        if self._refill_task is None or self._refill_task.done():
+            self._refill_task = asyncio.get_event_loop().create_task(self._refill())
+            self._refill_task.add_done_callback(self._on_refill_done)
+        return self._refill_task
+
+    def close(self) -> None:
+        """Stops any background refill."""
+        if self._refill_task is not None:
+            self._refill_task.cancel()
+
+    async def get(self) -> ValueT:
+        """
+        Takes the next item from the buffer. If the buffer is empty, this waits
+        for it to be refilled first.
+
+        :raises LookupError: if nothing could be fetched.
+        """
+        while not len(self):
+            # Shielded, as other callers may be waiting on the same refill. They may
+            # also take everything it fetched first, in which case we wait for another.
+            if not await asyncio.shield(self.start()):
+                raise LookupError(f"{self.fetch} did not provide anything to prefetch")
+
+        _, item = self._entries.popleft()
+
+        if len(self._entries) < self.low_water:
+            self.start()
+
+        return item
+
+
+class AsyncResultCache(logging_utils.Loggable):
+    """
+    Memoizes the results of coroutines by key for ``ttl`` seconds. If a result
+    for a key is already being computed, later callers join that computation
+    rather than starting their own.
+
+    Failures are never cached, but everyone waiting on a computation that
+    fails receives the exception.
+
+    :param ttl: the time in seconds a result lives for.
+    :param max_size: the maximum number of results to hold, or None to not
+        bound the size.
+    """
+
+    def __init__(self, ttl: float, max_size: typing.Optional[int] = None) -> None:
+        self.results: TTLCache[typing.Hashable, typing.Any] = TTLCache(ttl, max_size)
+        self._in_flight: typing.Dict[typing.Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.joins = 0
+
+    def __repr__(self) -> str:
+        return (
+            f"<{type(self).__name__} results={len(self.results)} in_flight={len(self._in_flight)} "
+            f"hits={self.hits} misses={self.misses} joins={self.joins}>"
+        )
+
+    def _on_done(self, key: typing.Hashable, future: asyncio.Future) -> None:
+        self._in_flight.pop(key, None)
+        if not future.cancelled() and future.exception() is None:
+            self.results[key] = future.result()
+
+    async def get_or_compute(
+        self, key: typing.Hashable, compute: typing.Callable[[], typing.Awaitable], *, refresh: bool = False
+    ) -> typing.Any:
+        """
+        Gets the result for the key, calling ``compute`` to produce it if it
+        is neither cached nor already being computed.
+
+        :param key: the key for the result.
+        :param compute: called with no arguments to produce the result.
+        :param refresh: true to ignore any cached result. A computation that
+            is already running is still joined, as it is just as fresh.
+        """
+        if not refresh:
+            try:
+                result = self.results[key]
+            except KeyError:
+                pass
+            else:
+                self.hits += 1
+                return result
+
+        if key in self._in_flight:
+            self.joins += 1
+        else:
+            self.misses += 1
+            future = asyncio.ensure_future(compute())
+            future.add_done_callback(functools.partial(self._on_done, key))
+            self._in_flight[key] = future
+
+        # Shielded, as cancelling one caller should not cancel it for everyone else.
+        return await asyncio.shield(self._in_flight[key])
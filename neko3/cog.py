@@ -16,10 +16,12 @@
 Various thread and process pool templates.
 """
 import asyncio
+import collections
 import functools
 import inspect
 import logging
 import os  # File system access.
+import sys
 import typing
 
 import aiofiles
@@ -27,6 +29,13 @@ import aiohttp
 from discord.ext import commands
 
 from neko3 import logging_utils
+from neko3 import scheduler
+from neko3 import task_registry
+
+#: How many live tasks and pending timers a cog holds, and a rough estimate of
+#: how many bytes the tasks keep alive. The estimate only counts each task, its
+#: coroutine and the objects its frame refers to directly.
+CogTaskStats = collections.namedtuple("CogTaskStats", "tasks timers estimated_bytes")
 
 
 def _magic_number(*, cpu_bound=False):
@@ -66,12 +75,107 @@ def _pickle_and_wrap(call, *args, **kwargs):
 
 
 class CogBase(logging_utils.Loggable, commands.Cog):
-    """Contains any shared resource traits we may want to acquire."""
+    """
+    Contains any shared resource traits we may want to acquire.
+
+    Tasks made with ``create_task`` or passed to ``track_task``, and timers
+    made with ``call_later``, belong to the cog. They are cancelled when it
+    is unloaded, so they do not outlive a reload. Subclasses that override
+    ``cog_unload`` must call the super implementation.
+    """
 
     def __init__(self, bot):
         super().__init__()
         self.bot = bot
 
+    # These are made on first use, so that subclasses which do not call
+    # CogBase.__init__ still work.
+    @property
+    def _tasks(self) -> typing.Set[asyncio.Task]:
+        return self.__dict__.setdefault("_owned_tasks", set())
+
+    @property
+    def _timers(self) -> typing.Set[scheduler.TimerHandle]:
+        return self.__dict__.setdefault("_owned_timers", set())
+
+    def create_task(self, coro, *, name=None, long_lived=False) -> asyncio.Task:
+        """
+        Creates a task owned by this cog.
+
+        :param coro: the coroutine to run.
+        :param name: a name for the task. Defaults to the coroutine's name.
+        :param long_lived: true if the task is expected to run until the cog
+            is unloaded.
+        """
+        task = task_registry.registry.create_task(
+            coro, loop=self.bot.loop, name=name, owner=self, long_lived=long_lived, nested_by=1
+        )
+        return self.track_task(task)
+
+    def track_task(self, task: asyncio.Task) -> asyncio.Task:
+        """Makes an existing task owned by this cog, and returns it."""
+        if not task.done():
+            self._tasks.add(task)
+            task.add_done_callback(self._on_task_done)
+        return task
+
+    def _on_task_done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            self.logger.error("%s raised an error", task, exc_info=task.exception())
+
+    def call_later(self, delay: float, callback: typing.Callable, *args) -> scheduler.TimerHandle:
+        """
+        Runs the callback with the given arguments after the given delay,
+        unless the cog is unloaded first. See ``scheduler.Scheduler``.
+        """
+        handle = None
+
+        def fire():
+            self._timers.discard(handle)
+            result = callback(*args)
+            if asyncio.iscoroutine(result):
+                self.create_task(result)
+
+        handle = scheduler.get_scheduler(self.bot).call_later(delay, fire)
+        handle.on_cancel = self._timers.discard
+        self._timers.add(handle)
+        return handle
+
+    @property
+    def task_stats(self) -> CogTaskStats:
+        estimated_bytes = 0
+        for task in list(self._tasks):
+            coro = task.get_coro()
+            frame = getattr(coro, "cr_frame", None)
+            estimated_bytes += sys.getsizeof(task) + sys.getsizeof(coro)
+            if frame is not None:
+                estimated_bytes += sys.getsizeof(frame)
+                estimated_bytes += sum(sys.getsizeof(value) for value in frame.f_locals.values())
+
+        return CogTaskStats(len(self._tasks), len(self._timers), estimated_bytes)
+
+    def cog_unload(self):
+        for handle in list(self._timers):
+            handle.cancel()
+        self._timers.clear()
+
+        tasks = [task for task in self._tasks if not task.done()]
+        self._tasks.clear()
+
+        if tasks:
+            self.logger.debug("Cancelling %s tasks", len(tasks))
+            for task in tasks:
+                task.cancel()
+            task_registry.registry.create_task(self._await_cancelled(tasks), loop=self.bot.loop, owner=self)
+
+    async def _await_cancelled(self, tasks):
+        # cog_unload cannot be a coroutine, so wait for the tasks to finish tidying up here instead.
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        for task, result in zip(tasks, results):
+            if isinstance(result, Exception):
+                self.logger.error("%s raised an error while being cancelled", task, exc_info=result)
+
     @classmethod
     def acquire_http_session(cls):
         """
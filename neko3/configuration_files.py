@@ -108,7 +108,8 @@ class ConfigFile(logging_utils.Loggable):
                 with io.StringIO(await fp.read()) as str_io:
                     str_io.seek(0)
 
-                    return self.deserializer(str_io)
+                    self._value = self.deserializer(str_io)
+                    return self._value
 
     def sync_get(self):
         """Blocks while we read the config from the file."""
@@ -122,7 +123,8 @@ class ConfigFile(logging_utils.Loggable):
             )
 
             with open(self.path) as fp:
-                return self.deserializer(fp)
+                self._value = self.deserializer(fp)
+                return self._value
 
     def invalidate(self):
         """
@@ -30,6 +30,7 @@ from discord.ext.commands import MemberConverter
 from discord.ext.commands import UserConverter
 
 import neko3.functional
+from neko3 import name_index
 
 
 class GuildChannelConverter(commands.Converter):
@@ -316,20 +317,9 @@ class InsensitiveUserConverter(_commands.Converter):
         try:
             return await UserConverter().convert(ctx, argument)
         except _commands.BadArgument:
-
-            def predicate_user_and_discriminator(user):
-                return user.name.lower() == argument[:-5].lower() and str(user.discriminator) == argument[-4:]
-
-            def predicate_user(user):
-                return user.name.lower() == argument.lower()
-
-            result = None
-
-            if len(argument) > 5 and argument[-5] == "#":
-                result = discord.utils.find(predicate_user_and_discriminator, ctx.bot.users)
-
-            if result is None:
-                result = discord.utils.find(predicate_user, ctx.bot.users)
+            index = name_index.get_index(ctx.bot)
+            users = map(ctx.bot.get_user, index.find_user_ids(argument))
+            result = next(filter(None, users), None)
 
             if result is None:
                 try:
@@ -379,27 +369,15 @@ class InsensitiveMemberConverter(_commands.Converter):
                     except discord.NotFound:
                         pass
 
-            def predicate_user_and_discriminator(user):
-                return user.name.lower() == argument[:-5].lower() and str(user.discriminator) == argument[-4:]
-
-            search_pool = [*ctx.guild.members, *ctx.bot.users]
+            index = name_index.get_index(ctx.bot)
+            user_ids = index.find_user_ids(argument)
 
-            def predicate_user(user):
-                return user.name.lower() == argument.lower()
-
-            def predicate_nick(user):
-                return getattr(user, "nick", None) and user.nick.lower() == argument.lower()
-
-            result = None
-
-            if len(argument) > 5 and argument[-5] == "#":
-                result = discord.utils.find(predicate_user_and_discriminator, search_pool)
-
-            if result is None:
-                result = discord.utils.find(predicate_user, search_pool)
-
-            if result is None:
-                result = discord.utils.find(predicate_nick, search_pool)
+            # Prefer members of this guild, then anyone else, then members by nickname.
+            members = map(ctx.guild.get_member, user_ids)
+            users = map(ctx.bot.get_user, user_ids)
+            nicks = map(ctx.guild.get_member, index.find_nick_ids(ctx.guild.id, argument))
+            result = next(filter(None, members), None) or next(filter(None, users), None)
+            result = result or next(filter(None, nicks), None)
 
         if result is None:
             raise _commands.BadArgument('User "{}" not found'.format(argument))
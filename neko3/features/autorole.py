@@ -14,18 +14,35 @@
 # along with Nekozilla.  If not, see <https://www.gnu.org/licenses/>.
 """
 Provides autorole functionality for hard-coded guilds if we are in them.
+
+Rather than firing off a request for every member at once when a guild
+becomes available, the roles each member should have are compared against
+the roles they actually have, and only the missing ones are queued. A single
+worker then applies them one at a time, at a pace that stays under Discord's
+rate limits. Queued changes are checkpointed to disk, so a restart carries on
+from where it left off.
 """
 import asyncio
 import collections
-import logging
+import json
+import os
+import time
+import typing
 
 import discord
 from discord.ext import commands
 
+from neko3 import cog
+from neko3 import files
+from neko3 import logging_utils
+
 
 # `Predicate` is a bipredicate consuming a role and a member object.
 AutoRole = collections.namedtuple("AutoRole", "role_id predicate")
 
+#: A role that a member should have, but does not yet.
+RoleChange = collections.namedtuple("RoleChange", "guild_id member_id role_id")
+
 
 GUILDS_TO_ROLES = {
     # `hikari'
@@ -35,42 +52,207 @@ GUILDS_TO_ROLES = {
     ]
 }
 
+CHECKPOINT_FILE = "autorole.json"
+# How many role changes to make per second, at most.
+CHANGES_PER_SECOND = 1
+# How many times to attempt a change that fails with a transient error.
+MAX_ATTEMPTS = 3
+# How long, in seconds, to wait before retrying a change that we were not
+# allowed to make, in case someone has since fixed our permissions.
+FORBIDDEN_RETRY_AFTER = 24 * 60 * 60
+# Save a checkpoint after this many changes, as well as whenever the queue empties.
+CHECKPOINT_EVERY = 25
 
-class AutoRoleCog(commands.Cog):
-    def __init__(self):
-        self.logger = logging.getLogger(__name__)
 
-    @commands.Cog.listener()
-    async def on_member_join(self, member_obj):
-        if member_obj.guild.id in GUILDS_TO_ROLES:
-            self.ensure_roles(member_obj)
+class RoleReconciler(logging_utils.Loggable):
+    """
+    Queues the roles that members are missing, and drains the queue in the
+    background.
 
-    @commands.Cog.listener()
-    async def on_guild_available(self, guild_obj):
-        if guild_obj.id in GUILDS_TO_ROLES:
-            self.logger.info("Checking members roles in %s", guild_obj)
-            # https://github.com/Rapptz/discord.py/issues/2473
-            # // async for member_obj in guild_obj.fetch_members(limit=None):
-            for member_obj in guild_obj.members:
-                self.ensure_roles(member_obj)
-            self.logger.info("Finished looking up roles in %s", guild_obj)
+    Roles are only ever granted here, never removed, so that roles granted
+    by hand are left alone.
+
+    :param bot: the bot to manage roles with.
+    """
+
+    def __init__(self, bot) -> None:
+        self.bot = bot
+        self.queue: asyncio.Queue = asyncio.Queue()
+        # Every change in the queue, so changes are only queued once.
+        self.pending: typing.Dict[RoleChange, None] = {}
+        # Changes we were not allowed to make, and when we last tried.
+        self.forbidden: typing.Dict[RoleChange, float] = {}
+        # Changes for guilds that are not available yet, by guild ID, with their attempt.
+        self.deferred: typing.Dict[int, typing.Dict[RoleChange, int]] = collections.defaultdict(dict)
+        self.changes_since_checkpoint = 0
+        self.load_checkpoint()
 
-    def ensure_roles(self, member_obj):
+    def diff(self, member_obj) -> typing.List[RoleChange]:
+        """Gets the roles the member should have, but does not."""
         guild_obj = member_obj.guild
-        for role_id, predicate in GUILDS_TO_ROLES[guild_obj.id]:
+        now = time.time()
+        changes = []
+
+        for role_id, predicate in GUILDS_TO_ROLES.get(guild_obj.id, ()):
             role_obj = guild_obj.get_role(role_id)
+            if role_obj is None or role_obj in member_obj.roles or not predicate(role_obj, member_obj):
+                continue
+
+            change = RoleChange(guild_obj.id, member_obj.id, role_id)
+            if self.forbidden.get(change, -FORBIDDEN_RETRY_AFTER) + FORBIDDEN_RETRY_AFTER <= now:
+                changes.append(change)
+
+        return changes
+
+    def enqueue(self, change: RoleChange) -> bool:
+        if change in self.pending:
+            return False
+        self.pending[change] = None
+        self.queue.put_nowait((change, 1))
+        return True
+
+    def reconcile_member(self, member_obj) -> int:
+        """Queues any roles the member is missing, and returns how many were queued."""
+        return sum(self.enqueue(change) for change in self.diff(member_obj))
+
+    def reconcile_guild(self, guild_obj) -> int:
+        """Queues any roles missing from members of the guild, and returns how many were queued."""
+        return sum(self.reconcile_member(member_obj) for member_obj in guild_obj.members)
 
-            if role_obj is not None and role_obj not in member_obj.roles and predicate(role_obj, member_obj):
-                asyncio.create_task(self.add_role(member_obj, role_obj, guild_obj))
+    def resume_guild(self, guild_obj) -> int:
+        """Queues the changes deferred until the guild became available, and returns how many there were."""
+        deferred = self.deferred.pop(guild_obj.id, {})
+        for change, attempt in deferred.items():
+            self.queue.put_nowait((change, attempt))
+        return len(deferred)
+
+    def forget_guild(self, guild_obj) -> None:
+        """Discards the changes deferred for a guild that we are no longer in."""
+        for change in self.deferred.pop(guild_obj.id, {}):
+            self.pending.pop(change, None)
+
+    def load_checkpoint(self) -> None:
+        try:
+            with open(files.in_cache_dir(CHECKPOINT_FILE)) as fp:
+                checkpoint = json.load(fp)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError):
+            self.logger.warning("Ignoring unreadable checkpoint", exc_info=True)
+            return
+
+        for change in checkpoint.get("pending", ()):
+            self.enqueue(RoleChange(*change))
+        for *change, tried_at in checkpoint.get("forbidden", ()):
+            self.forbidden[RoleChange(*change)] = tried_at
+
+        self.logger.info("Resuming with %s queued role changes", len(self.pending))
+
+    def save_checkpoint(self) -> None:
+        now = time.time()
+        checkpoint = {
+            "pending": list(self.pending),
+            "forbidden": [
+                [*change, tried_at]
+                for change, tried_at in self.forbidden.items()
+                if tried_at + FORBIDDEN_RETRY_AFTER > now
+            ],
+        }
+
+        path = files.in_cache_dir(CHECKPOINT_FILE)
+        with open(path + ".tmp", "w") as fp:
+            json.dump(checkpoint, fp)
+        os.replace(path + ".tmp", path)
+        self.changes_since_checkpoint = 0
+
+    async def apply(self, change: RoleChange, attempt: int) -> None:
+        guild_obj = self.bot.get_guild(change.guild_id)
+        if guild_obj is None:
+            # We only run once the cache is ready, so we must have left the guild.
+            self.logger.debug("Dropping %s, as we are no longer in that guild", change)
+            return
+        elif guild_obj.unavailable:
+            # Hold onto it until the guild is available, rather than assuming the member left.
+            self.pending[change] = None
+            self.deferred[change.guild_id][change] = attempt
+            return
+
+        member_obj = guild_obj.get_member(change.member_id)
+        role_obj = guild_obj.get_role(change.role_id)
+
+        # Things may have changed since this was queued, such as before a restart.
+        if member_obj is None or role_obj is None or change not in self.diff(member_obj):
+            return
 
-    async def add_role(self, member_obj, role_obj, guild_obj):
         try:
             await member_obj.add_roles(role_obj, reason=f"{__name__}: user did not have role")
-        except (discord.Forbidden, discord.HTTPException) as ex:
+        except (discord.Forbidden, discord.NotFound):
             self.logger.exception("Failed to add role %s to member %s in guild %s", role_obj, member_obj, guild_obj)
+            self.forbidden[change] = time.time()
+        except discord.HTTPException as ex:
+            if attempt < MAX_ATTEMPTS:
+                # Back off before trying again, rather than competing with everything else.
+                self.logger.warning("Failed to add role %s to member %s, will retry: %s", role_obj, member_obj, ex)
+                await asyncio.sleep(2 ** attempt)
+                self.pending[change] = None
+                self.queue.put_nowait((change, attempt + 1))
+            else:
+                self.logger.exception("Giving up adding role %s to member %s in %s", role_obj, member_obj, guild_obj)
         else:
             self.logger.info("Granted role %s to member %s in guild %s", role_obj, member_obj, guild_obj)
 
+    async def drain(self) -> None:
+        """Applies queued changes forever, one at a time, at no more than ``CHANGES_PER_SECOND``."""
+        # Until then, the guild and member cache is incomplete.
+        await self.bot.wait_until_ready()
+
+        while True:
+            change, attempt = await self.queue.get()
+            self.pending.pop(change, None)
+
+            try:
+                await self.apply(change, attempt)
+            except Exception:
+                self.logger.exception("Unexpected error applying %s", change)
+
+            self.changes_since_checkpoint += 1
+            if self.changes_since_checkpoint >= CHECKPOINT_EVERY or self.queue.empty():
+                try:
+                    self.save_checkpoint()
+                except Exception:
+                    self.logger.exception("Failed to save a checkpoint, will try again later")
+
+            await asyncio.sleep(1 / CHANGES_PER_SECOND)
+
+
+class AutoRoleCog(cog.CogBase):
+    def __init__(self, bot):
+        super().__init__(bot)
+        self.reconciler = RoleReconciler(bot)
+        self.worker = self.create_task(self.reconciler.drain(), long_lived=True)
+
+    def cog_unload(self):
+        super().cog_unload()
+        self.reconciler.save_checkpoint()
+
+    @commands.Cog.listener()
+    async def on_member_join(self, member_obj):
+        if member_obj.guild.id in GUILDS_TO_ROLES:
+            self.reconciler.reconcile_member(member_obj)
+
+    @commands.Cog.listener()
+    async def on_guild_available(self, guild_obj):
+        if guild_obj.id in GUILDS_TO_ROLES:
+            self.reconciler.resume_guild(guild_obj)
+            # https://github.com/Rapptz/discord.py/issues/2473
+            # // async for member_obj in guild_obj.fetch_members(limit=None):
+            queued = self.reconciler.reconcile_guild(guild_obj)
+            self.logger.info("Queued %s role changes for members in %s", queued, guild_obj)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild_obj):
+        self.reconciler.forget_guild(guild_obj)
+
 
 def setup(bot):
-    bot.add_cog(AutoRoleCog())
+    bot.add_cog(AutoRoleCog(bot))
@@ -22,28 +22,44 @@ import aiohttp
 import bs4
 
 import neko3.cog
+from neko3 import caching
 from neko3 import neko_commands
 from neko3 import pagination
 from neko3 import theme
 
 
-async def get_random_quote():
+async def get_random_quotes():
+    """Gets a page of random quotes from bash.org, in a random order."""
     async with aiohttp.ClientSession() as session:
         async with session.get("http://bash.org/?random1") as resp:
             resp.raise_for_status()
             raw = await resp.text()
 
     soup = bs4.BeautifulSoup(raw, features="html.parser")
-    quotes = soup.find_all(attrs={"class": "qt"})
-    quote = random.choice(quotes)
-    return quote.text.replace('`', '\N{MODIFIER LETTER GRAVE ACCENT}')
+    quotes = [
+        quote.text.replace('`', '\N{MODIFIER LETTER GRAVE ACCENT}') for quote in soup.find_all(attrs={"class": "qt"})
+    ]
+    random.shuffle(quotes)
+    return quotes
 
 
 class BashDotOrgCog(neko3.cog.CogBase):
+    def __init__(self, bot):
+        super().__init__(bot)
+        self.random_quotes = caching.PrefetchBuffer(get_random_quotes, max_size=50, low_water=10)
+        self.random_quotes.start()
+
+    def cog_unload(self):
+        super().cog_unload()
+        self.random_quotes.close()
+
     @neko_commands.command(name="bash", brief="Gets a quote from bash.org")
     async def bash_command(self, ctx):
         async with ctx.typing():
-            quote = await get_random_quote()
+            try:
+                quote = await self.random_quotes.get()
+            except LookupError:
+                return await ctx.send("bash.org did not give me any quotes. Try again later.", delete_after=15)
 
         @pagination.embed_generator(max_chars=2048)
         def embed_generator(pag, page, index):
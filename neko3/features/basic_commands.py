@@ -30,6 +30,7 @@ import neko3
 from neko3 import cog
 from neko3 import neko_commands
 from neko3 import properties
+from neko3 import statistics
 from neko3 import string
 from neko3 import theme
 
@@ -208,7 +209,8 @@ class BasicCommandsCog(cog.CogBase):
         ack_time -= start_ack
         event_loop_latency -= ack_time
 
-        users = max(len(ctx.bot.users), len(list(ctx.bot.get_all_members())))
+        bot_stats = statistics.get_aggregator(ctx.bot).snapshot()
+        users = max(bot_stats.users, bot_stats.members)
         tasks = len(asyncio.Task.all_tasks(loop=asyncio.get_event_loop()))
         procs = 1 + len(psutil.Process().children(recursive=True))
 
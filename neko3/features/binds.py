@@ -140,11 +140,13 @@ class BindsCog(neko3.cog.CogBase):
             wh: discord.Webhook = await channel.create_webhook(name=name, avatar=await avatar_resp.read())
 
             try:
-                await message.delete()
-            except Exception:
-                pass
-            finally:
+                try:
+                    await message.delete()
+                except Exception:
+                    pass
                 await wh.send(content=message.content)
+            finally:
+                # Even if we were cancelled because the cog is unloading, so the webhook is not left behind.
                 await wh.delete()
 
     @neko_commands.Cog.listener()
@@ -189,7 +191,7 @@ class BindsCog(neko3.cog.CogBase):
         if has_matched:
             message.content = string.trunc(message.content)
             message.content = await commands.clean_content().convert(ctx, message.content)
-            await self.delete_and_copy_handle_with_webhook(message)
+            self.create_task(self.delete_and_copy_handle_with_webhook(message))
 
 
 def setup(bot):
@@ -15,21 +15,43 @@
 
 """
 C and C++ utilities.
+
+If ``CPPREFERENCE_ARCHIVE_DIRECTORY`` points to an extracted copy of the
+offline HTML book from https://en.cppreference.com/w/Cppreference:Archives,
+an index of every page is built from it in the cache directory. Lookups are
+then answered from that index, and cppreference.com is only queried when the
+index has nothing to offer. The index can also be built ahead of time with::
+
+    python -m neko3.features.c_plus_plus_reference <archive directory>
 """
 import asyncio
+import gzip
+import json
+import os
 import re  # Regex
+import sys
 import typing  # Type checking
 
 import bs4  # HTML parser
 
 import neko3.cog
 from neko3 import errors, algorithms
+from neko3 import files
+from neko3 import fuzzy_search
+from neko3 import logging_utils
 from neko3 import neko_commands
 from neko3 import pagination
 
 # CppReference stuff
 result_path = re.compile(r"^/w/c(pp)?/", re.I)
 
+ARCHIVE_DIRECTORY = os.getenv("CPPREFERENCE_ARCHIVE_DIRECTORY")
+INDEX_FILE_NAME = "cppreference-index.json.gz"
+# Bump this if the layout of the index changes, to force a rebuild.
+INDEX_VERSION = 2
+FUZZY_MIN_SCORE = 75
+MAX_INDEX_RESULTS = 20
+
 
 class SearchResult:
     def __init__(self, text, href):
@@ -39,6 +61,225 @@ class SearchResult:
     def __str__(self):
         return f"`{self.text}`"
 
+    @classmethod
+    def labelled(cls, name, href):
+        """Makes a search result with the name prefixed by the language the page belongs to."""
+        if href.startswith("/w/c/"):
+            return cls(f"[C] {name}", href)
+        elif href.startswith("/w/cpp/"):
+            return cls(f"[C++] {name}", href)
+        else:
+            return cls(f"[Other] {name}", href)
+
+
+def parse_page(html):
+    """
+    Extracts the title, declarations, header and description from a
+    cppreference page.
+    """
+    bs = bs4.BeautifulSoup(html, features="html.parser")
+
+    header = bs.find(name="tr", attrs={"class": "t-dsc-header"})
+    if header:
+        header = header.text
+    else:
+        header = ""
+
+    taster_tbl: bs4.Tag = bs.find(name="table", attrs={"class": "t-dcl-begin"})
+
+    if taster_tbl:
+        tasters = taster_tbl.find_all(name="span", attrs={"class": lambda c: c is not None and "mw-geshi" in c})
+
+        if tasters:
+            # Fixes some formatting
+            for i, taster in enumerate(tasters):
+                taster = taster.text.split("\n")
+                taster = "\n".join(t.rstrip() for t in taster)
+                taster = taster.replace("\n\n", "\n")
+                tasters[i] = taster
+
+        # Remove tasters from DOM
+        taster_tbl.replace_with(bs4.Tag(name="empty"))
+    else:
+        tasters = []
+
+    h1 = bs.find(name="h1")
+    h1 = h1.text.strip() if h1 else ""
+
+    # Get the description
+    desc = bs.find(name="div", attrs={"id": "mw-content-text"})
+
+    if desc:
+        description = "\n".join(
+            p.text
+            for p in desc.find_all(name="p")
+            if not p.text.strip().endswith(":")
+            and not p.text.strip().startswith("(")
+            and not p.text.strip().endswith(")")
+        )
+    else:
+        description = ""
+
+    return h1, tasters, header, description
+
+
+def _index_keys(title, href):
+    """Works out the names a page should be found by."""
+    keys = {href.rpartition("/")[2].lower()}
+
+    if "/header/" in href:
+        keys.add(f"<{href.rpartition('/header/')[2].lower()}>")
+
+    for name in title.split(","):
+        name = " ".join(name.split()).lower()
+        if name:
+            keys.add(name)
+            if name.startswith("std::"):
+                keys.add(name[5:])
+
+    keys.discard("")
+    return keys
+
+
+def _archive_root(archive_directory):
+    for candidate in (os.path.join(archive_directory, "reference", "en"), os.path.join(archive_directory, "en")):
+        if os.path.isdir(candidate):
+            return candidate
+    return archive_directory
+
+
+def archive_signature(archive_directory):
+    """
+    Summarises the pages in an offline cppreference HTML archive as the
+    number of pages and the latest time any of them was modified, so that
+    changes anywhere in the archive can be noticed without parsing it.
+    """
+    count, latest = 0, 0.0
+    for directory, _, file_names in os.walk(_archive_root(archive_directory)):
+        for file_name in file_names:
+            if file_name.endswith(".html"):
+                count += 1
+                latest = max(latest, os.path.getmtime(os.path.join(directory, file_name)))
+    return [count, latest]
+
+
+def build_index(archive_directory, index_path):
+    """
+    Walks an offline cppreference HTML archive and writes an index of every
+    C and C++ page in it to ``index_path``. This is slow, so it should be run
+    in a process pool or ahead of time.
+
+    :return: the number of pages that were indexed.
+    """
+    root = _archive_root(archive_directory)
+    # Taken first, so anything that changes while we work triggers another rebuild.
+    signature = archive_signature(archive_directory)
+    pages, keys = {}, {}
+
+    for directory, _, file_names in os.walk(root):
+        for file_name in file_names:
+            if not file_name.endswith(".html"):
+                continue
+
+            path = os.path.join(directory, file_name)
+            href = "/w/" + os.path.relpath(path, root)[: -len(".html")].replace(os.sep, "/")
+
+            if not result_path.match(href):
+                continue
+
+            with open(path, encoding="utf-8", errors="replace") as fp:
+                title, tasters, header, description = parse_page(fp.read())
+
+            if not title:
+                continue
+
+            pages[href] = [title, tasters, header, description]
+            for key in _index_keys(title, href):
+                keys.setdefault(key, []).append(href)
+
+    temp_path = index_path + ".tmp"
+    with gzip.open(temp_path, "wt", encoding="utf-8") as fp:
+        json.dump(
+            {
+                "version": INDEX_VERSION,
+                "archive": os.path.abspath(archive_directory),
+                "signature": signature,
+                "pages": pages,
+                "keys": keys,
+            },
+            fp,
+        )
+    os.replace(temp_path, index_path)
+
+    return len(pages)
+
+
+class CppReferenceIndex(logging_utils.Loggable):
+    """
+    Maps identifiers, qualified names and headers to the pages describing
+    them, along with the content of each page that the ``cppref`` command
+    displays.
+
+    :param path: the file the index is stored in.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.pages: typing.Dict[str, list] = {}
+        self.keys: typing.Dict[str, typing.List[str]] = {}
+        # The archive the loaded index was built from, and its signature at the time.
+        self.archive = None
+        self.signature = None
+
+    def __len__(self):
+        return len(self.pages)
+
+    def is_current_for(self, archive_directory, signature) -> bool:
+        """True if the loaded index was built from the given archive, and the archive has not changed since."""
+        return self.archive == os.path.abspath(archive_directory) and self.signature == signature
+
+    def load(self) -> bool:
+        """Loads the index from disk. Returns False if there was nothing usable to load."""
+        try:
+            with gzip.open(self.path, "rt", encoding="utf-8") as fp:
+                data = json.load(fp)
+        except FileNotFoundError:
+            return False
+        except (OSError, EOFError, ValueError):
+            self.logger.exception("cppreference index at %s is corrupt, ignoring it", self.path)
+            return False
+
+        if data.get("version") != INDEX_VERSION:
+            self.logger.warning("cppreference index at %s is an old version, ignoring it", self.path)
+            return False
+
+        self.pages, self.keys = data["pages"], data["keys"]
+        self.archive, self.signature = data["archive"], data["signature"]
+        self.logger.info("Loaded %s cppreference pages from %s", len(self.pages), self.path)
+        return True
+
+    def page(self, href):
+        """Gets the title, tasters, header and description for the page, or None if it is not indexed."""
+        return self.pages.get(href)
+
+    def search(self, *terms) -> typing.List[SearchResult]:
+        """
+        Looks up each term directly, falling back to fuzzy matching against
+        every known name for any term that has no exact match.
+        """
+        hrefs = []
+        for term in terms:
+            term = " ".join(term.split()).lower()
+            matches = self.keys.get(term)
+            if matches is None:
+                matches = []
+                best = fuzzy_search.extract(term, self.keys, min_score=FUZZY_MIN_SCORE, max_results=5)
+                for key, _ in best:
+                    matches.extend(self.keys[key])
+            hrefs.extend(href for href in matches if href not in hrefs)
+
+        return [SearchResult.labelled(self.pages[href][0], href) for href in hrefs[:MAX_INDEX_RESULTS]]
+
 
 # 25th Apr 2018: Certificate issues on HTTPS, so using
 # HTTP instead.
@@ -48,6 +289,29 @@ search_cppr = base_cppr_https + "/mwiki/index.php"
 
 
 class CppCog(neko3.cog.CogBase):
+    def __init__(self, bot):
+        super().__init__(bot)
+        self.index = CppReferenceIndex(files.in_cache_dir(INDEX_FILE_NAME))
+        self.index_task = self.create_task(self._prepare_index())
+
+    async def _prepare_index(self):
+        await self.run_in_thread_pool(self.index.load)
+        if not ARCHIVE_DIRECTORY:
+            return
+
+        signature = await self.run_in_thread_pool(archive_signature, [ARCHIVE_DIRECTORY])
+        if not self.index.is_current_for(ARCHIVE_DIRECTORY, signature):
+            self.logger.info("Building cppreference index from archive at %s", ARCHIVE_DIRECTORY)
+            try:
+                count = await self.run_in_process_pool(build_index, [ARCHIVE_DIRECTORY, self.index.path])
+            except Exception:
+                self.logger.exception("Failed to build the cppreference index, will use cppreference.com instead")
+                # Rather than an index of an older archive.
+                self.index = CppReferenceIndex(self.index.path)
+                return
+            self.logger.info("Indexed %s cppreference pages", count)
+            await self.run_in_thread_pool(self.index.load)
+
     async def results(self, ctx, *terms):
         """Gathers the results for the given search terms from Cppreference."""
         params = {"search": "|".join(terms)}
@@ -135,56 +399,11 @@ class CppCog(neko3.cog.CogBase):
                     self.logger.info("GET %s", url)
                     resp.raise_for_status()
 
-                    # Make soup.
-                    bs = bs4.BeautifulSoup(await resp.text(), features="html.parser")
+                    html = await resp.text()
 
         await ctx.send(f"Response from server took {timer.time_taken * 1_000:,.2f}ms", delete_after=3)
 
-        header = bs.find(name="tr", attrs={"class": "t-dsc-header"})
-        if header:
-            header = header.text
-        else:
-            header = ""
-
-        taster_tbl: bs4.Tag = bs.find(name="table", attrs={"class": "t-dcl-begin"})
-
-        if taster_tbl:
-            tasters = taster_tbl.find_all(name="span", attrs={"class": lambda c: c is not None and "mw-geshi" in c})
-
-            if tasters:
-                # Fixes some formatting
-                for i, taster in enumerate(tasters):
-                    taster = taster.text.split("\n")
-                    taster = "\n".join(t.rstrip() for t in taster)
-                    taster = taster.replace("\n\n", "\n")
-                    tasters[i] = taster
-
-            # Remove tasters from DOM
-            taster_tbl.replace_with(bs4.Tag(name="empty"))
-        else:
-            tasters = []
-
-        h1 = bs.find(name="h1").text
-
-        # Get the description
-        desc = bs.find(name="div", attrs={"id": "mw-content-text"})
-
-        if desc:
-            # first_par_node = desc.find(name='p')
-            # description = first_par_node.text + '\n'
-            # sibs = first_par_node.find_next_siblings()
-            # for sib in sibs:
-            #    description += sib.text + '\n'
-            description = "\n".join(
-                p.text
-                for p in desc.find_all(name="p")
-                if not p.text.strip().endswith(":")
-                and not p.text.strip().startswith("(")
-                and not p.text.strip().endswith(")")
-            )
-        else:
-            description = ""
-
+        h1, tasters, header, description = await self.run_in_thread_pool(parse_page, [html])
         return url, h1, tasters, header, description
 
     @neko_commands.command(
@@ -196,9 +415,13 @@ class CppCog(neko3.cog.CogBase):
     async def cpp_reference_command(self, ctx, *terms):
 
         self.logger.info("Searching for terms %s", terms)
+
+        results = await self.run_in_thread_pool(self.index.search, terms) if self.index else []
+
         try:
-            async with ctx.typing():
-                results = await self.results(ctx, *terms)
+            if not results:
+                async with ctx.typing():
+                    results = await self.results(ctx, *terms)
         except Exception as ex:
             self.logger.exception("search error", exc_info=ex)
             return await ctx.send(
@@ -229,8 +452,13 @@ class CppCog(neko3.cog.CogBase):
 
         async with ctx.typing():
             try:
-                self.logger.info("searching for info from %s", result.href)
-                url, h1, tasters, header, desc = await self.get_information(ctx, result.href)
+                page = self.index.page(result.href)
+                if page:
+                    url = base_cppr + result.href
+                    h1, tasters, header, desc = page
+                else:
+                    self.logger.info("searching for info from %s", result.href)
+                    url, h1, tasters, header, desc = await self.get_information(ctx, result.href)
             except Exception as ex:
                 self.logger.exception("An exception occurred", exc_info=ex)
                 return await ctx.send("An error was encountered and a duck was shot.")
@@ -255,3 +483,11 @@ class CppCog(neko3.cog.CogBase):
 
 def setup(bot):
     bot.add_cog(CppCog(bot))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print(f"usage: python -m {__spec__.name} <archive directory>", file=sys.stderr)
+        sys.exit(2)
+
+    print("Indexed", build_index(sys.argv[1], files.in_cache_dir(INDEX_FILE_NAME)), "pages")
@@ -30,7 +30,7 @@ import PIL.Image as pil_image
 import PIL.ImageDraw as pil_pen
 import PIL.ImageFont as pil_font
 
-from neko3 import files
+from neko3 import resources
 
 _pheight = 25
 _pwidth = 25
@@ -433,43 +433,41 @@ class ColourNames(typing.Mapping[str, typing.Tuple[int, int, int]]):
     def __init__(self):
         self.log = logging.getLogger(__name__)
 
-        path = files.in_here("commoncolours.json")
-        self.log.info("Reading common HTML colours from %s", path)
-        with open(path) as fp:
-            obj = json.load(fp)
-            obj = {n.lower(): v.lower() for n, v in obj.items()}
+        resource = resources.get_from_here("commoncolours.json")
+        self.log.info("Reading common HTML colours from %s", resource.path)
+        obj = json.loads(resource.text())
+        obj = {n.lower(): v.lower() for n, v in obj.items()}
         assert isinstance(obj, dict)
 
         # Read the dulux colours in, but don't overwrite the HTML ones.
-        path = files.in_here("duluxcolours.txt")
-        self.log.info("Reading the DULUX colour guide from %s", path)
-        with open(path) as fp:
-            for line in fp.readlines():
-                line = line.strip()
-                if not line or line.startswith("#"):
-                    continue
-
-                shade, _, rest = line.partition(" ")
-                rest, _, lrv = rest.rpartition(" ")
-                rest, _, b = rest.rpartition(" ")
-                rest, _, g = rest.rpartition(" ")
-                name, _, r = rest.rpartition(" ")
-                alt_name = name.translate({c: "" for c in string.punctuation})
-
-                hex_str = to_hex(int(r), int(g), int(b), prefix="")
-
-                shade = shade.lower()
-                hex_str = hex_str.lower()
-                name = name.lower()
-
-                if shade not in obj:
-                    obj[shade] = hex_str
-
-                if name not in obj:
-                    obj[name] = hex_str
-
-                if alt_name not in obj:
-                    obj[alt_name] = hex_str
+        resource = resources.get_from_here("duluxcolours.txt")
+        self.log.info("Reading the DULUX colour guide from %s", resource.path)
+        for line in resource.text().splitlines():
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+
+            shade, _, rest = line.partition(" ")
+            rest, _, lrv = rest.rpartition(" ")
+            rest, _, b = rest.rpartition(" ")
+            rest, _, g = rest.rpartition(" ")
+            name, _, r = rest.rpartition(" ")
+            alt_name = name.translate({c: "" for c in string.punctuation})
+
+            hex_str = to_hex(int(r), int(g), int(b), prefix="")
+
+            shade = shade.lower()
+            hex_str = hex_str.lower()
+            name = name.lower()
+
+            if shade not in obj:
+                obj[shade] = hex_str
+
+            if name not in obj:
+                obj[name] = hex_str
+
+            if alt_name not in obj:
+                obj[alt_name] = hex_str
 
         # Do this to remove case sensitivity.
         self.__data = {n: from_hex(c) for n, c in obj.items()}
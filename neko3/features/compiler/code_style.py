@@ -17,19 +17,135 @@
 A few utils to fixing code input and validating it.
 """
 import asyncio
-import os
-import shutil
-import tempfile
+import collections
+import json
+import sys
 import textwrap
-import time
+import typing
 
 import neko3.cog
+from neko3 import files
+from neko3 import logging_utils
 from neko3 import neko_commands
 from neko3 import pagination
 from . import utils
 
+WORKER_SCRIPT = files.in_here("formatter_worker.py")
+MAX_WORKERS = 2
+# Seconds a formatter may spend on one request before its worker is killed.
+REQUEST_TIMEOUT = 15
+# Workers are replaced after this many requests, so leaks in any formatter cannot build up.
+MAX_REQUESTS_PER_WORKER = 100
+# Largest response we will read from a worker, in bytes.
+MAX_RESPONSE_SIZE = 4 * 1024 * 1024
+
+
+class FormatterWorker(logging_utils.Loggable):
+    """
+    A single long-lived formatter process. Requests are sent one at a time
+    over its stdin, and responses read back from its stdout.
+    """
+
+    def __init__(self):
+        self.process: typing.Optional[asyncio.subprocess.Process] = None
+        self.requests = 0
+
+    @property
+    def is_alive(self):
+        return self.process is not None and self.process.returncode is None
+
+    async def start(self):
+        self.process = await asyncio.create_subprocess_exec(
+            sys.executable,
+            WORKER_SCRIPT,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            limit=MAX_RESPONSE_SIZE,
+        )
+        self.logger.debug("Started formatter worker %s", self.process.pid)
+
+    async def format(self, formatter, code, style=None):
+        """Formats the code, returning the resulting code and logs in a tuple."""
+        if not self.is_alive:
+            await self.start()
+
+        request = json.dumps({"formatter": formatter, "code": code, "style": style})
+        self.process.stdin.write(request.encode() + b"\n")
+        await self.process.stdin.drain()
+
+        line = await self.process.stdout.readline()
+        if not line:
+            raise RuntimeError("Formatter worker exited unexpectedly")
+
+        self.requests += 1
+        response = json.loads(line)
+        return response["code"], response["logs"]
+
+    async def close(self):
+        if self.is_alive:
+            self.logger.debug("Stopping formatter worker %s", self.process.pid)
+            self.process.kill()
+            await self.process.wait()
+
+
+class FormatterPool(logging_utils.Loggable):
+    """
+    Bounded pool of formatter workers. Idle workers are reused, and a worker is
+    replaced if it times out, fails, or has handled too many requests.
+
+    :param max_workers: the number of requests that may be handled at once.
+    :param timeout: the time in seconds each request may take.
+    :param max_requests: the number of requests a worker handles before it is replaced.
+    """
+
+    def __init__(self, max_workers=MAX_WORKERS, timeout=REQUEST_TIMEOUT, max_requests=MAX_REQUESTS_PER_WORKER):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.max_requests = max_requests
+        self._idle: typing.Deque[FormatterWorker] = collections.deque()
+        self._semaphore: typing.Optional[asyncio.Semaphore] = None
+
+    async def format(self, formatter, code, style=None):
+        """Formats the code, returning the resulting code and logs in a tuple."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_workers)
+
+        async with self._semaphore:
+            worker = self._idle.pop() if self._idle else FormatterWorker()
+
+            try:
+                result = await asyncio.wait_for(worker.format(formatter, code, style), self.timeout)
+            except asyncio.TimeoutError:
+                await worker.close()
+                return code, f"{formatter} took longer than {self.timeout}s, so was stopped."
+            except BaseException:
+                await worker.close()
+                raise
+
+            if worker.requests >= self.max_requests:
+                await worker.close()
+            else:
+                self._idle.append(worker)
+
+            return result
+
+    async def close(self):
+        """Stops every idle worker."""
+        while self._idle:
+            await self._idle.pop().close()
+
 
 class CodeStyleCog(neko3.cog.CogBase):
+    def __init__(self, bot):
+        super().__init__(bot)
+        self.formatters = FormatterPool()
+
+    def cog_unload(self):
+        super().cog_unload()
+        # Made through the bot rather than the cog, since the cog's tasks are cancelled
+        # on unload. It is still recorded against this cog in the task registry.
+        self.bot.create_task(self.formatters.close(), owner=self)
+
     @neko_commands.group(invoke_without_command=True)
     async def fix(self, ctx, *, code=None):
         """
@@ -53,89 +169,23 @@ class CodeStyleCog(neko3.cog.CogBase):
         else:
             await self.black.callback(self, ctx, code=code)
 
-    async def run_black(self, mid, code):
+    async def run_black(self, code):
         """Runs black, outputs the resulting code and logs in a tuple.."""
-        name = f"{mid}{time.perf_counter() * 1000:.0f}.py"
-
-        # noinspection PyProtectedMember
-        f = os.path.join(tempfile._candidate_tempdir_list()[0], name)
-
-        await self.run_in_thread_pool(shutil.rmtree, [f], {"ignore_errors": True})
-
-        async with self.async_open(f, "w") as fp:
-            await fp.write(code)
-
-        args = [f, "--py36", "--line-length", "80"]
-
-        p = await asyncio.create_subprocess_exec(
-            "black", *args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT
-        )
-        stdout, _ = await p.communicate()
-
-        async with self.async_open(f, "r") as fp:
-            code = await fp.read()
-
-        await self.run_in_thread_pool(shutil.rmtree, [f], {"ignore_errors": True})
+        return await self.formatters.format("black", code)
 
-        return code, stdout.decode()
-
-    async def run_pep8ify(self, mid, code):
+    async def run_pep8ify(self, code):
         """Runs PEP8ify, outputs the resulting code and logs in a tuple.."""
-        name = f"{mid}{time.perf_counter() * 1000:.0f}.py"
-
-        # noinspection PyProtectedMember
-        f = os.path.join(tempfile._candidate_tempdir_list()[0], name)
-
-        await self.run_in_thread_pool(shutil.rmtree, [f], {"ignore_errors": True})
-
-        async with self.async_open(f, "w") as fp:
-            await fp.write(code)
-
-        args = ["--print-function", "--list-fixes", "-f", "all", "-f", "maximum_line_length", "-n", "-w", f]
-
-        p = await asyncio.create_subprocess_exec(
-            "pep8ify", *args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT
-        )
-        stdout, _ = await p.communicate()
+        return await self.formatters.format("pep8ify", code)
 
-        async with self.async_open(f, "r") as fp:
-            code = await fp.read()
-
-        await self.run_in_thread_pool(shutil.rmtree, [f], {"ignore_errors": True})
-
-        return code, stdout.decode()
-
-    async def run_yapf(self, mid, style, code):
+    async def run_yapf(self, style, code):
         """Runs YAPF, outputs the resulting code and logs in a tuple.."""
-        name = f"{mid}{time.perf_counter() * 1000:.0f}.py"
-
-        # noinspection PyProtectedMember
-        f = os.path.join(tempfile._candidate_tempdir_list()[0], name)
-
-        await self.run_in_thread_pool(shutil.rmtree, [f], {"ignore_errors": True})
-
-        async with self.async_open(f, "w") as fp:
-            await fp.write(code)
-
-        args = ["--style", style.upper(), "-i", f]
+        return await self.formatters.format("yapf", code, style)
 
-        p = await asyncio.create_subprocess_exec(
-            "yapf", *args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT
-        )
-        stdout, _ = await p.communicate()
-
-        async with self.async_open(f, "r") as fp:
-            code = await fp.read()
-
-        await self.run_in_thread_pool(shutil.rmtree, [f], {"ignore_errors": True})
-
-        return code, stdout.decode()
-
-    async def blackify(self, ctx, code):
+    @staticmethod
+    async def extract_code(ctx, code):
         """
-        Blacks up the code given. If this is not successful, an error message
-        is sent to the ctx, and None is returned. Otherwise, the fixed code is
-        output instead.
+        Gets the code out of the largest code block given. If there is none, an
+        error message is sent to the ctx, and None is returned.
         """
         code = utils.largest_block_re.search(code)
         if not code:
@@ -149,10 +199,38 @@ class CodeStyleCog(neko3.cog.CogBase):
         if code.startswith("python"):
             code = code[7:]
 
-        code = textwrap.dedent(code)
+        return textwrap.dedent(code)
+
+    async def blackify(self, ctx, code):
+        """
+        Blacks up the code given. If this is not successful, an error message
+        is sent to the ctx, and None is returned. Otherwise, the fixed code is
+        output instead.
+        """
+        code = await self.extract_code(ctx, code)
+        if code is None:
+            return None
+
+        async with ctx.typing():
+            return await self.run_black(code)
+
+    async def pep8ify(self, ctx, code):
+        """Like ``blackify``, but uses PEP8ify."""
+        code = await self.extract_code(ctx, code)
+        if code is None:
+            return None
+
+        async with ctx.typing():
+            return await self.run_pep8ify(code)
+
+    async def yapfdify(self, ctx, style, code):
+        """Like ``blackify``, but uses YAPF with the given style."""
+        code = await self.extract_code(ctx, code)
+        if code is None:
+            return None
 
         async with ctx.typing():
-            return await self.run_black(ctx.message.id, code)
+            return await self.run_yapf(style, code)
 
     @staticmethod
     def formatify(code, style, ctx, author):
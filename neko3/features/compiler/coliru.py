@@ -27,6 +27,11 @@ from .toolchains import coliru
 
 
 class ColiruCog(neko3.cog.CogBase):
+    def __init__(self, bot):
+        super().__init__(bot)
+        # Gets the files the Python toolchain needs ready before the first submission.
+        self.resource_task = self.create_task(coliru.GlobalResourceManager().refresh_periodically(), long_lived=True)
+
     @neko_commands.group(
         invoke_without_command=True,
         name="coliru",
@@ -44,7 +49,21 @@ class ColiruCog(neko3.cog.CogBase):
 
         If you want to upload more than one file, or you wish to specify a
         custom build routine or flags, see `coliru a`.
+
+        Running the same code again within a few minutes shows the previous
+        output. Use `coliru fresh` to run it again anyway.
+        """
+        await self._run(ctx, code)
+
+    @coliru_group.command(name="fresh", brief="Runs the code again, even if it was run recently.")
+    async def fresh_command(self, ctx, *, code):
+        """
+        Like `coliru`, but never reuses the output of a recent identical run.
+        Use this for code whose output changes from run to run.
         """
+        await self._run(ctx, code, refresh=True)
+
+    async def _run(self, ctx, code, *, refresh=False):
 
         code = utils.code_block_re.search(code)
 
@@ -66,7 +85,11 @@ class ColiruCog(neko3.cog.CogBase):
 
         try:
             with ctx.typing():
-                output = await coliru.targets[language](source)
+                token = coliru.refresh_results.set(refresh)
+                try:
+                    output = await coliru.targets[language](source)
+                finally:
+                    coliru.refresh_results.reset(token)
         except KeyError:
             booklet = pagination.StringNavigatorFactory()
             booklet.add_line(
@@ -182,8 +205,7 @@ class ColiruCog(neko3.cog.CogBase):
             # Generate the coliru API client instance.
             c = coliru.Coliru("bash .run.sh", main, *files, verbose=True)
 
-            async with self.acquire_http_session() as http:
-                output = await c.execute(http)
+            output = await c.execute()
 
             booklet = pagination.StringNavigatorFactory(prefix="```markdown", suffix="```", max_lines=25)
 
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Nekozilla is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Nekozilla is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Nekozilla.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Long-lived formatter worker process.
+
+This is run as a script rather than imported, so that it only depends on the
+standard library and the formatters themselves. Each formatter is imported
+the first time it is used, and then kept for the lifetime of the process.
+
+Requests are read from stdin, and responses written to stdout, as one JSON
+object per line. A request looks like::
+
+    {"formatter": "black" | "yapf" | "pep8ify", "code": "...", "style": "..."}
+
+and a response looks like::
+
+    {"code": "...", "logs": "..."}
+
+If a formatter rejects the code, the code is returned unchanged and the
+reason is given in the logs.
+"""
+import json
+import sys
+import traceback
+
+LINE_LENGTH = 80
+
+_formatters = {}
+
+
+def formatter(name):
+    def decorator(func):
+        _formatters[name] = func
+        return func
+
+    return decorator
+
+
+@formatter("black")
+def run_black(code, _style):
+    import black
+
+    try:
+        mode = black.FileMode(line_length=LINE_LENGTH, target_versions={black.TargetVersion.PY36})
+        return black.format_str(code, mode=mode), "reformatted"
+    except black.NothingChanged:
+        return code, "unchanged"
+    except Exception as ex:
+        return code, f"error: cannot format: {ex}"
+
+
+@formatter("yapf")
+def run_yapf(code, style):
+    from yapf.yapflib import yapf_api
+
+    try:
+        code, changed = yapf_api.FormatCode(code, style_config=style)
+        return code, "reformatted" if changed else "unchanged"
+    except Exception as ex:
+        return code, f"error: cannot format: {ex}"
+
+
+_refactoring_tool = None
+
+
+@formatter("pep8ify")
+def run_pep8ify(code, _style):
+    global _refactoring_tool
+    from lib2to3 import refactor
+
+    if _refactoring_tool is None:
+        fixers = refactor.get_fixers_from_package("pep8ify.fixes")
+        _refactoring_tool = refactor.RefactoringTool(fixers, {"print_function": True}, explicit=fixers)
+
+    logs = ["Fixers applied:", *(f"    {fixer}" for fixer in _refactoring_tool.fixers)]
+
+    try:
+        tree = _refactoring_tool.refactor_string(code if code.endswith("\n") else code + "\n", "<code>")
+        return str(tree), "\n".join(logs)
+    except Exception as ex:
+        return code, f"error: cannot format: {ex}"
+
+
+def handle(request):
+    try:
+        code, logs = _formatters[request["formatter"]](request["code"], request.get("style"))
+        return {"code": code, "logs": logs}
+    except Exception:
+        return {"code": request.get("code", ""), "logs": traceback.format_exc()}
+
+
+def main():
+    # Formatters may print things themselves. Keep stdout for responses only.
+    responses = sys.stdout
+    sys.stdout = sys.stderr
+
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        response = handle(json.loads(line))
+        responses.write(json.dumps(response) + "\n")
+        responses.flush()
+
+
+if __name__ == "__main__":
+    main()
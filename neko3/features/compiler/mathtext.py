@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Nekozilla is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Nekozilla is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Nekozilla.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Renders LaTeX maths locally using matplotlib's mathtext engine.
+
+Mathtext only understands a subset of TeX maths, so anything using
+environments, packages, colours or line breaks is left for the remote
+renderer. This needs matplotlib to be installed; if it is not,
+``is_available`` returns False and nothing is rendered locally.
+
+The functions here are meant to be run in the process pool.
+"""
+import io
+import re
+
+from neko3.features.compiler import utils
+
+try:
+    import matplotlib
+
+    matplotlib.use("Agg")
+    from matplotlib import figure
+    from matplotlib import font_manager
+    from matplotlib import mathtext
+except ImportError:  # pragma: no cover
+    matplotlib = None
+    figure = None
+    font_manager = None
+    mathtext = None
+
+__all__ = ("is_available", "is_supported", "render", "warm_up")
+
+# Commands and syntax that mathtext cannot render.
+_unsupported = re.compile(
+    r"\\(?:begin|end|usepackage|newcommand|renewcommand|def|color|textcolor|colorbox|"
+    r"require|label|ref|tag|newline|hline|cline|multicolumn|includegraphics)\b"
+    r"|\\\\|\$|&|%"
+)
+
+
+def is_available() -> bool:
+    """True if matplotlib is installed."""
+    return mathtext is not None
+
+
+def is_supported(content: str) -> bool:
+    """True if the content looks like something mathtext can render."""
+    return is_available() and bool(content.strip()) and not _unsupported.search(content)
+
+
+def render(content: str, fg_colour: str, bg_colour: tuple, dpi: int) -> bytes:
+    """
+    Renders the content as maths, then pads it onto the given background,
+    returning the PNG bytes.
+
+    :param content: the TeX maths to render, without surrounding dollar signs.
+    :param fg_colour: the text colour, as any colour matplotlib understands.
+    :param bg_colour: the RGB or RGBA tuple to pad the image with.
+    :param dpi: the resolution to render at.
+    :raises ValueError: if mathtext cannot parse the content.
+    """
+    content = f"${content}$"
+    prop = font_manager.FontProperties()
+
+    # This is what mathtext.math_to_image does, except that it saves onto an
+    # opaque white background, which hides light text.
+    width, height, depth, *_ = mathtext.MathTextParser("path").parse(content, dpi=72, prop=prop)
+    fig = figure.Figure(figsize=(width / 72, height / 72))
+    fig.text(0, depth / height, content, fontproperties=prop, color=fg_colour)
+
+    with io.BytesIO() as fp:
+        fig.savefig(fp, dpi=dpi, format="png", transparent=True)
+        return utils.latex_image_render(fp.getvalue(), bg_colour)
+
+
+def warm_up() -> bool:
+    """Imports and initialises the font caches in this worker, so the first real render is not slow."""
+    if not is_available():
+        return False
+    render("x", "white", (0, 0, 0), 100)
+    return True
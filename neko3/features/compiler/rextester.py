@@ -45,7 +45,21 @@ class RextesterCog(neko3.cog.CogBase):
 
         Run `cc help` to view a list of the supported languages, or
         `cc help <lang>` to view the help for a specific language.
+
+        Running the same code again within a few minutes shows the previous
+        output. Use `cc fresh` to run it again anyway.
+        """
+        await self._run(ctx, source)
+
+    @rextester_group.command(name="fresh", brief="Runs the code again, even if it was run recently.")
+    async def fresh_command(self, ctx, *, source):
         """
+        Like `cc`, but never reuses the output of a recent identical run.
+        Use this for code whose output changes from run to run.
+        """
+        await self._run(ctx, source, refresh=True)
+
+    async def _run(self, ctx, source, *, refresh=False):
         code_block = utils.code_block_re.search(source)
 
         if not code_block or len(code_block.groups()) < 2:
@@ -74,7 +88,7 @@ class RextesterCog(neko3.cog.CogBase):
         lang_no = rextester.Language.__members__[language]
 
         async with ctx.typing():
-            response = await rextester.execute(lang_no, source)
+            response = await rextester.execute(lang_no, source, refresh=refresh)
 
         if response.errors:
             booklet.add_line("> ERRORS:")
@@ -16,17 +16,36 @@
 """
 Cog providing the LaTeX commands.
 """
+import asyncio
 import io
+import os
+import time
 
 import discord
 
 import neko3.cog
 from neko3 import neko_commands
+from neko3.features.compiler import mathtext
 from neko3.features.compiler import utils
 
 # URL endpoint to use.
 end_point = "http://latex.codecogs.com/"
 
+# Which renderer to use. "remote" always uses the endpoint above, "local" uses
+# mathtext for anything it supports, and "auto" uses whichever of the two has
+# been faster recently for anything mathtext supports.
+RENDERER = os.getenv("TEX_RENDERER", "auto").lower()
+
+# Weight given to the newest latency sample in the moving averages.
+LATENCY_SMOOTHING = 0.2
+
+# Every this many renders in auto mode, use the slower renderer anyway, so that
+# its latency does not go stale.
+PROBE_INTERVAL = 20
+
+# Colour we pad rendered images with, to match the Discord dark theme.
+PADDING_COLOUR = (0x36, 0x39, 0x3E)
+
 # Rendering engines
 engines = {"png", "gif", "pdf", "swf", "emf", "svg"}
 
@@ -53,7 +72,41 @@ backgrounds = {
 }
 
 
+class LatencyTracker:
+    """Exponentially weighted moving average of how long something takes, in seconds."""
+
+    def __init__(self, smoothing=LATENCY_SMOOTHING):
+        self.smoothing = smoothing
+        self.average = None
+
+    def record(self, seconds):
+        if self.average is None:
+            self.average = seconds
+        else:
+            self.average += self.smoothing * (seconds - self.average)
+
+
 class TeXCog(neko3.cog.CogBase):
+    def __init__(self, bot):
+        super().__init__(bot)
+        self.local_latency = LatencyTracker()
+        self.remote_latency = LatencyTracker()
+        self.auto_renders = 0
+        if RENDERER != "remote" and mathtext.is_available():
+            self.create_task(self.warm_up())
+
+    async def warm_up(self):
+        # Load matplotlib in each process worker ahead of time. We cannot pick
+        # which worker gets each call, but one per CPU covers most of them.
+        workers = len(os.sched_getaffinity(0)) or 4
+        results = await asyncio.gather(
+            *(self.run_in_process_pool(mathtext.warm_up) for _ in range(workers)), return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                self.logger.warning("Could not warm up local LaTeX renderer", exc_info=result)
+                break
+
     @neko_commands.command(
         name="tex",
         aliases=["latex", "texd", "latexd"],
@@ -151,7 +204,32 @@ class TeXCog(neko3.cog.CogBase):
 
         return await self.run_in_process_pool(utils.latex_image_render, [in_img, bg_colour])
 
-    async def get_send_image(self, ctx, content: str) -> discord.Message:
+    def should_render_locally(self, content: str) -> bool:
+        if RENDERER == "remote" or not mathtext.is_supported(content):
+            return False
+        elif RENDERER == "local":
+            return True
+
+        # Measure each renderer at least once before comparing them.
+        local, remote = self.local_latency.average, self.remote_latency.average
+        if local is None:
+            return True
+        elif remote is None:
+            return False
+
+        self.auto_renders += 1
+        prefer_local = local <= remote
+        return prefer_local if self.auto_renders % PROBE_INTERVAL else not prefer_local
+
+    async def render_locally(self, content: str) -> bytes:
+        start = time.perf_counter()
+        data = await self.run_in_process_pool(mathtext.render, [content, "white", PADDING_COLOUR, 200])
+        self.local_latency.record(time.perf_counter() - start)
+        return data
+
+    async def render_remotely(self, content: str) -> bytes:
+        start = time.perf_counter()
+
         # Append a tex newline to the start to force the content to
         # left-align.
         url = self.generate_url(f"\\\\{content}", size=10)
@@ -161,12 +239,29 @@ class TeXCog(neko3.cog.CogBase):
                 resp.raise_for_status()
                 data = await resp.read()
 
+        self.remote_latency.record(time.perf_counter() - start)
+
         with io.BytesIO(data) as in_data:
             in_data.seek(0)
-            out_data = io.BytesIO(await self.pad_convert_image(in_data, (0x36, 0x39, 0x3E)))
-            out_data.seek(0)
-            file = discord.File(out_data, "latex.png")
+            return await self.pad_convert_image(in_data, PADDING_COLOUR)
+
+    async def get_send_image(self, ctx, content: str) -> discord.Message:
+        data = None
+
+        if self.should_render_locally(content):
+            try:
+                data = await self.render_locally(content)
+            except ValueError as ex:
+                # Mathtext did not understand it after all.
+                self.logger.debug("Rendering locally failed, so will render remotely: %s", ex)
+
+        if data is None:
+            data = await self.render_remotely(content)
+
+        out_data = io.BytesIO(data)
+        out_data.seek(0)
+        file = discord.File(out_data, "latex.png")
 
-            msg = await ctx.send(content=f"{ctx.author}:", file=file)
+        msg = await ctx.send(content=f"{ctx.author}:", file=file)
 
-            return msg
+        return msg
@@ -21,13 +21,20 @@ Reverse engineered from: http://coliru.stacked-crooked.com/
 https://docs.google.com/document/d/18md3rLdgD9f5Wro3i7YYopJBFb_6MPCO8-0ihtxHoyM
 """
 import asyncio
+import contextvars
 import json
+import os
 from dataclasses import dataclass
 from typing import Dict
 
+import aiohttp
+
+from neko3 import caching
+from neko3 import logging_utils
 from neko3.features.compiler import utils
+from neko3.features.compiler.toolchains import local
 
-__all__ = ("HOST", "SourceFile", "Coliru")
+__all__ = ("HOST", "SourceFile", "Coliru", "refresh_results")
 
 HOST = "http://coliru.stacked-crooked.com"
 SHARE_EP = "/share"
@@ -36,6 +43,24 @@ COMPILE_EP = "/compile"
 SHARE_ARCHIVE_DIR = "/Archive2"
 INITL_FILE_NAME = "main.cpp"
 
+# Identical submissions within this many seconds reuse the previous output.
+RESULT_TTL = 10 * 60
+MAX_CACHED_RESULTS = 256
+
+results = caching.AsyncResultCache(RESULT_TTL, MAX_CACHED_RESULTS)
+
+#: Set to True to run jobs again rather than reuse recent output, such as for
+#: programs whose output changes from run to run. This is a context variable
+#: since jobs are made deep inside each language's configuration.
+refresh_results = contextvars.ContextVar("refresh_results", default=False)
+
+# Where to run jobs. "remote" always uses Coliru, "local" always uses a local
+# sandbox, and "auto" uses the local sandbox when it has an idle worker, and
+# otherwise uses Coliru unless it is unreachable.
+BACKEND = os.getenv("COLIRU_BACKEND", "remote").lower()
+
+local_sandbox = local.LocalSandbox()
+
 
 @dataclass()
 class SourceFile:
@@ -63,7 +88,7 @@ class SourceFile:
         return hash(self.name + self.code)
 
 
-class Coliru:
+class Coliru(logging_utils.Loggable):
     """
     Handles "running" an instance of Coliru.
     """
@@ -126,25 +151,67 @@ class Coliru:
 
         return "\n".join(script_lines)
 
-    async def execute(self, session, loop=asyncio.get_event_loop()) -> str:
+    def fingerprint(self) -> str:
+        """Content-addressed key for the build script and every file in this job."""
+        parts = [self.shell_script, str(self.verbose)]
+        for file in self.files:
+            parts.append(file.name)
+            parts.append(file.code)
+        return utils.fingerprint(*parts)
+
+    async def execute(self, loop=asyncio.get_event_loop()) -> str:
         """
         Collects the data we need and sends it to coliru for processing.
         This will then return a string containing the full output.
+
+        Identical jobs that were run recently reuse the previous output,
+        unless ``refresh_results`` is set, and identical jobs that are running
+        right now share the same request. Since the request may outlive whoever started it, it opens its own
+        HTTP session rather than borrowing one from the caller.
         """
-        # Generate futures then await them together.
-        futures = []
-        for file in self.other_files:
-            futures.append(loop.create_task(self._share(session, file)))
+        return await results.get_or_compute(
+            self.fingerprint(), lambda: self._execute(loop), refresh=refresh_results.get()
+        )
 
-        results = await asyncio.gather(*futures, loop=loop)
+    async def _execute(self, loop) -> str:
+        if BACKEND == "local":
+            return await self._execute_locally()
 
-        files = {file: path for file, path in results}
-        files[self.main_file] = INITL_FILE_NAME
+        if BACKEND != "auto" or not local_sandbox.is_available():
+            return await self._execute_remotely(loop)
 
-        script = self._generate_script(files)
+        if local_sandbox.has_idle_worker:
+            return await self._execute_locally()
 
-        payload = json.dumps({"cmd": script, "src": self.main_file.code})
+        try:
+            return await self._execute_remotely(loop)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as ex:
+            if local_sandbox.is_saturated:
+                raise
+            self.logger.warning("Coliru is unavailable (%s), so running job locally instead", ex)
+            return await self._execute_locally()
 
-        resp = await session.post(f"{HOST}{COMPILE_EP}", data=payload)
-        resp.raise_for_status()
-        return (await resp.read()).decode("utf-8", "ignore")
+    async def _execute_locally(self) -> str:
+        return await local_sandbox.run(
+            self.shell_script, {file.name: file.code for file in self.files}, verbose=self.verbose
+        )
+
+    async def _execute_remotely(self, loop) -> str:
+        async with aiohttp.ClientSession() as session:
+            # Generate futures then await them together.
+            futures = []
+            for file in self.other_files:
+                futures.append(loop.create_task(self._share(session, file)))
+
+            results = await asyncio.gather(*futures, loop=loop)
+
+            files = {file: path for file, path in results}
+            files[self.main_file] = INITL_FILE_NAME
+
+            script = self._generate_script(files)
+
+            payload = json.dumps({"cmd": script, "src": self.main_file.code})
+
+            async with session.post(f"{HOST}{COMPILE_EP}", data=payload) as resp:
+                resp.raise_for_status()
+                return (await resp.read()).decode("utf-8", "ignore")
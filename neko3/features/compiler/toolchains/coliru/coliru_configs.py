@@ -20,12 +20,20 @@ Reverse engineered from: http://coliru.stacked-crooked.com/
 
 https://docs.google.com/document/d/18md3rLdgD9f5Wro3i7YYopJBFb_6MPCO8-0ihtxHoyM
 """
+import asyncio
+import collections
+import hashlib
+import json
+import os
+import time
+
 import aiofiles
 import aiohttp
 
 import neko3.cog
 from neko3 import files
 from neko3 import logging_utils
+from neko3 import resources
 from neko3 import singleton
 from .api import *
 
@@ -35,36 +43,153 @@ _ffstring_url = _asottile_base + "/future-fstrings/master/future_fstrings.py"
 _trt_url = _asottile_base + "/tokenize-rt/master/tokenize_rt.py"
 _replify_path = files.in_here("replify.py")
 
+# Bump this if the cache layout changes, so old files are ignored.
+RESOURCE_CACHE_VERSION = 1
+# How often to check for newer copies of downloaded resources, in seconds.
+RESOURCE_REFRESH_INTERVAL = 24 * 60 * 60
+
+RemoteResource = collections.namedtuple("RemoteResource", "name url")
+
+remote_resources = {
+    "ffstrings": RemoteResource("future_fstrings.py", _ffstring_url),
+    "trt": RemoteResource("tokenize_rt.py", _trt_url),
+}
+
+
+def _sha256(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
 
 class GlobalResourceManager(logging_utils.Loggable, metaclass=singleton.SingletonMeta):
+    """
+    Provides the extra files that the Python toolchain uploads with each
+    submission.
+
+    Downloaded files are persisted to the cache directory along with their
+    SHA-256 hash, so they only have to be downloaded once rather than after
+    every restart. Call ``preload`` when the cog loads to have them ready
+    before anyone needs them, and ``refresh_periodically`` to pick up any
+    new versions in the background.
+    """
+
     def __init__(self):
-        self._ffstrings = None
-        self._trt = None
-        self._replify = None
+        self._resources = {}
+        self._in_flight = {}
+
+    @staticmethod
+    def _cache_path(resource):
+        return files.in_cache_dir("coliru", f"v{RESOURCE_CACHE_VERSION}", resource.name)
+
+    async def _load_from_disk(self, resource):
+        path = self._cache_path(resource)
+        try:
+            async with aiofiles.open(path) as fp:
+                text = await fp.read()
+            async with aiofiles.open(path + ".json") as fp:
+                metadata = json.loads(await fp.read())
+        except (OSError, ValueError):
+            return None
+
+        if metadata.get("url") != resource.url or metadata.get("sha256") != _sha256(text):
+            self.logger.warning("Discarding cached copy of %s as it failed verification", resource.url)
+            return None
+
+        return text, metadata
+
+    async def _save_to_disk(self, resource, text, metadata):
+        path = self._cache_path(resource)
+        # Write to temporary files first, so a crash never leaves a half written file behind.
+        for file_name, content in ((path, text), (path + ".json", json.dumps(metadata))):
+            async with aiofiles.open(file_name + ".tmp", "w") as fp:
+                await fp.write(content)
+            os.replace(file_name + ".tmp", file_name)
+
+    async def _download(self, resource, metadata=None):
+        """
+        Downloads the resource, and saves it to disk. If metadata from an
+        existing copy is given, this is only downloaded again if it changed.
+        """
+        headers = {}
+        if metadata and metadata.get("etag"):
+            headers["If-None-Match"] = metadata["etag"]
+
+        async with aiohttp.ClientSession() as session:
+            async with session.get(resource.url, headers=headers) as resp:
+                self.logger.info("Fetching %s", resource.url)
+                if resp.status == 304:
+                    return None
+                resp.raise_for_status()
+                text = await resp.text()
+                etag = resp.headers.get("ETag")
+
+        metadata = {"url": resource.url, "sha256": _sha256(text), "etag": etag, "fetched_at": time.time()}
+        await self._save_to_disk(resource, text, metadata)
+        self._resources[resource] = text, metadata
+        return text
+
+    async def _obtain(self, resource):
+        if resource not in self._resources:
+            cached = await self._load_from_disk(resource)
+            if cached is not None:
+                self._resources[resource] = cached
+
+        if resource in self._resources:
+            text, _ = self._resources[resource]
+            return text
+
+        return await self._download(resource)
+
+    async def obtain(self, key):
+        """
+        Gets the resource with the given key in ``remote_resources``. Only
+        the first concurrent caller does any work; the rest wait for it.
+        """
+        resource = remote_resources[key]
+        if resource in self._resources:
+            text, _ = self._resources[resource]
+            return text
+
+        if resource not in self._in_flight:
+            self._in_flight[resource] = asyncio.ensure_future(self._obtain(resource))
+            self._in_flight[resource].add_done_callback(lambda _: self._in_flight.pop(resource, None))
+
+        return await asyncio.shield(self._in_flight[resource])
 
     async def obtain_ffstrings(self):
-        if self._ffstrings is None:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(_ffstring_url) as resp:
-                    self.logger.info("Fetching %s", _ffstring_url)
-                    resp.raise_for_status()
-                    self._ffstrings = await resp.text()
-        return self._ffstrings
+        return await self.obtain("ffstrings")
 
     async def obtain_trt(self):
-        if self._trt is None:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(_trt_url) as resp:
-                    self.logger.info("Fetching %s", _trt_url)
-                    resp.raise_for_status()
-                    self._trt = await resp.text()
-        return self._trt
+        return await self.obtain("trt")
 
     async def obtain_replify(self):
-        if self._replify is None:
-            async with aiofiles.open(_replify_path) as fp:
-                self._replify = await fp.read()
-        return self._replify
+        return resources.registry.get(_replify_path).text()
+
+    async def preload(self):
+        """Loads every resource from disk, downloading any that are missing."""
+        results = await asyncio.gather(*map(self.obtain, remote_resources), return_exceptions=True)
+        for key, result in zip(remote_resources, results):
+            if isinstance(result, Exception):
+                self.logger.warning("Could not preload %s: %s", remote_resources[key].url, result)
+
+    async def refresh(self):
+        """Downloads any resources that have changed since they were last fetched."""
+        for resource in remote_resources.values():
+            _, metadata = self._resources.get(resource, (None, None))
+            try:
+                await self._download(resource, metadata)
+            except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as ex:
+                # Keep using the copy we already have.
+                self.logger.warning("Could not refresh %s: %s", resource.url, ex)
+            except Exception:
+                # Such as a response we could not decode. Keep the copy we have, and keep refreshing.
+                self.logger.exception("Unexpected error refreshing %s", resource.url)
+
+    async def refresh_periodically(self):
+        """Preloads everything, then refreshes it every ``RESOURCE_REFRESH_INTERVAL`` seconds until cancelled."""
+        await self.preload()
+        while True:
+            await asyncio.sleep(RESOURCE_REFRESH_INTERVAL)
+            await self.refresh()
 
 
 # Maps human readable languages to their syntax highlighting strings.
@@ -157,8 +282,7 @@ async def c(source):
 
     cc = Coliru("make -f Makefile", make, main)
 
-    async with aiohttp.ClientSession() as cs:
-        return await cc.execute(cs)
+    return await cc.execute()
 
 
 @register("c++", "cc", language="C++")
@@ -217,8 +341,7 @@ async def cpp(source):
     make = SourceFile("Makefile", f"all:\n    {compiler_invocation}\n    {execute}\n")
 
     cc = Coliru("make -f Makefile", make, main)
-    async with aiohttp.ClientSession() as session:
-        return await cc.execute(session)
+    return await cc.execute()
 
 
 @register("python2.7", "py2", "py2.7", language="Python2")
@@ -232,8 +355,7 @@ async def python2(source):
     """
     script = 'python main.py; echo "Returned $?"'
     cc = Coliru(script, SourceFile("main.py", source))
-    async with aiohttp.ClientSession() as cs:
-        return await cc.execute(cs)
+    return await cc.execute()
 
 
 @register("python3", "python3.5", "py", "py3", "py3.5", language="Python")
@@ -252,29 +374,27 @@ async def python(source):
     <https://github.com/asottile/tokenize-rt> for more details on
     how the f-string support is backported and implemented.
     """
-    async with aiohttp.ClientSession() as cs:
-
-        manager = GlobalResourceManager()
-
-        source_files = [
-            SourceFile("main.py", source),
-            SourceFile("tokenize_rt.py", await manager.obtain_trt()),
-            SourceFile("future_fstrings.py", await manager.obtain_ffstrings()),
-        ]
-
-        if any(source.strip().startswith(x) for x in ("#repl\n", "# repl\n", "#repr\n", "# repr\n")):
-            source_files.append(SourceFile("replify.py", await manager.obtain_replify()))
-            script = (
-                'echo "Trying experimental REPL support!"; '
-                "python3.5 future_fstrings.py main.py | python3.5 replify.py; "
-                'echo "Returned $?"'
-            )
-        else:
-            script = "python3.5 future_fstrings.py main.py | python3.5; " 'echo "Returned $?"'
+    manager = GlobalResourceManager()
+
+    source_files = [
+        SourceFile("main.py", source),
+        SourceFile("tokenize_rt.py", await manager.obtain_trt()),
+        SourceFile("future_fstrings.py", await manager.obtain_ffstrings()),
+    ]
+
+    if any(source.strip().startswith(x) for x in ("#repl\n", "# repl\n", "#repr\n", "# repr\n")):
+        source_files.append(SourceFile("replify.py", await manager.obtain_replify()))
+        script = (
+            'echo "Trying experimental REPL support!"; '
+            "python3.5 future_fstrings.py main.py | python3.5 replify.py; "
+            'echo "Returned $?"'
+        )
+    else:
+        script = "python3.5 future_fstrings.py main.py | python3.5; " 'echo "Returned $?"'
 
-        cc = Coliru(script, *source_files)
+    cc = Coliru(script, *source_files)
 
-        return await cc.execute(cs)
+    return await cc.execute()
 
 
 @register("pl", language="PERL 5")
@@ -294,10 +414,9 @@ async def perl(source):
     print "\n";
     ```
     """
-    async with aiohttp.ClientSession() as cs:
-        script = "perl main.pl"
-        cc = Coliru(script, SourceFile("main.pl", source))
-        return await cc.execute(cs)
+    script = "perl main.pl"
+    cc = Coliru(script, SourceFile("main.pl", source))
+    return await cc.execute()
 
 
 @register("irb", language="Ruby")
@@ -329,8 +448,7 @@ async def ruby(source):
     """
     script = "ruby main.rb"
     cc = Coliru(script, SourceFile("main.rb", source))
-    async with aiohttp.ClientSession() as cs:
-        return await cc.execute(cs)
+    return await cc.execute()
 
 
 @register("shell", language="Shell")
@@ -344,8 +462,7 @@ async def sh(source):
     """
     script = 'sh main.sh; echo "Returned $?"'
     cc = Coliru(script, SourceFile("main.sh", source))
-    async with aiohttp.ClientSession() as cs:
-        return await cc.execute(cs)
+    return await cc.execute()
 
 
 @register(language="Bash")
@@ -359,8 +476,7 @@ async def bash(source):
     """
     script = 'bash main.sh; echo "Returned $?"'
     cc = Coliru(script, SourceFile("main.sh", source))
-    async with aiohttp.ClientSession() as cs:
-        return await cc.execute(cs)
+    return await cc.execute()
 
 
 # Fortran libs are missing... go figure.
@@ -394,8 +510,7 @@ async def fortran(source):
     """
     script = 'gfortran main.f08 && ./a.out; echo "Returned $?"'
     cc = Coliru(script, SourceFile("main.f08", source))
-    async with aiohttp.ClientSession() as cs:
-        return await cc.execute(cs)
+    return await cc.execute()
 
 
 # @register('gfortran90', 'f90', language='Fortran 1990')
@@ -422,8 +537,7 @@ async def fortran90(source):
     """
     script = 'gfortran main.f90 && ./a.out; echo "Returned $?"'
     cc = Coliru(script, SourceFile("main.f90", source))
-    async with aiohttp.ClientSession() as cs:
-        return await cc.execute(cs)
+    return await cc.execute()
 
 
 # @register('gfortran95', 'f95', language='Fortran 1995')
@@ -450,8 +564,7 @@ async def fortran95(source):
     """
     script = 'gfortran main.f95 && ./a.out; echo "Returned $?"'
     cc = Coliru(script, SourceFile("main.f95", source))
-    async with aiohttp.ClientSession() as cs:
-        return await cc.execute(cs)
+    return await cc.execute()
 
 
 @register("gawk", language="GNU Awk")
@@ -472,8 +585,7 @@ async def awk(source):
     """
     script = 'awk -f main.awk; echo "Returned $?"'
     cc = Coliru(script, SourceFile("main.awk", source))
-    async with aiohttp.ClientSession() as cs:
-        return await cc.execute(cs)
+    return await cc.execute()
 
 
 @register(language="Lua")
@@ -497,8 +609,7 @@ async def lua(source):
     """
     script = 'lua main.lua; echo "Returned $?"'
     cc = Coliru(script, SourceFile("main.lua", source))
-    async with aiohttp.ClientSession() as cs:
-        return await cc.execute(cs)
+    return await cc.execute()
 
 
 @register("makefile", language="GNU Make")
@@ -534,5 +645,4 @@ async def make(source):
     """
     script = 'make -f Makefile; echo "Returned $?"'
     cc = Coliru(script, SourceFile("Makefile", source))
-    async with aiohttp.ClientSession() as cs:
-        return await cc.execute(cs)
+    return await cc.execute()
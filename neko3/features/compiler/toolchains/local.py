@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Nekozilla is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Nekozilla is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Nekozilla.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Runs build scripts in local subprocesses rather than on a remote service.
+
+Each job gets a fresh temporary directory holding its files, and runs under
+resource limits on CPU time, memory, file size and output size. Only a
+bounded number of jobs run at once; the rest queue.
+
+Resource limits are not a security boundary. Only enable this on a machine
+(or in a container) you are happy for anyone using the bot to run code on.
+"""
+import asyncio
+import os
+import shutil
+import signal
+import sys
+import tempfile
+import typing
+
+from neko3 import logging_utils
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    # Not a POSIX system.
+    resource = None
+
+__all__ = ("LocalSandbox",)
+
+MAX_WORKERS = int(os.getenv("LOCAL_SANDBOX_WORKERS", 2))
+# Prefer another backend once this many jobs are waiting for a worker.
+MAX_QUEUE_DEPTH = 4
+
+CPU_TIME_LIMIT = 10  # seconds
+WALL_TIME_LIMIT = 20  # seconds
+MEMORY_LIMIT = 512 * 1024 * 1024  # bytes
+FILE_SIZE_LIMIT = 16 * 1024 * 1024  # bytes
+OPEN_FILES_LIMIT = 256
+OUTPUT_LIMIT = 64 * 1024  # bytes
+# How long to wait for a killed script to release its output pipe.
+KILL_GRACE_PERIOD = 2  # seconds
+# How often to check whether a script has exited.
+EXIT_POLL_INTERVAL = 0.05  # seconds
+
+# Interpreters named by the remote configurations that may only exist locally
+# under a different name.
+COMMAND_FALLBACKS = {"python3.5": "python3"}
+
+
+# Resource limits applied to each script, as (resource module name, limit).
+RESOURCE_LIMITS = (
+    ("RLIMIT_CPU", CPU_TIME_LIMIT),
+    ("RLIMIT_AS", MEMORY_LIMIT),
+    ("RLIMIT_FSIZE", FILE_SIZE_LIMIT),
+    ("RLIMIT_NOFILE", OPEN_FILES_LIMIT),
+    ("RLIMIT_CORE", 0),
+)
+
+# Applies the limits passed as NAME=VALUE arguments, then execs whatever follows
+# "--". This runs as its own program rather than as a preexec_fn, which is not
+# safe to use once the bot has started any threads.
+_LIMIT_WRAPPER = """\
+import os, resource, sys
+args = sys.argv[1:]
+while args[0] != "--":
+    name, limit = args.pop(0).split("=")
+    resource.setrlimit(getattr(resource, name), (int(limit), int(limit)))
+os.execvp(args[1], args[1:])
+"""
+
+
+def _limited_command(*command: str) -> typing.List[str]:
+    # -I keeps the sandbox directory off sys.path, so files written there cannot
+    # shadow the modules the wrapper imports.
+    limits = [f"{name}={limit}" for name, limit in RESOURCE_LIMITS]
+    return [sys.executable, "-I", "-c", _LIMIT_WRAPPER, *limits, "--", *command]
+
+
+class LocalSandbox(logging_utils.Loggable):
+    """
+    Bounded pool of local subprocess workers that run bash build scripts.
+
+    :param max_workers: the number of jobs that may run at once.
+    """
+
+    def __init__(self, max_workers: int = MAX_WORKERS) -> None:
+        self.max_workers = max_workers
+        self.running = 0
+        self.waiting = 0
+        self._semaphore: typing.Optional[asyncio.Semaphore] = None
+
+    @property
+    def queue_depth(self) -> int:
+        """The number of jobs waiting for a worker to become free."""
+        return self.waiting
+
+    @property
+    def is_saturated(self) -> bool:
+        """True if a new job would have to wait behind too many others."""
+        return self.running >= self.max_workers and self.waiting >= MAX_QUEUE_DEPTH
+
+    @property
+    def has_idle_worker(self) -> bool:
+        return self.running < self.max_workers
+
+    @staticmethod
+    def is_available() -> bool:
+        """True if this platform can run jobs locally at all."""
+        return resource is not None and shutil.which("bash") is not None
+
+    def _preamble(self, verbose: bool) -> typing.List[str]:
+        lines = ["#!/bin/bash"]
+        for command, fallback in COMMAND_FALLBACKS.items():
+            if shutil.which(command) is None and shutil.which(fallback) is not None:
+                lines.append(f'{command}() {{ {fallback} "$@"; }}')
+        lines.append("set -x" if verbose else "")
+        return lines
+
+    async def run(self, script: str, files: typing.Mapping[str, str], *, verbose: bool = False) -> str:
+        """
+        Writes the files into a new temporary directory, then runs the script
+        there with bash, returning the combined stdout and stderr.
+
+        :param script: the bash script to run.
+        :param files: mapping of file names to their contents.
+        :param verbose: true to echo each command as it is run.
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_workers)
+
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.running += 1
+        try:
+            with tempfile.TemporaryDirectory(prefix="neko3-sandbox-") as directory:
+                for name, code in files.items():
+                    path = os.path.join(directory, os.path.basename(name))
+                    with open(path, "w") as fp:
+                        fp.write(code)
+
+                with open(os.path.join(directory, ".sandbox.sh"), "w") as fp:
+                    fp.write("\n".join([*self._preamble(verbose), script]))
+
+                return await self._run_process(directory)
+        finally:
+            self.running -= 1
+            self._semaphore.release()
+
+    async def _run_process(self, directory: str) -> str:
+        env = {"PATH": os.getenv("PATH", "/usr/bin:/bin"), "HOME": directory, "LANG": "C.UTF-8"}
+
+        process = await asyncio.create_subprocess_exec(
+            *_limited_command("bash", ".sandbox.sh"),
+            cwd=directory,
+            env=env,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+            start_new_session=True,
+        )
+
+        output = bytearray()
+        reader = asyncio.ensure_future(self._read_limited(process.stdout, output))
+        exited = asyncio.ensure_future(self._wait_for_exit(process))
+        deadline = asyncio.get_event_loop().time() + WALL_TIME_LIMIT
+
+        try:
+            # Stop once the script exits, even if something it left running in the
+            # background is still holding the pipe open, or once it writes too much.
+            await asyncio.wait((reader, exited), timeout=WALL_TIME_LIMIT, return_when=asyncio.FIRST_COMPLETED)
+            if reader.done() and len(output) <= OUTPUT_LIMIT:
+                # The pipe closed, so the script is about to exit.
+                await asyncio.wait((exited,), timeout=max(0, deadline - asyncio.get_event_loop().time()))
+        finally:
+            # Anything the script left running in the background goes too.
+            await self._kill(process, reader, exited)
+
+        truncated = len(output) > OUTPUT_LIMIT
+        timed_out = not truncated and exited.cancelled()
+        text = output[:OUTPUT_LIMIT].decode("utf-8", "ignore")
+
+        if truncated:
+            text += f"\n... output truncated after {OUTPUT_LIMIT} bytes."
+        elif timed_out:
+            text += f"\nKilled after exceeding the {WALL_TIME_LIMIT}s time limit."
+        elif exited.result() < 0:
+            text += f"\nKilled by signal {-exited.result()}."
+
+        return text
+
+    @staticmethod
+    async def _wait_for_exit(process) -> int:
+        # Not process.wait(), which on newer Pythons also waits for the pipe to
+        # close, and something left running in the background can hold it open.
+        while process.returncode is None:
+            await asyncio.sleep(EXIT_POLL_INTERVAL)
+        return process.returncode
+
+    @staticmethod
+    async def _read_limited(stream, output: bytearray) -> None:
+        # Reads until EOF, or until one byte past the limit so we know it was exceeded.
+        # The output is collected as it arrives, so it is still there if we give up early.
+        while len(output) <= OUTPUT_LIMIT:
+            chunk = await stream.read(OUTPUT_LIMIT + 1 - len(output))
+            if not chunk:
+                break
+            output += chunk
+
+    @staticmethod
+    async def _kill(process, reader: asyncio.Future, exited: asyncio.Future) -> None:
+        # Only the script's exit tells us it finished in time, so leave no doubt if it did not.
+        if not exited.done():
+            exited.cancel()
+
+        try:
+            # The script runs in its own session, so this takes out anything it spawned too.
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+        # Collect whatever was written before the kill, then reap the process. Something
+        # that escaped the session could hold the pipe open, so do not wait forever.
+        for awaitable in (reader, process.wait()):
+            try:
+                await asyncio.wait_for(awaitable, KILL_GRACE_PERIOD)
+            except asyncio.TimeoutError:
+                pass
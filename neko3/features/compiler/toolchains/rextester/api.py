@@ -28,6 +28,9 @@ from typing import List
 
 import aiohttp
 
+from neko3 import caching
+from neko3.features.compiler import utils
+
 # Forces simple editor in any response. Not really relevant, but required
 # nonetheless. Layout forces vertical layout. Again, doesn't have much
 # relevance to what we are doing.
@@ -37,6 +40,12 @@ LAYOUT = 1
 # Code endpoint to post to
 ENDPOINT = "https://rextester.com/rundotnet/Run"
 
+# Identical submissions within this many seconds reuse the previous response.
+RESULT_TTL = 10 * 60
+MAX_CACHED_RESULTS = 256
+
+results = caching.AsyncResultCache(RESULT_TTL, MAX_CACHED_RESULTS)
+
 
 # view-source:http://rextester.com/l/common_lisp_online_compiler:466
 class Language(enum.IntEnum):
@@ -126,15 +135,28 @@ COMPILER_ARGS = collections.defaultdict(
 SOURCE_TRANSFORMATIONS = collections.defaultdict(lambda: lambda source: source, {})
 
 
-async def execute(lang: Language, source: str, compiler_args: str = None) -> RextesterResponse:
+async def execute(
+    lang: Language, source: str, compiler_args: str = None, *, refresh: bool = False
+) -> RextesterResponse:
     """
     Executes the given source code as the given language under rextester
     :param sesh: the aiohttp session to use.
     :param lang: the language to compile as.
     :param source: the source to compile.
     :param compiler_args: optional compiler args. Only applicable for C/C++
+    :param refresh: true to run the submission again even if it was run recently.
     :return: the response.
+
+    Identical submissions that were run recently reuse the previous response,
+    and identical submissions that are running right now share the same
+    request.
     """
+    compiler_args = compiler_args or COMPILER_ARGS[lang]
+    key = utils.fingerprint(str(lang.value), compiler_args, source)
+    return await results.get_or_compute(key, lambda: _execute(lang, source, compiler_args), refresh=refresh)
+
+
+async def _execute(lang: Language, source: str, compiler_args: str) -> RextesterResponse:
     transformer = SOURCE_TRANSFORMATIONS[lang.value]
     source = transformer(source)
 
@@ -155,10 +177,7 @@ async def execute(lang: Language, source: str, compiler_args: str = None) -> Rex
         "CodeGuid": "",
     }
 
-    if compiler_args:
-        form_args["CompilerArgs"] = compiler_args
-    else:
-        form_args["CompilerArgs"] = COMPILER_ARGS[lang]
+    form_args["CompilerArgs"] = compiler_args
 
     async with aiohttp.ClientSession() as session:
         async with session.post(ENDPOINT, data=form_args) as resp:
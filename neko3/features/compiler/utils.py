@@ -17,6 +17,7 @@
 Other utility bits and pieces.
 """
 import asyncio
+import hashlib
 import io
 import re
 
@@ -78,6 +79,20 @@ def fix_makefile(input_code: str) -> str:
     return "\n".join(strings)
 
 
+def fingerprint(*parts: str) -> str:
+    """
+    Produces a content-addressed key for a submission from its language, flags
+    and sources. This hashes exactly what is submitted, since even trailing
+    whitespace can change what a program does.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        # Separator, so ("ab", "c") and ("a", "bc") do not collide.
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
 async def start_and_listen_to_edit(ctx, booklet: pagination.BaseNavigator = None, *additional_messages):
     # Lets the book start up first, otherwise we get an error. If
     # we cant send, then just give up.
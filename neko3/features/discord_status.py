@@ -15,11 +15,20 @@
 """
 Discord service status.
 
+The status page is polled in the background and the parsed result is kept in
+memory, so the command can render straight away. Polling slows down while
+nobody is using the command.
+
 Ported from Nekozilla V1
 """
 import asyncio
+import collections
+import contextlib
 import datetime
+import functools
+import os
 import re
+import time
 import typing
 
 import aiohttp
@@ -35,6 +44,17 @@ api_version = "v2"
 # Max fields per page on short pages
 max_fields = 4
 
+# Seconds between polls while the command is being used.
+poll_interval = float(os.getenv("DISCORD_STATUS_POLL_INTERVAL", 60))
+# Polling backs off exponentially up to this many seconds while nobody is using the command.
+max_poll_interval = 30 * 60
+# Seconds since the command was last used before we consider everyone to be idle.
+idle_after = 10 * 60
+# Seconds to wait for the first poll to complete before giving up on the command.
+first_poll_timeout = 30
+
+StatusSnapshot = collections.namedtuple("StatusSnapshot", "status components incidents sms fetched_at")
+
 
 class ListMix(list):
     """Quicker than replacing a bunch of internal calls. I know this is inefficient anyway."""
@@ -110,6 +130,7 @@ def make_incident_body(incident):
     )
 
 
+@functools.lru_cache(maxsize=1024)
 def parse_timestamp(timestamp):
     """
     Discord use a timestamp that is not compatible with Python by
@@ -117,6 +138,8 @@ def parse_timestamp(timestamp):
 
     Expected format: YYYY-mm-ddTHH:MM:SS.sss(sss)?[+-]hh:mm
 
+    The same timestamps turn up on every poll, so results are memoized.
+
     :param timestamp: timestamp to parse.
     :return: datetime object.
     """
@@ -161,6 +184,57 @@ class DiscordServiceStatusCog(neko3.cog.CogBase):
     Holds the service status command.
     """
 
+    def __init__(self, bot):
+        super().__init__(bot)
+        self.snapshot: typing.Optional[StatusSnapshot] = None
+        self.last_requested = float("-inf")
+        # Maps incident IDs to the raw updated_at value and the parsed incident.
+        self.parsed_incidents: typing.Dict[str, typing.Tuple[str, dict]] = {}
+        self.wake_up = asyncio.Event()
+        self.snapshot_ready = asyncio.Event()
+        self.poll_task = self.create_task(self._poll(), long_lived=True)
+
+    def _next_poll_interval(self, interval):
+        if time.monotonic() - self.last_requested > idle_after:
+            return min(interval * 2, max_poll_interval)
+        else:
+            return poll_interval
+
+    async def _poll(self):
+        interval = poll_interval
+
+        async with aiohttp.ClientSession() as session:
+            while True:
+                try:
+                    self.snapshot = await self._fetch_snapshot(session)
+                    self.snapshot_ready.set()
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    self.logger.exception("Failed to poll the Discord status page")
+
+                interval = self._next_poll_interval(interval)
+                self.wake_up.clear()
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(self.wake_up.wait(), interval)
+
+    async def _fetch_snapshot(self, session):
+        stat_res, comp_res, inc_res, sms_res = await asyncio.gather(
+            self._get(session, get_endpoint("summary.json")),
+            self._get(session, get_endpoint("components.json")),
+            self._get(session, get_endpoint("incidents.json")),
+            self._get(session, get_endpoint("scheduled-maintenances.json")),
+        )
+
+        status, components, incidents, sms = await asyncio.gather(
+            self.get_status(stat_res),
+            self.get_components(comp_res),
+            self.get_incidents(inc_res, self.parsed_incidents),
+            self.get_scheduled_maintenances(sms_res),
+        )
+
+        return StatusSnapshot(status, components, incidents, sms, time.monotonic())
+
     @neko_commands.command(name="discord", aliases=["discordstatus"], brief="Check if Discord is down (again)")
     async def discord_status_command(self, ctx):
         """
@@ -168,21 +242,21 @@ class DiscordServiceStatusCog(neko3.cog.CogBase):
         status.
         """
 
+        self.last_requested = time.monotonic()
+
+        # If we backed off while idle, poll now so the next person sees fresh data.
+        if self.snapshot is None or time.monotonic() - self.snapshot.fetched_at > poll_interval:
+            self.wake_up.set()
+
         async with ctx.message.channel.typing():
-            stat_res, comp_res, inc_res, sms_res = await asyncio.gather(
-                self._get(get_endpoint("summary.json")),
-                self._get(get_endpoint("components.json")),
-                self._get(get_endpoint("incidents.json")),
-                self._get(get_endpoint("scheduled-maintenances.json")),
-            )
-
-            status, components, incidents, sms = await asyncio.gather(
-                self.get_status(stat_res),
-                self.get_components(comp_res),
-                self.get_incidents(inc_res),
-                self.get_scheduled_maintenances(sms_res),
-            )
-            
+            if self.snapshot is None:
+                try:
+                    await asyncio.wait_for(self.snapshot_ready.wait(), first_poll_timeout)
+                except asyncio.TimeoutError:
+                    return await ctx.send("The Discord status page is not responding right now.", delete_after=10)
+
+            status, components, incidents, sms, _ = self.snapshot
+
             footer_text = status["indicator"]
 
             @pagination.embed_generator(max_chars=1100)
@@ -260,9 +334,12 @@ class DiscordServiceStatusCog(neko3.cog.CogBase):
                 if i and not (i % max_fields):
                     nav.add_page_break()
                 
-                title = component.pop("name")
+                title = component["name"]
                 desc = []
                 for k, v in component.items():
+                    if k == "name":
+                        continue
+
                     line = f"**{k}**: "
                     if isinstance(v, datetime.datetime):
                         line += friendly_date(v)
@@ -286,10 +363,10 @@ class DiscordServiceStatusCog(neko3.cog.CogBase):
                 if i and not (i % max_fields):
                     nav.add_page_break()
                 
-                title = component.pop("name")
+                title = component["name"]
                 desc = []
                 for k, v in component.items():
-                    if k == "components":
+                    if k in ("name", "components"):
                         continue
 
                     line = f"{k}: "
@@ -304,12 +381,11 @@ class DiscordServiceStatusCog(neko3.cog.CogBase):
 
             nav.start(ctx)
 
-    @classmethod
-    async def _get(cls, *args, **kwargs):
-        async with aiohttp.ClientSession() as session:
-            async with session.get(*args, **kwargs) as resp:
-                resp.raise_for_status()
-                return await resp.json()
+    @staticmethod
+    async def _get(session, *args, **kwargs):
+        async with session.get(*args, **kwargs) as resp:
+            resp.raise_for_status()
+            return await resp.json()
 
     @staticmethod
     async def get_status(res) -> typing.Dict[str, typing.Any]:
@@ -398,7 +474,7 @@ class DiscordServiceStatusCog(neko3.cog.CogBase):
         return {"showcase": showcase_result, "rest": rest_result}
 
     @classmethod
-    async def get_incidents(cls, res) -> typing.Dict[str, typing.List]:
+    async def get_incidents(cls, res, parsed=None) -> typing.Dict[str, typing.List]:
         """
         Gets a dict containing two keys: 'resolved' and 'unresolved'.
 
@@ -408,6 +484,10 @@ class DiscordServiceStatusCog(neko3.cog.CogBase):
         first 5, resolved. All unresolved are returned.
 
         :param res: the http response.
+        :param parsed: optional dict of previously parsed incidents. Incidents
+            that have not been updated since they were last parsed are reused
+            from here rather than being parsed again. Incidents that are no
+            longer returned are removed from it.
         """
         max_resolved = 5
 
@@ -415,6 +495,7 @@ class DiscordServiceStatusCog(neko3.cog.CogBase):
 
         unresolved = []
         resolved = []
+        seen_ids = set()
 
         for inc in res:
             if inc["status"] in ("investigating", "identified", "monitoring"):
@@ -424,6 +505,13 @@ class DiscordServiceStatusCog(neko3.cog.CogBase):
             else:
                 continue
 
+            if parsed is not None:
+                seen_ids.add(inc["id"])
+                previous = parsed.get(inc["id"])
+                if previous is not None and previous[0] == inc.get("updated_at"):
+                    target.append(previous[1])
+                    continue
+
             incident = {}
 
             for k, v in inc.items():
@@ -442,7 +530,15 @@ class DiscordServiceStatusCog(neko3.cog.CogBase):
                 else:
                     incident[friendly_key] = v
 
+            if parsed is not None:
+                parsed[inc["id"]] = (inc.get("updated_at"), incident)
+
             target.append(incident)
+
+        if parsed is not None:
+            for stale_id in parsed.keys() - seen_ids:
+                del parsed[stale_id]
+
         return {"resolved": resolved, "unresolved": unresolved}
 
     @staticmethod
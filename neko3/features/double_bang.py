@@ -16,30 +16,73 @@
 """
 Lets the user run `!!` to reinvoke the previous command.
 """
+import collections
+import time
+
+import discord
 from discord.ext import commands
 
+from neko3 import caching
 from neko3 import neko_commands
 
+# The most users to remember the last command for.
+HISTORY_SIZE = 1_000
+# How long, in seconds, to remember the last command someone ran.
+HISTORY_TTL = 60 * 60
+
+#: Just enough about a command invocation to run it again, without keeping
+#: the message, guild and command objects alive.
+LastCommand = collections.namedtuple("LastCommand", "channel_id message_id content timestamp")
+
+HistoryStats = collections.namedtuple("HistoryStats", "size max_size ttl hits misses")
+
 
 class BangBangCog(neko_commands.Cog):
     def __init__(self):
-        self.user2context = {}
+        self.history = caching.TTLCache(HISTORY_TTL, HISTORY_SIZE)
+        self.hits = 0
+        self.misses = 0
         super().__init__()
 
+    @property
+    def stats(self) -> HistoryStats:
+        return HistoryStats(len(self.history), self.history.max_size, self.history.ttl, self.hits, self.misses)
+
     @neko_commands.Cog.listener()
-    async def on_command(self, ctx):
-        """Cache the last-executed commands."""
+    async def on_command_completion(self, ctx):
+        """Cache the last-executed commands, once they have passed their checks."""
         if ctx.command != self.reinvoke_command:
-            self.user2context[ctx.author] = ctx
+            self.history[ctx.author.id] = LastCommand(ctx.channel.id, ctx.message.id, ctx.message.content, time.time())
 
     @commands.cooldown(3, 10, commands.BucketType.user)
     @commands.check(lambda ctx: not ctx.author.bot)
     @neko_commands.command(name="!!", brief="Reinvoke the last command.")
     async def reinvoke_command(self, ctx: neko_commands.Context):
-        if ctx.author not in self.user2context:
+        last = self.history.get(ctx.author.id)
+
+        if last is None:
+            self.misses += 1
             await ctx.send("No command history. Perhaps the bot restarted?", delete_after=10)
+            return
+
+        self.hits += 1
+
+        # Run it where it was first run if we still can, otherwise run it here instead.
+        channel = ctx.bot.get_channel(last.channel_id)
+        try:
+            message = await channel.fetch_message(last.message_id) if channel is not None else ctx.message
+        except discord.HTTPException:
+            message = ctx.message
+
+        # Use the content as it was run, even if the message was since edited.
+        message.content = last.content
+        new_ctx = await ctx.bot.get_context(message)
+
+        if new_ctx.command is None:
+            await ctx.send("That command no longer exists.", delete_after=10)
         else:
-            await self.user2context[ctx.author].reinvoke(call_hooks=True)
+            # Invoking it properly runs its checks and cooldowns for where it now runs.
+            await ctx.bot.invoke(new_ctx)
 
 
 def setup(bot):
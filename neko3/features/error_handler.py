@@ -23,8 +23,10 @@ import uuid
 import discord
 from discord.ext import commands
 
+from neko3 import caching
 from neko3 import cog
 from neko3 import fuzzy_search
+from neko3 import scheduler
 
 
 def mark_as_handler(ex_type, *ex_types):
@@ -56,6 +58,15 @@ MANAGED_EXCEPIONS = [
     discord.NotFound,
 ]
 
+# The most misspelled command names to remember suggestions for.
+SUGGESTION_CACHE_SIZE = 512
+# How long, in seconds, to remember suggestions for a misspelled command name.
+SUGGESTION_TTL = 60 * 60
+# How many uncached suggestion searches a single channel may trigger per period.
+SUGGESTION_RATE = 5
+# The period, in seconds, that SUGGESTION_RATE applies to.
+SUGGESTION_PER = 30
+
 
 class ErrorHandlerCog(cog.CogBase):
     def __init__(self, bot):
@@ -67,6 +78,40 @@ class ErrorHandlerCog(cog.CogBase):
 
         self.logger.info("Registered exception handlers for %s scenarios", len(self.handlers))
 
+        self.suggestions = caching.TTLCache(SUGGESTION_TTL, SUGGESTION_CACHE_SIZE)
+        self.suggestions_version = getattr(bot, "commands_version", None)
+        self.suggestion_cooldowns = commands.CooldownMapping.from_cooldown(
+            SUGGESTION_RATE, SUGGESTION_PER, commands.BucketType.channel
+        )
+
+    def get_suggestions(self, ctx, name: str):
+        """
+        Gets up to 5 command names similar to the given name, or None if the
+        channel has asked for too many new suggestions recently. Results are
+        remembered until the bot's commands change.
+        """
+        version = getattr(ctx.bot, "commands_version", None)
+        if version is None or version != self.suggestions_version:
+            self.suggestions = caching.TTLCache(SUGGESTION_TTL, SUGGESTION_CACHE_SIZE)
+            self.suggestions_version = version
+
+        try:
+            return self.suggestions[name]
+        except KeyError:
+            pass
+
+        # Only searches count towards the limit, so remembered answers are always given.
+        if self.suggestion_cooldowns.get_bucket(ctx.message).update_rate_limit():
+            self.logger.debug("Not suggesting commands for %r in rate limited channel %s", name, ctx.channel.id)
+            return None
+
+        matches = fuzzy_search.extract(
+            name, ctx.bot.all_commands, scoring_algorithm=fuzzy_search.deep_ratio, min_score=60, max_results=5
+        )
+        matches = [match for match, _ in matches]
+        self.suggestions[name] = matches
+        return matches
+
     @cog.CogBase.listener()
     async def on_command_error(self, ctx, error):
         self.logger.debug("Handling exception", exc_info=error)
@@ -80,14 +125,16 @@ class ErrorHandlerCog(cog.CogBase):
 
     @mark_as_handler(commands.CommandNotFound)
     async def on_command_not_found(self, ctx, error):
+        # Arguments do not help find the command, but would make every attempt a cache miss.
         command = ctx.message.content[len(ctx.prefix) :].strip()
-        possible_matches = fuzzy_search.extract(
-            command, ctx.bot.all_commands, scoring_algorithm=fuzzy_search.deep_ratio, min_score=60, max_results=5
-        )
+        name = command.split(maxsplit=1)[0] if command else command
+        possible_matches = self.get_suggestions(ctx, name)
 
-        if possible_matches:
+        if possible_matches is None:
+            return
+        elif possible_matches:
             message = "Command not found. However, I did find commands with similar names:\n"
-            message += "\n".join(f"> `{ctx.prefix}{match}`" for match, _ in possible_matches)
+            message += "\n".join(f"> `{ctx.prefix}{match}`" for match in possible_matches)
 
             await ctx.send(message, delete_after=30)
         else:
@@ -100,12 +147,19 @@ class ErrorHandlerCog(cog.CogBase):
     @mark_as_handler(commands.CommandOnCooldown)
     async def on_command_on_cooldown(self, ctx, error):
         reaction = "\N{SNOWFLAKE}\N{VARIATION SELECTOR-16}"
-        asyncio.create_task(ctx.message.add_reaction(reaction))
-        await asyncio.sleep(error.retry_after)
+
+        async def remove_reaction():
+            try:
+                await ctx.message.remove_reaction(reaction, ctx.bot.user)
+            except discord.NotFound:
+                pass
+
         try:
-            await ctx.message.remove_reaction(reaction, ctx.bot.user)
-        except discord.NotFound:
-            pass
+            await ctx.message.add_reaction(reaction)
+        except discord.HTTPException:
+            return
+
+        scheduler.get_scheduler(ctx.bot).call_later(error.retry_after, remove_reaction)
 
     @mark_as_handler(NotImplementedError)
     async def on_not_implemented_error(self, ctx, error):
@@ -240,7 +240,8 @@ class SuperuserCog(cog.CogBase):
         raid attacks and system compromise. **Use at your own risk.**
     """
 
-    def __init__(self, *, shell=...):
+    def __init__(self, bot=None, *, shell=...):
+        super().__init__(bot)
         if shell is ...:
             self.shell = os.getenv("SHELL", os.name in ("win32", "win64", "winnt", "nt") and "cmd" or "bash")
         elif shell is None:
@@ -275,7 +276,7 @@ class SuperuserCog(cog.CogBase):
             ...         return ctx.author.id in self.owners
             ...
 
-            >>> bot.add_cog(WhitelistedOwnerSuperuserCog())
+            >>> bot.add_cog(WhitelistedOwnerSuperuserCog(bot))
 
         """
         return await ctx.bot.is_owner(ctx.author) or ctx.author.id in self.other_owners
@@ -400,4 +401,4 @@ class SuperuserCog(cog.CogBase):
 
 def setup(bot):
     """Add the cog to the bot directly. Enables this to be loaded as an extension."""
-    bot.add_cog(SuperuserCog())
+    bot.add_cog(SuperuserCog(bot))
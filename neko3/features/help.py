@@ -36,12 +36,14 @@ Basic utilities and stuff that implement commands for:
 - timeit [times the execution of another command]
 - logout [used to restart if running as a system service]
 """
+import asyncio
 import collections
-import logging
+import copy
 import typing
 
 from discord.ext import commands as dpycommands
 
+from neko3 import caching
 from neko3 import fuzzy_search
 from neko3 import logging_utils
 from neko3 import neko_commands
@@ -50,10 +52,28 @@ from neko3 import string
 from neko3 import theme
 
 
+# How long, in seconds, to remember whether a user can run a command in a channel.
+CAN_RUN_TTL = 30
+# The most permission check results to remember at once.
+CAN_RUN_CACHE_SIZE = 10_000
+# How long, in seconds, to keep rendered help pages for.
+PAGE_CACHE_TTL = 60 * 60
+# The most sets of rendered help pages to keep. Each distinct set of commands
+# that someone can run gets its own set of pages.
+PAGE_CACHE_SIZE = 64
+
+#: Everything the help command needs to know about the command tree, built
+#: once for each ``commands_version`` of the bot.
+CommandIndex = collections.namedtuple("CommandIndex", "version commands top_level alias2command")
+
+
 class HelpCog(neko_commands.Cog, logging_utils.Loggable):
     def __init__(self, bot):
         bot.remove_command("help")
         self.bot = bot
+        self._index: typing.Optional[CommandIndex] = None
+        self._can_run_cache = caching.TTLCache(CAN_RUN_TTL, CAN_RUN_CACHE_SIZE)
+        self._page_cache = caching.TTLCache(PAGE_CACHE_TTL, PAGE_CACHE_SIZE)
 
     @neko_commands.command(name="help", brief="Gets usage information for commands.")
     async def help_command(self, ctx, *, query: str = None):
@@ -79,42 +99,32 @@ class HelpCog(neko_commands.Cog, logging_utils.Loggable):
 
     async def _new_dialog(self, ctx):
         embeds = []
-        # Includes those that cannot be run.
-        all_cmds = list(sorted(ctx.bot.commands, key=str))
-
-        commands = []
-
-        for potential_command in all_cmds:
-            # noinspection PyUnresolvedReferences
-            try:
-                if await potential_command.can_run(ctx):
-                    commands.append(potential_command)
-            except Exception as ex:
-                if self.logger.getEffectiveLevel() >= logging.DEBUG:
-                    self.logger.exception(ex)
-                continue
+        commands = await self.filter_runnable(ctx, self.index.top_level)
+
+        key = ("more", tuple(command.qualified_name for command in commands))
+        pages = self._page_cache.get(key)
+
+        if pages is None:
+            items_per_page = 6
+            pages = []
+
+            # We only show 6 commands per page.
+            for i in range(0, len(commands), items_per_page):
+                # If we put a zero space char first, and follow with an
+                # EM QUAD, it won't strip the space.
+                pages.append(
+                    [
+                        (command.name, "\u200e\u2001" + (command.brief or "—"))
+                        for command in commands[i : i + items_per_page]
+                    ]
+                )
 
-        items_per_page = 6
+            self._page_cache[key] = pages
 
-        # We only show 10 commands per page.
-        for i in range(0, len(commands), items_per_page):
+        for fields in pages:
             embed_page = theme.generic_embed(ctx, title="All commands", avatar_injected=True)
-
-            next_commands = commands[i : i + items_per_page]
-
-            for command in next_commands:
-                command: neko_commands.Command = command
-                # Special space char
-                name = command.name
-
-                embed_page.add_field(
-                    name=name,
-                    # If we put a zero space char first, and follow with an
-                    # EM QUAD, it won't strip the space.
-                    value="\u200e\u2001" + (command.brief or "—"),
-                    inline=False,
-                )
-
+            for name, value in fields:
+                embed_page.add_field(name=name, value=value, inline=False)
             embeds.append(embed_page)
 
         pagination.EmbedNavigator(pages=embeds, ctx=ctx).start()
@@ -129,16 +139,7 @@ class HelpCog(neko_commands.Cog, logging_utils.Loggable):
             back to fuzzy.
         """
         if isinstance(command, dpycommands.GroupMixin):
-            _children = sorted(command.commands, key=lambda c: c.name)
-            children = []
-
-            for child in _children:
-                try:
-                    if await child.can_run(ctx):
-                        children.append(child)
-                except Exception as ex:
-                    if self.logger.getEffectiveLevel() >= logging.DEBUG:
-                        self.logger.exception(ex)
+            children = await self.filter_runnable(ctx, sorted(command.commands, key=lambda c: c.name))
         else:
             children = []
 
@@ -228,29 +229,79 @@ class HelpCog(neko_commands.Cog, logging_utils.Loggable):
         Replies with a list of all commands available.
         :param ctx: the context to reply to.
         """
-        pages = []
+        # Check the top level commands and the immediate children of any
+        # groups all at once, since we need both to know what to show.
+        candidates = []
+        for command in self.index.top_level:
+            candidates.append(command)
+            if isinstance(command, dpycommands.GroupMixin):
+                candidates.extend(command.commands)
 
-        # Get commands this user can run, only.
-        async def get_runnable_commands(mixin):
-            cmds = []
-
-            for command in mixin.all_commands.values():
-                # If an error is raised by checking permissions for a command,
-                # then just ignore that command.
-                try:
-                    if await command.can_run(ctx):
-                        cmds.append(command)
-                except Exception as ex:
-                    if self.logger.getEffectiveLevel() <= logging.DEBUG:
-                        self.logger.exception(ex)
-            return cmds
+        runnable = await self.filter_runnable(ctx, candidates)
 
-        current_page = ""
+        key = ("summary", show_aliases, tuple(command.qualified_name for command in runnable))
+        pages = self._page_cache.get(key)
+
+        if pages is None:
+            pages = self._render_summary_pages(runnable, show_aliases)
+            self._page_cache[key] = pages
+
+        # Copy, as we consume the pages below.
+        pages = list(pages)
+
+        def mk_page(body):
+            """
+            Makes a new page with the current body. This is a template
+            for embeds to ensure a consistent layout if we can't fit the
+            commands list on one page.
+            """
+            page = theme.generic_embed(ctx, title="All commands", description=body, avatar_injected=True)
+
+            page.set_footer(
+                text="Commands proceeded by ellipses signify " "command groups with sub-commands available."
+            )
+            page.add_field(
+                name="Want more information?",
+                value=f"Run `{ctx.bot.command_prefix}help <command>` " f"for more details on a specific command!",
+                inline=False,
+            )
+
+            page.add_field(
+                name="Want a more spammy embed?", value="Try running with the `-m` flag for added brief descriptions!"
+            )
+            page.set_thumbnail(url=ctx.bot.user.avatar_url)
+
+            return page
 
-        runnable_commands = await get_runnable_commands(ctx.bot)
+        if len(pages) == 0:
+            await ctx.send("You cannot run any commands here.")
+        elif len(pages) == 1:
+            await ctx.send(embed=mk_page(pages.pop()))
+        else:
+            page_embeds = []
+            for page in pages:
+                page_embeds.append(mk_page(page))
+
+            fsm = pagination.EmbedNavigator(pages=page_embeds, ctx=ctx)
+            await fsm.start()
+
+    @staticmethod
+    def _render_summary_pages(runnable, show_aliases) -> typing.List[str]:
+        """
+        Renders the bodies of the summary pages.
+
+        :param runnable: the top level commands, and children of groups, that can
+            be run.
+        :param show_aliases: true to list aliases alongside each command name.
+        """
+        pages = []
+        current_page = ""
+        runnable_set = set(runnable)
 
         unordered_strings = {}
-        for c in runnable_commands:
+        for c in runnable:
+            if c.parent is not None:
+                continue
             if show_aliases:
                 for alias in c.aliases:
                     unordered_strings[alias] = c
@@ -273,7 +324,7 @@ class HelpCog(neko_commands.Cog, logging_utils.Loggable):
             if isinstance(command, dpycommands.GroupMixin):
                 # This is a command group. Only show if we have at least one
                 # available sub-command, though.
-                if len(await get_runnable_commands(command)) > 0:
+                if any(child in runnable_set for child in command.commands):
                     name = f"{name}..."
 
             if current_page:
@@ -283,48 +334,77 @@ class HelpCog(neko_commands.Cog, logging_utils.Loggable):
         if current_page:
             pages.append(current_page)
 
-        def mk_page(body):
-            """
-            Makes a new page with the current body. This is a template
-            for embeds to ensure a consistent layout if we can't fit the
-            commands list on one page.
-            """
-            page = theme.generic_embed(ctx, title="All commands", description=body, avatar_injected=True)
+        return pages
 
-            page.set_footer(
-                text="Commands proceeded by ellipses signify " "command groups with sub-commands available."
-            )
-            page.add_field(
-                name="Want more information?",
-                value=f"Run `{ctx.bot.command_prefix}help <command>` " f"for more details on a specific command!",
-                inline=False,
-            )
+    @property
+    def index(self) -> CommandIndex:
+        """
+        Gets the index of the bot's commands, rebuilding it first if commands
+        have been added or removed, or extensions have been loaded or unloaded,
+        since it was last built.
+        """
+        version = getattr(self.bot, "commands_version", None)
 
-            page.add_field(
-                name="Want a more spammy embed?", value="Try running with the `-m` flag for added brief descriptions!"
-            )
-            page.set_thumbnail(url=ctx.bot.user.avatar_url)
+        # Without a version to compare against, we cannot tell if the index is stale.
+        if self._index is None or version is None or self._index.version != version:
+            walked = list(self.bot.walk_commands())
+            alias2command = {}
+            for command in walked:
+                for alias in self.gen_qual_names(command):
+                    alias2command[alias] = command
 
-            return page
+            self._index = CommandIndex(version, frozenset(walked), sorted(self.bot.commands, key=str), alias2command)
 
-        if len(pages) == 0:
-            await ctx.send("You cannot run any commands here.")
-        elif len(pages) == 1:
-            await ctx.send(embed=mk_page(pages.pop()))
-        else:
-            page_embeds = []
-            for page in pages:
-                page_embeds.append(mk_page(page))
+            # Checks and pages may refer to commands that no longer exist.
+            self._can_run_cache = caching.TTLCache(CAN_RUN_TTL, CAN_RUN_CACHE_SIZE)
+            self._page_cache = caching.TTLCache(PAGE_CACHE_TTL, PAGE_CACHE_SIZE)
+            self.logger.debug("Indexed %s commands for version %s", len(walked), version)
 
-            fsm = pagination.EmbedNavigator(pages=page_embeds, ctx=ctx)
-            await fsm.start()
+        return self._index
+
+    async def can_run(self, ctx, command: neko_commands.Command) -> bool:
+        """
+        Determines whether the author of the context can run the given command
+        in the context's channel. If any check raises an error, then the
+        command cannot be run. Results are remembered for ``CAN_RUN_TTL``
+        seconds.
+        """
+        cache = self._can_run_cache
+        key = (ctx.author.id, ctx.channel.id, command.qualified_name)
+
+        try:
+            return cache[key]
+        except KeyError:
+            pass
+
+        # Command.can_run temporarily replaces ctx.command, so each check gets
+        # its own copy of the context to allow several to run at once.
+        try:
+            result = bool(await command.can_run(copy.copy(ctx)))
+        except Exception:
+            self.logger.debug("Checking %s raised an error", command.qualified_name, exc_info=True)
+            result = False
+
+        cache[key] = result
+        return result
+
+    async def filter_runnable(
+        self, ctx, commands: typing.Iterable[neko_commands.Command]
+    ) -> typing.List[neko_commands.Command]:
+        """
+        Gets the given commands that the author of the context can run, in
+        the same order. Checks are run concurrently.
+        """
+        commands = list(commands)
+        results = await asyncio.gather(*(self.can_run(ctx, command) for command in commands))
+        return [command for command, result in zip(commands, results) if result]
 
     @property
     def all_commands(self) -> typing.FrozenSet[neko_commands.Command]:
         """
         Generates a set of all unique commands recursively.
         """
-        return frozenset([command for command in self.bot.walk_commands()])
+        return self.index.commands
 
     def gen_qual_names(self, command: neko_commands.Command):
         aliases = [command.name, *command.aliases]
@@ -344,12 +424,7 @@ class HelpCog(neko_commands.Cog, logging_utils.Loggable):
         Generates a mapping of all fully qualified command names and aliases
         to their respective command object.
         """
-        mapping = {}
-
-        for command in self.bot.walk_commands():
-            for alias in self.gen_qual_names(command):
-                mapping[alias] = command
-        return mapping
+        return self.index.alias2command
 
     async def get_best_match(self, string: str, context) -> typing.Optional[typing.Tuple[bool, neko_commands.Command]]:
         """
@@ -369,11 +444,8 @@ class HelpCog(neko_commands.Cog, logging_utils.Loggable):
 
         if string in alias2command:
             command = alias2command[string]
-            try:
-                if context.author.id == context.bot.owner_id or await command.can_run(context):
-                    return True, command
-            except Exception:
-                pass
+            if context.author.id == context.bot.owner_id or await self.can_run(context, command):
+                return True, command
 
         try:
             # Require a minimum of 60% match to qualify. The bot owner
@@ -400,17 +472,9 @@ class HelpCog(neko_commands.Cog, logging_utils.Loggable):
                 )
 
                 for guessed_name, score in score_it:
-                    can_run = False
                     next_command = alias2command[guessed_name]
 
-                    try:
-                        can_run = await next_command.can_run(context)
-                        can_run = can_run and next_command.enabled
-                    except Exception:
-                        # Also means we cannot run
-                        pass
-
-                    if can_run:
+                    if next_command.enabled and await self.can_run(context, next_command):
                         return score == 100, next_command
         except KeyError:
             pass
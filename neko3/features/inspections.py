@@ -32,9 +32,12 @@ from neko3 import embeds
 from neko3 import logging_utils
 from neko3 import neko_commands
 from neko3 import pagination
+from neko3 import snowflake_index
+from neko3 import statistics
 from neko3 import string
 from neko3.converters import *
 from neko3.permission_bits import Permissions
+from neko3.snowflake_index import EntityKind
 
 if TYPE_CHECKING:
 
@@ -352,8 +355,8 @@ class InspectionsCog(cog.CogBase, logging_utils.Loggable):
         Gives details regarding the current guild.
         """
         guild = ctx.guild
-        bot_members = len([*filter(lambda m: m.bot, guild.members)])
-        human_members = len(guild.members) - bot_members
+        stats = statistics.get_aggregator(ctx.bot).guild(guild.id)
+        statuses = ", ".join(f"{count} {status}" for status, count in sorted(stats.statuses.items())) or "unknown"
         categories = len(guild.categories)
         txt_channels = len([*filter(lambda c: isinstance(c, discord.TextChannel), guild.channels)])
         nsfw = sum(True for c in guild.text_channels if c.nsfw)
@@ -372,7 +375,8 @@ class InspectionsCog(cog.CogBase, logging_utils.Loggable):
             colour=algorithms.rand_colour(),
             description="\n".join(
                 [
-                    f"**Members**: {len(guild.members)} ({bot_members} bots, " f"{human_members} humans)",
+                    f"**Members**: {stats.members} ({stats.bots} bots, " f"{stats.humans} humans)",
+                    f"**Statuses**: {statuses}",
                     f'**Created on**: {guild.created_at.strftime("%c")}',
                     f"**Roles**: {len(guild.roles)}",
                     f"**Emojis**: {len(guild.emojis)}",
@@ -681,6 +685,7 @@ class InspectionsCog(cog.CogBase, logging_utils.Loggable):
         snowflakes = aggregates.FrozenOrderedSet(snowflakes)
 
         embed = embeds.Embed(colour=algorithms.rand_colour())
+        index = snowflake_index.get_index(ctx.bot)
 
         # Discord epoch from the Unix epoch in ms
         # Essentially the number of milliseconds since epoch
@@ -712,7 +717,7 @@ class InspectionsCog(cog.CogBase, logging_utils.Loggable):
             if snowflake == getattr(ctx.bot, "client_id", None):
                 desc += "\n- My client ID"
 
-            member = algorithms.find(lambda u: u.id == snowflake, ctx.guild.members)
+            member = ctx.guild.get_member(snowflake)
 
             if snowflake == ctx.bot.owner_id:
                 desc += "\n- My owner's ID"
@@ -725,7 +730,7 @@ class InspectionsCog(cog.CogBase, logging_utils.Loggable):
                 desc += f"\n- Member in this guild ({member})"
             else:
                 try:
-                    if algorithms.find(lambda u: u.id == snowflake, ctx.bot.users):
+                    if ctx.bot.get_user(snowflake):
                         desc += f"\n- A member in another server I am in"
                     else:
                         desc += f"\n- A user I don't share a server with"
@@ -745,35 +750,37 @@ class InspectionsCog(cog.CogBase, logging_utils.Loggable):
             if not i and member:
                 embed.set_thumbnail(url=member.avatar_url)
 
-            emoji = algorithms.find(lambda e: e.id == snowflake, ctx.guild.emojis)
+            entity = index.get(snowflake)
+            here = entity is not None and entity.guild_id == ctx.guild.id
 
-            if emoji:
-                desc += f"\n- Emoji in this guild ({emoji})"
-            elif algorithms.find(lambda e: e.id == snowflake, ctx.bot.emojis):
-                desc += "\n- Emoji in another guild"
-
-            if algorithms.find(lambda c: c.id == snowflake, ctx.guild.categories):
-                desc += "\n- Category in this guild"
-
-            if algorithms.find(lambda r: r.id == snowflake, ctx.guild.roles):
-                desc += "\n- Role in this guild"
-
-            channel = ctx.bot.get_channel(snowflake)
-
-            if channel:
+            if entity is None:
+                pass
+            elif entity.kind == EntityKind.EMOJI:
+                if here:
+                    desc += f"\n- Emoji in this guild ({ctx.bot.get_emoji(snowflake)})"
+                else:
+                    desc += "\n- Emoji in another guild"
+            elif entity.kind == EntityKind.CATEGORY:
+                if here:
+                    desc += "\n- Category in this guild"
+            elif entity.kind == EntityKind.ROLE:
+                if here:
+                    desc += "\n- Role in this guild"
+            elif entity.kind in (EntityKind.TEXT_CHANNEL, EntityKind.VOICE_CHANNEL, EntityKind.CHANNEL):
+                channel = ctx.bot.get_channel(snowflake)
                 if snowflake == ctx.channel.id:
                     desc += f"\n- ID for this channel ({channel})"
-                elif algorithms.find(lambda c: c.id == snowflake, ctx.guild.text_channels):
+                elif here and entity.kind == EntityKind.TEXT_CHANNEL:
                     desc += f"\n- Text channel in this guild ({channel})"
-                elif algorithms.find(lambda c: c.id == snowflake, ctx.guild.voice_channels):
+                elif here and entity.kind == EntityKind.VOICE_CHANNEL:
                     desc += f"\n- Voice channel in this guild ({channel})"
-                elif algorithms.find(lambda c: c.id == snowflake, ctx.bot.get_all_channels()):
+                elif not here:
                     desc += "\n- Text or voice channel in another guild"
-
-            if snowflake == ctx.guild.id:
-                desc += "\n- ID for this guild"
-            elif algorithms.find(lambda g: g.id == snowflake, ctx.bot.guilds):
-                desc += "\n- ID for another guild I am in"
+            elif entity.kind == EntityKind.GUILD:
+                if here:
+                    desc += "\n- ID for this guild"
+                else:
+                    desc += "\n- ID for another guild I am in"
 
             embed.add_field(name=snowflake, value=desc)
 
@@ -30,13 +30,17 @@ import PIL.ImageDraw as draw
 from discord.ext import commands
 
 import neko3.cog
+from neko3 import asset_optimizer
 from neko3 import files
 from neko3 import neko_commands
 from neko3 import theme
 
 
-def _plot(latitude, longitude):
-    mercator = MercatorProjection()
+MAP_PATH = files.in_here("mercator-small.png")
+
+
+def _plot(latitude, longitude, map_path=MAP_PATH):
+    mercator = MercatorProjection(image.open(map_path).convert("RGB"))
 
     x, y = mercator.swap_units(latitude, longitude, MapCoordinate.long_lat)
 
@@ -81,7 +85,7 @@ class MercatorProjection:
         If no image is given, the default mercator bitmap is used.
         """
         if map_image is None:
-            map_image = image.open(files.in_here("mercator-small.png"))
+            map_image = image.open(MAP_PATH)
 
         self.image = map_image
         self.ox, self.oy = map_image.width / 2, map_image.height / 2
@@ -128,6 +132,10 @@ class MercatorProjection:
 
 
 class SpaceCog(neko3.cog.CogBase):
+    def __init__(self, bot):
+        super().__init__(bot)
+        asset_optimizer.optimize_in_background([MAP_PATH])
+
     async def plot(self, latitude, longitude, bytesio):
         """
         Plots a longitude and latitude on a given mercator projection.
@@ -137,7 +145,8 @@ class SpaceCog(neko3.cog.CogBase):
         :param bytesio: the bytes IO to dump PNG data to.
         """
 
-        img = await self.run_in_process_pool(_plot, [latitude, longitude])
+        # Resolved here, as the process workers do not know what has been optimized.
+        img = await self.run_in_process_pool(_plot, [latitude, longitude, asset_optimizer.resolve(MAP_PATH)])
 
         img.save(bytesio, "PNG")
 
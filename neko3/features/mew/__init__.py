@@ -16,14 +16,13 @@
 """
 Implementation of the Mew command and cog.
 """
-import io
 import os
 import random
 
-import aiofiles
-import discord
 from discord.ext import commands
 
+from neko3 import asset_delivery
+from neko3 import asset_optimizer
 from neko3 import configuration_files
 from neko3 import files
 from neko3 import fuzzy_search
@@ -69,6 +68,8 @@ class MewReactsCog(neko_commands.Cog, logging_utils.Loggable):
             else:
                 self.images[react_name.lower()] = valid_list
 
+        asset_optimizer.optimize_in_background(targets_to_path.values())
+
         super().__init__()
 
     @commands.cooldown(rate=5, per=30.0, type=commands.BucketType.channel)
@@ -95,12 +96,10 @@ class MewReactsCog(neko_commands.Cog, logging_utils.Loggable):
                     if ctx.invoked_with == "mewd":
                         await ctx.message.delete()
                     file_name = random.choice(self.images[match])
-
-                    async with aiofiles.open(file_name, "rb") as afp:
-                        bytes_obj = io.BytesIO(await afp.read())
-                        bytes_obj.seek(0)
-
-                    await ctx.send(file=discord.File(bytes_obj, file_name))
+                    optimized = asset_optimizer.resolve(file_name)
+                    # Keep the original name, but the extension of whatever format it was optimized to.
+                    upload_name = os.path.splitext(os.path.basename(file_name))[0] + os.path.splitext(optimized)[1]
+                    await asset_delivery.AssetDelivery().send(ctx, optimized, file_name=upload_name)
                 except FileNotFoundError:
                     self.logger.exception("File not found...")
                     await ctx.send(
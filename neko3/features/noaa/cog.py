@@ -15,8 +15,14 @@
 
 """
 NOAA cog implementation.
+
+Set ``NOAA_EMBED_REMOTE_IMAGES=true`` to embed images straight from NOAA rather
+than downloading them and uploading them to Discord.
 """
+import asyncio
 import io
+import os
+import time
 
 import discord
 
@@ -24,45 +30,73 @@ import neko3.cog
 from neko3 import neko_commands
 from neko3 import pagination
 from neko3 import theme
+from . import image_cache
 from . import utils
 
+EMBED_REMOTE_IMAGES = os.getenv("NOAA_EMBED_REMOTE_IMAGES", "false").lower() == "true"
+
+# How often to refresh the most popular images ahead of time, in seconds.
+REFRESH_AHEAD_INTERVAL = 60
+# How many of the most popular images to keep warm.
+REFRESH_AHEAD_COUNT = 5
+
 
 class NOAACog(neko3.cog.CogBase):
+    def __init__(self, bot):
+        super().__init__(bot)
+        self.images = image_cache.ImageCache(self.acquire_http_session)
+        self.refresh_ahead_task = self.create_task(self._refresh_ahead(), long_lived=True)
+
+    async def _refresh_ahead(self):
+        while True:
+            await asyncio.sleep(REFRESH_AHEAD_INTERVAL)
+            try:
+                await self.images.refresh_ahead(REFRESH_AHEAD_COUNT, REFRESH_AHEAD_INTERVAL)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.logger.exception("Failed to refresh NOAA images ahead of time")
+
     @neko_commands.group(name="noaa", brief="Gets info from NOAA regarding US weather.")
     async def noaa_group(self, ctx):
         return await neko_commands.send_usage(ctx)
 
     async def _download(self, gif_url):
-        async with self.acquire_http_session() as http:
-            async with http.get(gif_url) as resp:
-                resp.raise_for_status()
-                data = await resp.read()
+        data = await self.images.get(gif_url)
         data = io.BytesIO(data)
         return data
 
+    async def _send_image(self, ctx, url, file_name, *, content=None, embed=None):
+        """
+        Sends the image at the URL. This is either uploaded from the cache, or if
+        ``EMBED_REMOTE_IMAGES`` is set, embedded straight from NOAA instead.
+        """
+        if EMBED_REMOTE_IMAGES:
+            # Discord caches embedded images by URL, so bust that every few minutes.
+            url = f"{url}?{int(time.time() // image_cache.DEFAULT_TTL)}"
+            if embed is None:
+                embed = theme.generic_embed(ctx, title=ctx.command.brief, description=utils.OVERVIEW_BASE)
+            embed.set_image(url=url)
+            return await ctx.send(content, embed=embed)
+
+        async with ctx.typing():
+            data = await self._download(url)
+
+        if embed is not None:
+            embed.set_image(url=f"attachment://{file_name}")
+        await ctx.send(content, embed=embed, file=discord.File(data, file_name))
+
     @noaa_group.command(name="us", brief="Shows the US weather overview.")
     async def us_overview_command(self, ctx):
-        async with ctx.typing():
-            png = await self._download(utils.OVERVIEW_MAP_US)
-        embed = theme.generic_embed(ctx, title=ctx.command.brief, description=utils.OVERVIEW_BASE)
-        embed.set_image(url="attachment://image.png")
-        await ctx.send(utils.OVERVIEW_BASE, file=discord.File(png, "image.png"))
+        await self._send_image(ctx, utils.OVERVIEW_MAP_US, "image.png", content=utils.OVERVIEW_BASE)
 
     @noaa_group.command(name="alaska", aliases=["ak"], brief="Shows the Alaskan weather overview.")
     async def alaska_overview_command(self, ctx):
-        async with ctx.typing():
-            png = await self._download(utils.OVERVIEW_MAP_AK)
-        embed = theme.generic_embed(ctx, title=ctx.command.brief, description=utils.OVERVIEW_BASE)
-        embed.set_image(url="attachment://image.png")
-        await ctx.send(utils.OVERVIEW_BASE, file=discord.File(png, "image.png"))
+        await self._send_image(ctx, utils.OVERVIEW_MAP_AK, "image.png", content=utils.OVERVIEW_BASE)
 
     @noaa_group.command(name="hawaii", aliases=["hi"], brief="Shows the Hawaiian weather overview.")
     async def hawaii_overview_command(self, ctx):
-        async with ctx.typing():
-            png = await self._download(utils.OVERVIEW_MAP_HI)
-        embed = theme.generic_embed(ctx, title=ctx.command.brief, description=utils.OVERVIEW_BASE)
-        embed.set_image(url="attachment://image.png")
-        await ctx.send(utils.OVERVIEW_BASE, file=discord.File(png, "image.png"))
+        await self._send_image(ctx, utils.OVERVIEW_MAP_HI, "image.png", content=utils.OVERVIEW_BASE)
 
     @noaa_group.group(name="radar", brief="Country-wide radar view for the US.")
     async def radar_group(self, ctx, *, region=None):
@@ -73,52 +107,38 @@ class NOAACog(neko3.cog.CogBase):
         if region is None:
             await self.radar_base(ctx)
         else:
-            await self.radar_regional_search(ctx, region)
+            await self.radar_regional_search_command(ctx, region)
 
     async def radar_base(self, ctx):
-        async with ctx.typing():
-            gif = await self._download(utils.RADAR_US)
-
         embed = theme.generic_embed(
             ctx,
             title=ctx.command.brief,
             description=f"{utils.OVERVIEW_BASE}\n\nRun with the `highres` argument for higher resolution!",
         )
-        embed.set_image(url="attachment://image.gif")
-        await ctx.send(embed=embed, file=discord.File(gif, "image.gif"))
+        await self._send_image(ctx, utils.RADAR_US, "image.gif", embed=embed)
 
     async def radar_regional_search_command(self, ctx, site):
-        async with ctx.typing():
-            name, url = utils.get_wide_urls_radar_closest_match(site)
-            gif = await self._download(url)
-
-        await ctx.send(
-            f"Closest match was {name} -- {utils.OVERVIEW_BASE}", file=discord.File(gif, "hawaii-overview.gif")
+        name, url = utils.get_wide_urls_radar_closest_match(site)
+        await self._send_image(
+            ctx, url, "hawaii-overview.gif", content=f"Closest match was {name} -- {utils.OVERVIEW_BASE}"
         )
 
     @radar_group.command(name="highres", aliases=["hires"], brief="Country-wide radar view for the US...BUT BIGGER")
     async def high_res_us_radar_command(self, ctx):
-        async with ctx.typing():
-            gif = await self._download(utils.RADAR_FULL_US)
         embed = theme.generic_embed(ctx, title=ctx.command.brief, description=utils.OVERVIEW_BASE)
-        embed.set_image(url="attachment://image.gif")
-        await ctx.send(embed=embed, file=discord.File(gif, "image.gif"))
+        await self._send_image(ctx, utils.RADAR_FULL_US, "image.gif", embed=embed)
 
     @radar_group.command(name="hawaii", aliases=["hi"], brief="Shows the Hawaiian radar.")
     async def hawaii_radar_command(self, ctx):
-        async with ctx.typing():
-            gif = await self._download(utils.get_wide_urls_radar_closest_match("hawaii")[1])
         embed = theme.generic_embed(ctx, title=ctx.command.brief, description=utils.OVERVIEW_BASE)
-        embed.set_image(url="attachment://image.gif")
-        await ctx.send(embed=embed, file=discord.File(gif, "image.gif"))
+        url = utils.get_wide_urls_radar_closest_match("hawaii")[1]
+        await self._send_image(ctx, url, "image.gif", embed=embed)
 
     @radar_group.command(name="alaska", aliases=["ak"], brief="Shows the Alaskan radar.")
     async def alaska_radar_command(self, ctx):
-        async with ctx.typing():
-            gif = await self._download(utils.get_wide_urls_radar_closest_match("alaska")[1])
         embed = theme.generic_embed(ctx, title=ctx.command.brief, description=utils.OVERVIEW_BASE)
-        embed.set_image(url="attachment://image.gif")
-        await ctx.send(embed=embed, file=discord.File(gif, "image.gif"))
+        url = utils.get_wide_urls_radar_closest_match("alaska")[1]
+        await self._send_image(ctx, url, "image.gif", embed=embed)
 
     @noaa_group.command(name="RIDGE", aliases=["ridge", "local"], brief="Shows local radar layers.")
     async def local_command(self, ctx, *, area):
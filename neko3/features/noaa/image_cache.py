@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Nekozilla is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Nekozilla is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Nekozilla.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Caches the images and radar loops we download from NOAA. These only change
+every few minutes, so there is no point downloading them for every request.
+"""
+import asyncio
+import collections
+import datetime
+import email.utils
+import re
+import time
+import typing
+
+from neko3 import logging_utils
+
+# Used when NOAA does not tell us how long something can be cached for.
+DEFAULT_TTL = 2 * 60
+# Never trust upstream to tell us to keep something for longer than this.
+MAX_TTL = 15 * 60
+MAX_ENTRIES = 50
+
+_max_age = re.compile(r"max-age=(\d+)", re.I)
+
+CachedImage = collections.namedtuple("CachedImage", "data expires_at etag last_modified")
+
+
+def ttl_from_headers(headers) -> float:
+    """Works out how long a response can be cached for from the Cache-Control and Expires headers."""
+    cache_control = headers.get("Cache-Control", "")
+
+    if "no-store" in cache_control or "no-cache" in cache_control:
+        return 0
+
+    max_age = _max_age.search(cache_control)
+    if max_age:
+        return min(int(max_age.group(1)), MAX_TTL)
+
+    expires = headers.get("Expires")
+    if expires:
+        try:
+            expires = email.utils.parsedate_to_datetime(expires)
+        except (TypeError, ValueError):
+            pass
+        else:
+            now = datetime.datetime.now(tz=expires.tzinfo or datetime.timezone.utc)
+            return max(0, min((expires - now).total_seconds(), MAX_TTL))
+
+    return DEFAULT_TTL
+
+
+class ImageCache(logging_utils.Loggable):
+    """
+    Per-URL cache of downloaded image bytes that honours the upstream caching
+    headers. Expired entries are revalidated with a conditional request, so an
+    unchanged image is not downloaded again.
+
+    Each lookup is counted, so that the most requested URLs can be refreshed
+    ahead of time by calling ``refresh_ahead`` periodically.
+
+    :param acquire_http_session: callable that makes a new aiohttp session.
+    :param max_entries: the maximum number of images to hold.
+    """
+
+    def __init__(self, acquire_http_session, *, max_entries=MAX_ENTRIES):
+        self.acquire_http_session = acquire_http_session
+        self.max_entries = max_entries
+        self.entries: typing.MutableMapping[str, CachedImage] = collections.OrderedDict()
+        self.requests = collections.Counter()
+        self._in_flight: typing.Dict[str, asyncio.Future] = {}
+
+    async def get(self, url) -> bytes:
+        """Gets the image at the given URL, downloading it only if the cached copy has expired."""
+        self.requests[url] += 1
+
+        entry = self.entries.get(url)
+        if entry is not None and entry.expires_at > time.monotonic():
+            self.entries.move_to_end(url)
+            return entry.data
+
+        return await self.fetch(url)
+
+    async def fetch(self, url) -> bytes:
+        """
+        Downloads or revalidates the image at the given URL. Concurrent calls
+        for the same URL share a single request.
+        """
+        if url not in self._in_flight:
+            self._in_flight[url] = asyncio.ensure_future(self._fetch(url))
+            self._in_flight[url].add_done_callback(lambda _: self._in_flight.pop(url, None))
+
+        return await asyncio.shield(self._in_flight[url])
+
+    async def _fetch(self, url) -> bytes:
+        entry = self.entries.get(url)
+
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+
+        async with self.acquire_http_session() as http:
+            async with http.get(url, headers=headers) as resp:
+                if resp.status == 304 and entry is not None:
+                    self.logger.debug("%s has not changed", url)
+                    data = entry.data
+                else:
+                    resp.raise_for_status()
+                    data = await resp.read()
+                    self.logger.debug("Downloaded %s bytes from %s", len(data), url)
+
+                expires_at = time.monotonic() + ttl_from_headers(resp.headers)
+                etag = resp.headers.get("ETag", entry.etag if entry else None)
+                last_modified = resp.headers.get("Last-Modified", entry.last_modified if entry else None)
+
+        self.entries[url] = CachedImage(data, expires_at, etag, last_modified)
+        self.entries.move_to_end(url)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+        return data
+
+    def most_requested(self, count) -> typing.List[str]:
+        return [url for url, _ in self.requests.most_common(count)]
+
+    async def refresh_ahead(self, count, margin):
+        """
+        Refreshes any of the ``count`` most requested URLs that will expire
+        within ``margin`` seconds, then halves every request count so that
+        popularity reflects recent use.
+        """
+        deadline = time.monotonic() + margin
+        urls = [
+            url
+            for url in self.most_requested(count)
+            if url not in self.entries or self.entries[url].expires_at < deadline
+        ]
+
+        results = await asyncio.gather(*(self.fetch(url) for url in urls), return_exceptions=True)
+        for url, result in zip(urls, results):
+            if isinstance(result, Exception):
+                self.logger.warning("Failed to refresh %s ahead of time: %s", url, result)
+
+        self.requests = collections.Counter({url: n // 2 for url, n in self.requests.items() if n // 2})
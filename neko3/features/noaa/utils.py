@@ -18,6 +18,7 @@ Utilities for reading and parsing URLs for images and GIFs from NOAA.
 """
 import asyncio
 import collections
+import re
 
 import bs4
 
@@ -65,9 +66,77 @@ _wide_view_radars = dict(
 
 _URL_T = str
 
+_word = re.compile(r"\w+")
+
+# Maximum number of names sharing trigrams with a query to score with fuzzy matching.
+_FUZZY_SHORTLIST_SIZE = 10
+
+
+def _normalize(text):
+    return " ".join(_word.findall(text.lower().replace("_", " ")))
+
+
+def _trigrams(text):
+    padded = f"  {text} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class _NameIndex:
+    """
+    Lookup from normalized names to keys, built once at import time.
+
+    Exact names and prefixes of names are dictionary hits. Anything else is
+    fuzzy matched, but only against the few names that share the most
+    trigrams with the query rather than against every name.
+
+    Where several keys share a name or prefix, the key that was added first
+    wins, so add the most specific names first.
+
+    Each name is also indexed without its spaces, so "northeast" finds
+    "north east".
+    """
+
+    def __init__(self):
+        self._exact = {}
+        self._prefixes = {}
+        self._trigrams = collections.defaultdict(set)
+
+    def add(self, key, *names):
+        for name in names:
+            name = _normalize(name)
+            if name:
+                self._add(key, name)
+                self._add(key, name.replace(" ", ""))
+
+    def _add(self, key, name):
+        self._exact.setdefault(name, key)
+        for i in range(1, len(name) + 1):
+            self._prefixes.setdefault(name[:i], key)
+        for trigram in _trigrams(name):
+            self._trigrams[trigram].add(name)
+
+    def lookup(self, query):
+        query = _normalize(query)
+        queries = (query, query.replace(" ", ""))
+
+        for table in (self._exact, self._prefixes):
+            for q in queries:
+                if q in table:
+                    return table[q]
+
+        shared = collections.Counter(name for trigram in _trigrams(query) for name in self._trigrams.get(trigram, ()))
+        shortlist = [name for name, _ in shared.most_common(_FUZZY_SHORTLIST_SIZE)] or list(self._exact)
+        name, _ = fuzzy_search.extract_best(query, shortlist, scoring_algorithm=fuzzy_search.deep_ratio)
+        return self._exact[name]
+
+
+_wide_view_index = _NameIndex()
+for _location in _wide_view_radars:
+    _wide_view_index.add(_location, _location)
+
 
 def get_wide_urls_radar_closest_match(query) -> (str, _URL_T):
-    location, _ = fuzzy_search.extract_best(query, _wide_view_radars.keys(), scoring_algorithm=fuzzy_search.deep_ratio)
+    location = _wide_view_index.lookup(query)
 
     friendly_location = location.replace("_", " ").title()
     return friendly_location, _wide_view_radars[location]
@@ -240,22 +309,33 @@ _RadarCodeT = str
 _RadarSiteT = str
 
 
+def _build_radar_index():
+    index = _NameIndex()
+
+    # Site codes take priority over full locations, which take priority over cities, then states.
+    for code in _radar_map:
+        index.add(code, code)
+
+    for code, location in _radar_map.items():
+        index.add(code, location)
+
+    for code, location in _radar_map.items():
+        cities, _, _ = location.rpartition(",")
+        index.add(code, cities, *re.split(r"[/-]", cities))
+
+    for code, location in _radar_map.items():
+        _, _, state = location.rpartition(",")
+        index.add(code, state)
+
+    return index
+
+
+_radar_index = _build_radar_index()
+
+
 def _best_radar_match(query) -> (_RadarCodeT, _RadarSiteT):
-    upper = query.upper()
-    if upper in _radar_map.keys():
-        return upper, _radar_map[upper]
-    else:
-        radar_code, radar_code_score = fuzzy_search.extract_best(
-            query, choices=_radar_map.keys(), scoring_algorithm=fuzzy_search.deep_ratio
-        )
-        radar_loc, radar_loc_score = fuzzy_search.extract_best(
-            query, _radar_map.values(), scoring_algorithm=fuzzy_search.deep_ratio
-        )
-
-        if radar_loc_score > radar_code_score:
-            return reversed(_radar_map)[radar_loc], radar_loc
-        else:
-            return radar_code, _radar_map[radar_code]
+    code = _radar_index.lookup(query)
+    return code, _radar_map[code]
 
 
 _RIDGE_WEB_PAGE_BASE = "https://radar.weather.gov/radar.php?rid={}"
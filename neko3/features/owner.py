@@ -30,6 +30,7 @@ from neko3 import cog
 from neko3 import converters
 from neko3 import neko_commands
 from neko3 import pagination
+from neko3 import task_registry
 
 
 class OwnerCog(cog.CogBase):
@@ -138,26 +139,51 @@ class OwnerCog(cog.CogBase):
 
     @commands.is_owner()
     @neko_commands.command(name="eventloop", brief="Shows event loop information.", hidden=True)
-    async def event_loop_command(self, ctx):
-        all_tasks = asyncio.Task.all_tasks(loop=ctx.bot.loop)
+    async def event_loop_command(self, ctx, stacks: bool = False):
+        """
+        Summarises the running tasks by owner and coroutine, and lists any
+        that look like they have leaked. Pass `true` to also print the stack
+        of every task, which is slow if there are many.
+        """
+        registry = task_registry.registry
+        summary = registry.summary(ctx.bot.loop)
+        total = sum(group.count for group in summary)
 
         booklet = pagination.StringNavigatorFactory(prefix="```", suffix="```", max_lines=None)
-        summary = []
-
-        for task in all_tasks:
-            with io.StringIO() as fp:
-                task.print_stack(file=fp)
-                booklet.add_line(fp.getvalue())
-                # noinspection PyProtectedMember
-                # Repr, shorten it as it is obscenely long
-                tup = getattr(task, "_repr_info", lambda: ["", "None"])()[1]
-                summary.append(tup)
+        booklet.add_line(f"{total} tasks in the loop, {len(registry)} of them registered.")
+        booklet.add_line("")
+        booklet.add_line("count     p50     p90     max  owner / coroutine")
+
+        for group in summary:
+            ages = " ".join("      ?" if age is None else f"{age:>6.0f}s" for age in (group.p50, group.p90, group.max))
+            booklet.add_line(f"{group.count:>5} {ages}  {group.owner} / {group.coroutine}")
+
+        cog_stats = [(name, c.task_stats) for name, c in sorted(ctx.bot.cogs.items()) if isinstance(c, cog.CogBase)]
+        cog_stats = [(name, stats) for name, stats in cog_stats if stats.tasks or stats.timers]
+        if cog_stats:
+            booklet.add_line("")
+            booklet.add_line("tasks timers    bytes  cog")
+            for name, stats in cog_stats:
+                booklet.add_line(f"{stats.tasks:>5} {stats.timers:>6} {stats.estimated_bytes:>8}  {name}")
+
+        leaks = registry.suspected_leaks()
+        if leaks:
             booklet.add_page_break()
+            booklet.add_line(f"{len(leaks)} tasks may have leaked:")
+            now = time.monotonic()
+            for record in leaks:
+                booklet.add_line(
+                    f"{record.name} ({record.owner}), running for {now - record.started_at:.0f}s, "
+                    f"created at {task_registry.format_site(record.site)}"
+                )
+
+        if stacks:
+            for task, _ in registry.records(ctx.bot.loop):
+                booklet.add_page_break()
+                with io.StringIO() as fp:
+                    task.print_stack(file=fp)
+                    booklet.add_line(fp.getvalue())
 
-        booklet.add_page_break(to_back=False)
-        summary = "\n".join(summary)
-        booklet.add(summary, to_back=False)
-        booklet.add_line(f"{len(all_tasks)} coroutines in the loop.", to_back=False)
         booklet.start(ctx)
 
     @commands.is_owner()
@@ -15,23 +15,228 @@
 
 """
 Gets information on various Python modules.
+
+PyPI searches are answered from a local index of every project name on PyPI.
+This is downloaded from the simple API, persisted to the cache directory, and
+refreshed periodically in the background, so searching does not need to touch
+the network at all.
 """
+import asyncio
+import bisect
 import contextlib
+import gzip
 import io
-import xmlrpc.client as xmlrpcclient
+import json
+import os
+import re
+import time
+import typing
 from urllib import parse
 
+import aiohttp
 from discord.ext import commands
 
 import neko3.cog
 from neko3 import algorithms
+from neko3 import caching
+from neko3 import errors
+from neko3 import files
+from neko3 import fuzzy_search
+from neko3 import logging_utils
 from neko3 import neko_commands
 from neko3 import pagination
 from neko3 import string
 from neko3 import theme
 
+# Raised by PyCog.get_info if PyPI could not answer, rather than the package not existing.
+PYPI_UNREACHABLE_ERRORS = (errors.HttpError, aiohttp.ClientError, asyncio.TimeoutError)
+
+SIMPLE_INDEX_URL = "https://pypi.org/simple/"
+SIMPLE_INDEX_ACCEPT = "application/vnd.pypi.simple.v1+json, text/html;q=0.1"
+INDEX_FILE_NAME = "pypi-simple-index.txt.gz"
+INDEX_REFRESH_INTERVAL = 6 * 60 * 60
+INDEX_RETRY_INTERVAL = 5 * 60
+
+INFO_TTL = 10 * 60
+INFO_CACHE_SIZE = 500
+
+MAX_SEARCH_RESULTS = 50
+FUZZY_MIN_SCORE = 70
+# Fuzzy matching only considers names within this many characters of the length of the query.
+FUZZY_LENGTH_WINDOW = 3
+
+_separators = re.compile(r"[-_.]+")
+_html_anchor = re.compile(r"<a[^>]*>([^<]+)</a>")
+
+
+def normalize(name: str) -> str:
+    """Normalizes a project name in the way PEP 503 describes."""
+    return _separators.sub("-", name).lower()
+
+
+class PyPIIndex(logging_utils.Loggable):
+    """
+    A sorted array of every normalized project name on PyPI. Exact and prefix
+    lookups are binary searches, and fuzzy matching is only performed across the
+    slice of names that share the first character with the query.
+
+    The index is persisted as a gzipped newline-separated file, which keeps the
+    few hundred thousand names down to a couple of megabytes on disk.
+
+    Note. Only ``replace`` mutates the index, and it swaps the list in a single
+    assignment, so readers in other threads will see either the old or the new
+    list but never a partial one.
+
+    :param path: the file to persist the index to.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.names: typing.List[str] = []
+        self.last_refreshed = 0.0
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, name: str) -> bool:
+        names, name = self.names, normalize(name)
+        i = bisect.bisect_left(names, name)
+        return i < len(names) and names[i] == name
+
+    @property
+    def is_stale(self) -> bool:
+        return time.time() - self.last_refreshed > INDEX_REFRESH_INTERVAL
+
+    def load(self) -> bool:
+        """Loads the index from disk. Returns False if there was nothing to load."""
+        try:
+            with gzip.open(self.path, "rt", encoding="utf-8") as fp:
+                names = [name for name in fp.read().split("\n") if name]
+        except FileNotFoundError:
+            return False
+        except (OSError, EOFError):
+            self.logger.exception("PyPI index at %s is corrupt, ignoring it", self.path)
+            return False
+
+        self.names = names
+        self.last_refreshed = os.path.getmtime(self.path)
+        self.logger.info("Loaded %s PyPI project names from %s", len(names), self.path)
+        return True
+
+    def replace(self, names: typing.Iterable[str]) -> None:
+        """Replaces the contents of the index and persists it to disk."""
+        names = sorted({normalize(name) for name in names if name})
+
+        temp_path = self.path + ".tmp"
+        with gzip.open(temp_path, "wt", encoding="utf-8") as fp:
+            fp.write("\n".join(names))
+        os.replace(temp_path, self.path)
+
+        self.names = names
+        self.last_refreshed = time.time()
+
+    @staticmethod
+    def parse_simple_index(content_type: str, body: str) -> typing.List[str]:
+        """Extracts the project names from either the JSON or HTML flavour of the simple API."""
+        if "json" in content_type:
+            return [project["name"] for project in json.loads(body)["projects"]]
+        else:
+            return _html_anchor.findall(body)
+
+    def prefix_search(self, query: str, limit: int) -> typing.List[str]:
+        """Finds up to ``limit`` names that start with the query, in lexicographical order."""
+        names, query = self.names, normalize(query)
+        results = []
+        i = bisect.bisect_left(names, query)
+        while i < len(names) and len(results) < limit and names[i].startswith(query):
+            results.append(names[i])
+            i += 1
+        return results
+
+    def fuzzy_search(self, query: str, limit: int) -> typing.List[str]:
+        """Finds up to ``limit`` names that look similar to the query, best match first."""
+        names, query = self.names, normalize(query)
+        if not query:
+            return []
+
+        lo = bisect.bisect_left(names, query[0])
+        hi = bisect.bisect_left(names, chr(ord(query[0]) + 1))
+        candidates = (name for name in names[lo:hi] if abs(len(name) - len(query)) <= FUZZY_LENGTH_WINDOW)
+        results = fuzzy_search.extract(query, candidates, min_score=FUZZY_MIN_SCORE, max_results=limit)
+        return [name for name, _ in results]
+
+    def search(self, query: str, limit: int) -> typing.List[str]:
+        """
+        Finds up to ``limit`` names for the query. Prefix matches come first,
+        and fuzzy matches are only computed if there are not enough of those.
+        """
+        results = self.prefix_search(query, limit)
+        if len(results) < limit:
+            seen = set(results)
+            results.extend(name for name in self.fuzzy_search(query, limit - len(results)) if name not in seen)
+        return results
+
 
 class PyCog(neko3.cog.CogBase):
+    def __init__(self, bot):
+        super().__init__(bot)
+        self.index = PyPIIndex(files.in_cache_dir(INDEX_FILE_NAME))
+        self.info_cache = caching.TTLCache(INFO_TTL, INFO_CACHE_SIZE)
+        self.index_task = self.create_task(self._maintain_index(), long_lived=True)
+
+    async def _maintain_index(self):
+        await self.run_in_thread_pool(self.index.load)
+
+        while True:
+            if self.index.is_stale:
+                try:
+                    await self._refresh_index()
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    self.logger.exception("Failed to refresh the PyPI index, will retry later")
+
+            next_refresh = self.index.last_refreshed + INDEX_REFRESH_INTERVAL - time.time()
+            await asyncio.sleep(max(next_refresh, INDEX_RETRY_INTERVAL))
+
+    async def _refresh_index(self):
+        self.logger.info("Downloading PyPI index from %s", SIMPLE_INDEX_URL)
+        async with self.acquire_http_session() as http:
+            async with http.get(SIMPLE_INDEX_URL, headers={"Accept": SIMPLE_INDEX_ACCEPT}) as resp:
+                resp.raise_for_status()
+                content_type = resp.headers.get("Content-Type", "")
+                body = await resp.text()
+
+        names = await self.run_in_thread_pool(PyPIIndex.parse_simple_index, [content_type, body])
+        await self.run_in_thread_pool(self.index.replace, [names])
+        self.logger.info("Refreshed PyPI index, it now holds %s projects", len(self.index))
+
+    async def get_info(self, package) -> typing.Optional[dict]:
+        """
+        Gets the JSON info for the given package, or None if it does not exist.
+        Results are cached for a short period of time, including packages
+        that do not exist, but not failures that may be temporary.
+
+        :raises: any of ``PYPI_UNREACHABLE_ERRORS`` if PyPI could not answer.
+        """
+        key = normalize(package)
+        with contextlib.suppress(KeyError):
+            return self.info_cache[key]
+
+        url = f"https://pypi.org/pypi/{parse.quote(package)}/json"
+
+        async with self.acquire_http_session() as http:
+            async with http.get(url=url) as resp:
+                if 200 <= resp.status < 300:
+                    result = await resp.json()
+                elif resp.status == 404:
+                    result = None
+                else:
+                    raise errors.HttpError(resp)
+
+        self.info_cache[key] = result
+        return result
+
     @neko_commands.command(name="py", aliases=["python"], brief="Shows Python documentation.")
     async def py_command(self, ctx, member):
         """Gets some help regarding the given Python member, if it exists..."""
@@ -63,56 +268,57 @@ class PyCog(neko3.cog.CogBase):
         if len(package) < 2:
             return await ctx.send("Please provide at least two characters.", delete_after=10)
 
-        def executor(*_, **__):
-            # https://wiki.python.org/moin/PyPIXmlRpc
-            # This is deprecated. Who cares?
-            client = xmlrpcclient.ServerProxy("https://pypi.python.org/pypi")
-            return client.search({"name": package})
-
-        try:
+        if self.index:
+            results = await self.run_in_thread_pool(self.index.search, [package, MAX_SEARCH_RESULTS])
+        else:
+            # The index has not been downloaded yet, so the best we can do is an exact lookup.
             with ctx.typing():
-                results = await self.run_in_thread_pool(executor)
+                try:
+                    results = [normalize(package)] if await self.get_info(package) else []
+                except PYPI_UNREACHABLE_ERRORS as ex:
+                    return await self.report_unreachable(ctx, package, ex)
+
+        if not results:
+            return await ctx.send("No results were found...", delete_after=10)
 
-            if len(results) == 0:
-                raise IndexError
+        if len(results) == 1 and results[0] == normalize(package):
+            return await self.info_command.callback(self, ctx, package)
 
-            book = pagination.EmbedNavigatorFactory(max_lines=None)
+        book = pagination.EmbedNavigatorFactory(max_lines=None)
 
-            head = f"**__Search results for `{package}`__**\nRun `n.pypi i {{package}}` for full details on a package\n"
-            for i, result in enumerate(results[:50]):
-                if not i % 5:
-                    book.add_page_break()
-                    book.add_line(head)
+        head = f"**__Search results for `{package}`__**\nRun `n.pypi i {{package}}` for full details on a package\n"
+        for i, name in enumerate(results):
+            if not i % 5:
+                book.add_page_break()
+                book.add_line(head)
 
-                name = result["name"]
-                link = f"https://pypi.org/project/{parse.quote(name)}"
-                ver = result["version"]
-                summary = result["summary"]
+            link = f"https://pypi.org/project/{parse.quote(name)}"
+
+            # Only show details we already know about, rather than hitting PyPI for every result.
+            info = self.info_cache.get(name)
+            if info:
+                ver = info["info"]["version"]
+                summary = info["info"].get("summary")
                 summary = summary and f"_{summary}_" or ""
                 NL = "\n"
                 book.add_line(f"**[{name}]({link})\N{EM SPACE}v{ver}**\n{summary}{NL if summary else ''}")
-
-            booklet = book.build(ctx)
-            if len(booklet) > 1:
-                booklet.start()
             else:
-                await self.info_command.callback(self, ctx, package)
-        except IndexError:
-            await ctx.send("No results were found...", delete_after=10)
+                book.add_line(f"**[{name}]({link})**\n")
+
+        book.build(ctx).start()
 
     @pypi_group.command(name="info", brief="Shows info for a specific PyPI package.", aliases=["i", "in"])
     async def info_command(self, ctx, package: commands.clean_content):
         """
         Shows a summary for the given package name on PyPI, if there is one.
         """
-        url = f"https://pypi.org/pypi/{parse.quote(package)}/json"
-
         # Seems like aiohttp is screwed up and will not parse these URLS.
         # Requests is fine though. Guess I have to use that...
         with ctx.typing():
-            async with self.acquire_http_session() as http:
-                async with http.get(url=url) as resp:
-                    result = (await resp.json()) if 200 <= resp.status < 300 else None
+            try:
+                result = await self.get_info(package)
+            except PYPI_UNREACHABLE_ERRORS as ex:
+                return await self.report_unreachable(ctx, package, ex)
 
         if result:
             data = result["info"]
@@ -130,7 +336,6 @@ class PyCog(neko3.cog.CogBase):
             if classifiers:
                 fixed_classifiers = []
                 for classifier in classifiers:
-                    print()
                     if "::" in classifier:
                         _, _, classifier = classifier.rpartition("::")
                     classifier = f"`{classifier.strip()}`"
@@ -162,7 +367,11 @@ class PyCog(neko3.cog.CogBase):
             await ctx.send(embed=embed)
 
         else:
-            await ctx.send(f"PyPI said: {resp.reason}", delete_after=10)
+            await ctx.send(f"PyPI does not have a package called `{package}`.", delete_after=10)
+
+    async def report_unreachable(self, ctx, package, ex):
+        self.logger.warning("Could not look up %s on PyPI: %r", package, ex)
+        await ctx.send("PyPI could not be reached just now, please try again later.", delete_after=10)
 
 
 def setup(bot):
@@ -16,8 +16,6 @@
 """
 Press RespectPaid to pay respects.
 """
-import asyncio
-import contextlib
 import dataclasses
 import typing
 
@@ -26,9 +24,11 @@ from discord.ext import commands
 
 from neko3 import aggregates
 from neko3 import algorithms
+from neko3 import cog
 from neko3 import embeds
 from neko3 import fuzzy_search
 from neko3 import neko_commands
+from neko3 import scheduler
 from neko3 import string
 
 # Last for 2 hours otherwise.
@@ -61,31 +61,29 @@ class RespectPaid:
     colour: int
     ctx: neko_commands.Context
     reason: typing.Optional[str]
+    expiry: typing.Optional[scheduler.TimerHandle] = None
 
     @property
     def channel(self):
         return self.ctx.channel
 
 
-async def destroy_bucket_later(self, bucket):
-    with contextlib.suppress():
-        await asyncio.sleep(F_TIMEOUT)
+async def destroy_bucket(self, bucket):
+    # If still active
+    if self.buckets.get(bucket.channel) is bucket:
+        del self.buckets[bucket.channel]
+        # Get up-to-date message state.
+        msg = await bucket.channel.fetch_message(bucket.message.id)
+        embed = msg.embeds[0]
+        embed.colour = discord.Colour.greyple()
+        embed.set_footer(text="Timed out...")
+        await msg.edit(embed=embed)
+        await msg.clear_reactions()
 
-        # If still active
-        if bucket.message.id == self.buckets[bucket.channel].message.id:
-            # Get up-to-date message state.
-            msg = await bucket.channel.fetch_message(bucket.message.id)
-            embed = msg.embeds[0]
-            embed.colour = discord.Colour.greyple()
-            embed.set_footer(text="Timed out...")
-            await msg.edit(embed=embed)
-            await msg.clear_reactions()
-            del self.buckets[bucket.channel]
 
-
-class RespectsCog(neko_commands.Cog):
+class RespectsCog(cog.CogBase):
     def __init__(self, bot):
-        self.bot = bot
+        super().__init__(bot)
         self.buckets: typing.Dict[discord.TextChannel, RespectPaid] = {}
 
     if ENABLE_NAKED:
@@ -123,6 +121,12 @@ class RespectsCog(neko_commands.Cog):
                 message: discord.Message = reaction.message
                 await message.remove_reaction(reaction, user)
 
+    def discard_bucket(self, channel):
+        """Forgets the bucket for the given channel, if there is one, and cancels its timeout."""
+        bucket = self.buckets.pop(channel, None)
+        if bucket is not None and bucket.expiry is not None:
+            bucket.expiry.cancel()
+
     @staticmethod
     async def append_to_bucket(bucket, user):
         bucket.members.add(user)
@@ -190,8 +194,7 @@ class RespectsCog(neko_commands.Cog):
                     await bucket.message.delete()
                     bucket.message = None
                 except discord.NotFound:
-                    if ctx.channel in self.buckets:
-                        del self.buckets[ctx.channel]
+                    self.discard_bucket(ctx.channel)
                     bucket = None
 
             # If user gave a different reason, restart.
@@ -205,7 +208,7 @@ class RespectsCog(neko_commands.Cog):
                         embed.set_footer(text=f"{ctx.author} changed the subject! For shame!")
                         await bucket.message.edit(embed=embed)
                         await bucket.message.clear_reactions()
-                        del self.buckets[ctx.channel]
+                        self.discard_bucket(ctx.channel)
                     except Exception:
                         pass
                     finally:
@@ -236,10 +239,10 @@ class RespectsCog(neko_commands.Cog):
             await message.add_reaction("\N{REGIONAL INDICATOR SYMBOL LETTER F}")
 
         f_bucket = RespectPaid(aggregates.MutableOrderedSet({ctx.author}), message, colour, ctx, reason)
+        f_bucket.expiry = self.call_later(F_TIMEOUT, destroy_bucket, self, f_bucket)
 
+        self.discard_bucket(ctx.channel)
         self.buckets[ctx.channel] = f_bucket
-        # noinspection PyAsyncCall
-        asyncio.create_task(destroy_bucket_later(self, f_bucket))
 
 
 def setup(bot):
@@ -26,14 +26,13 @@ List is generated by calling
         curl ${image} -o ${file_name}
     done
 """
-import io
 import os
 import random
 
-import aiofiles
-import discord
 from discord.ext import commands
 
+from neko3 import asset_delivery
+from neko3 import asset_optimizer
 from neko3 import errors
 from neko3 import files
 from neko3 import logging_utils
@@ -51,6 +50,7 @@ class TimeCardsCog(neko_commands.Cog, logging_utils.Loggable):
             raise FileNotFoundError("No time_cards are present")
 
         self.logger.info("Found %s time_cards", len(self.images))
+        asset_optimizer.optimize_in_background(self.images)
 
     @commands.cooldown(2, 60, commands.BucketType.user)
     @neko_commands.command(name="timecard", brief="10,000 years later...", aliases=["timecardd"])
@@ -59,14 +59,10 @@ class TimeCardsCog(neko_commands.Cog, logging_utils.Loggable):
         try:
             if ctx.invoked_with == "timecardd":
                 await ctx.message.delete()
-            image_name = random.choice(self.images)
-            async with aiofiles.open(image_name, "rb") as afp, ctx.typing():
-                data = io.BytesIO(await afp.read())
-                data.seek(0)
-
+            image_name = asset_optimizer.resolve(random.choice(self.images))
             embed = theme.generic_embed(ctx)
-            embed.set_image(url="attachment://timecard.png")
-            await ctx.send(file=discord.File(data, "timecard.png"), embed=embed)
+            async with ctx.typing():
+                await asset_delivery.AssetDelivery().send(ctx, image_name, file_name="timecard.png", embed=embed)
         except Exception as ex:
             raise errors.CommandExecutionError(str(ex))
 
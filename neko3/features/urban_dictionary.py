@@ -20,6 +20,7 @@ import re
 import urllib.parse as urlparse
 
 import neko3.cog
+from neko3 import caching
 from neko3 import neko_commands
 from neko3 import pagination
 from neko3 import string
@@ -32,6 +33,24 @@ urban_search = "http://api.urbandictionary.com/v0/define"
 class UrbanDictionaryCog(neko3.cog.CogBase):
     """Urban dictionary cog."""
 
+    def __init__(self, bot):
+        super().__init__(bot)
+        # Each entry is one page of random definitions, as that is what the endpoint gives us.
+        self.random_definitions = caching.PrefetchBuffer(self.fetch_random_definitions, max_size=5, low_water=2)
+        self.random_definitions.start()
+
+    def cog_unload(self):
+        super().cog_unload()
+        self.random_definitions.close()
+
+    async def fetch_random_definitions(self):
+        async with self.acquire_http_session() as session:
+            async with session.get(urban_random) as resp:
+                resp.raise_for_status()
+                definitions = (await resp.json())["list"]
+
+        return [definitions] if definitions else []
+
     link_regex = re.compile(r"\[(?P<phrase>[^\]]+?)\]")
     ud_link = r"[{0}](https://www.urbandictionary.com/define.php?{1})"
     no_brackets = r"\g<phrase>"
@@ -103,20 +122,18 @@ class UrbanDictionaryCog(neko3.cog.CogBase):
     async def urban_dictionary_command(self, ctx: neko_commands.Context, *, phrase: str = None):
         """If no phrase is given, we pick some random ones to show."""
 
-        async with self.acquire_http_session() as session:
-            with ctx.typing():
-                # Get the response
-                if phrase:
-                    params = {"term": phrase}
-                    url = urban_search
-                else:
-                    params = {}
-                    url = urban_random 
-
-                async with session.get(url, params=params) as resp:
-                    resp.raise_for_status()
-                    # Decode the JSON.
-                    resp = (await resp.json())["list"]
+        with ctx.typing():
+            if phrase:
+                async with self.acquire_http_session() as session:
+                    async with session.get(urban_search, params={"term": phrase}) as resp:
+                        resp.raise_for_status()
+                        # Decode the JSON.
+                        resp = (await resp.json())["list"]
+            else:
+                try:
+                    resp = await self.random_definitions.get()
+                except LookupError:
+                    return await ctx.send("Urban Dictionary did not give me anything. Try again later.", delete_after=15)
 
         if len(resp) == 0:
             return await ctx.send("No results. You sure that is a thing?", delete_after=15)
@@ -16,18 +16,26 @@
 """
 IO bits and pieces.
 """
-import inspect  # Stack frame inspection
+import functools  # Memoization
 import os  # OS path utils
+import sys  # Stack frame inspection
 
-__all__ = ("in_here", "json", "yaml", "get_inode_type")
+__all__ = ("in_here", "in_cache_dir", "json", "yaml", "get_inode_type")
+
+CACHE_DIRECTORY = os.getenv("NEKOZILLA_CACHE_DIRECTORY", "./cache")
+
+
+@functools.lru_cache(maxsize=None)
+def _directory_of(file):
+    return os.path.abspath(os.path.dirname(file))
 
 
 def in_here(*paths, nested_by=0):
     """
     Gets the absolute path of the path relative to the file you called this
-    function from. This works by inspecting the current stack and extracting
-    the caller module, then getting the parent directory of the caller as an
-    absolute path.
+    function from. This works by looking at the caller's stack frame and
+    reading the ``__file__`` of the module it belongs to, then getting the
+    parent directory of that as an absolute path.
 
     :param paths: each path fragment to format.
     :param nested_by: how many function calls to consider this call nested in.
@@ -37,24 +45,32 @@ def in_here(*paths, nested_by=0):
             function
             itself.
     """
-    result, frame = None, None
     try:
-        frame = inspect.stack()[1 + nested_by]
-    except IndexError:
+        # Unlike inspect.stack(), this does not read the source code of every frame.
+        frame = sys._getframe(1 + nested_by)
+    except ValueError:
         raise RuntimeError("Could not find a stack record. Interpreter has " "been shot.")
-    else:
-        module = inspect.getmodule(frame[0])
-        assert hasattr(module, "__file__"), "No __file__ attr, whelp."
 
-        file = module.__file__
-
-        dir_name = os.path.dirname(file)
-        abs_dir_name = os.path.abspath(dir_name)
-
-        result = os.path.join(abs_dir_name, *paths)
+    file = frame.f_globals.get("__file__")
 
     # This is to prevent cyclic references that screw the interpreter up.
     del frame
+
+    assert file is not None, "No __file__ attr, whelp."
+
+    return os.path.join(_directory_of(file), *paths)
+
+
+def in_cache_dir(*paths):
+    """
+    Gets the absolute path of the given path inside the cache directory that
+    features can persist downloaded or generated data to between restarts.
+    The parent directory of the result is created if it does not yet exist.
+
+    :param paths: each path fragment to format.
+    """
+    result = os.path.abspath(os.path.join(CACHE_DIRECTORY, *paths))
+    os.makedirs(os.path.dirname(result), exist_ok=True)
     return result
 
 
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Nekozilla is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Nekozilla is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Nekozilla.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Case insensitive index of user names, tags and member nicknames, so looking
+someone up by name does not mean scanning every member the bot can see.
+
+The index is built from the bot's cache the first time ``get_index`` is
+called, and then kept up to date from gateway events.
+"""
+import collections
+import typing
+
+import discord
+
+from neko3 import logging_utils
+
+__all__ = ("Names", "NameIndex", "get_index")
+
+
+class Names:
+    """
+    Maps case-folded names to the IDs of everything with that name, in the
+    order they were added.
+    """
+
+    __slots__ = ("_ids",)
+
+    def __init__(self) -> None:
+        self._ids: typing.Dict[str, typing.Dict[int, None]] = collections.defaultdict(dict)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add(self, name: typing.Optional[str], id: int) -> None:
+        if name:
+            self._ids[name.casefold()][id] = None
+
+    def remove(self, name: typing.Optional[str], id: int) -> None:
+        if name:
+            key = name.casefold()
+            ids = self._ids.get(key)
+            if ids is not None:
+                ids.pop(id, None)
+                if not ids:
+                    del self._ids[key]
+
+    def get(self, name: str) -> typing.List[int]:
+        ids = self._ids.get(name.casefold())
+        return list(ids) if ids else []
+
+
+def _tag(user) -> str:
+    return f"{user.name}#{user.discriminator}"
+
+
+class NameIndex(logging_utils.Loggable):
+    """
+    Indexes every cached user by name and by ``name#discriminator``, and every
+    member by nickname within each guild.
+
+    IDs are only ever hints. If an event was missed, a lookup may give an ID
+    that is no longer cached, so callers should resolve each ID and skip any
+    that do not resolve.
+    """
+
+    def __init__(self) -> None:
+        self.names = Names()
+        self.tags = Names()
+        self.nicks: typing.Dict[int, Names] = collections.defaultdict(Names)
+        self._bot = None
+
+    def add_user(self, user: discord.abc.User) -> None:
+        self.names.add(user.name, user.id)
+        self.tags.add(_tag(user), user.id)
+
+    def remove_user(self, user: discord.abc.User) -> None:
+        self.names.remove(user.name, user.id)
+        self.tags.remove(_tag(user), user.id)
+
+    def add_member(self, member: discord.Member) -> None:
+        self.add_user(member)
+        self.nicks[member.guild.id].add(member.nick, member.id)
+
+    def remove_member(self, member: discord.Member) -> None:
+        names = self.nicks.get(member.guild.id)
+        if names is not None:
+            names.remove(member.nick, member.id)
+
+    def add_guild(self, guild: discord.Guild) -> None:
+        self.nicks.pop(guild.id, None)
+        for member in guild.members:
+            self.add_member(member)
+
+    def remove_guild(self, guild: discord.Guild) -> None:
+        self.nicks.pop(guild.id, None)
+
+    def rebuild(self, bot) -> None:
+        """Discards everything, then indexes everything in the bot's cache again."""
+        self.names, self.tags = Names(), Names()
+        self.nicks.clear()
+        for user in bot.users:
+            self.add_user(user)
+        for guild in bot.guilds:
+            self.add_guild(guild)
+        self.logger.debug("Indexed %s names across %s guilds", len(self.names), len(self.nicks))
+
+    def find_user_ids(self, argument: str) -> typing.List[int]:
+        """
+        Gets the IDs of users with the given ``name#discriminator`` if the
+        argument looks like one, and otherwise those with the given name.
+        """
+        if len(argument) > 5 and argument[-5] == "#":
+            ids = self.tags.get(argument)
+            if ids:
+                return ids
+        return self.names.get(argument)
+
+    def find_nick_ids(self, guild_id: int, argument: str) -> typing.List[int]:
+        """Gets the IDs of members of the guild with the given nickname."""
+        names = self.nicks.get(guild_id)
+        return names.get(argument) if names is not None else []
+
+    def listen(self, bot) -> None:
+        """Keeps this index up to date using the bot's events."""
+        self._bot = bot
+        for name in (
+            "on_ready",
+            "on_guild_join",
+            "on_guild_available",
+            "on_guild_remove",
+            "on_member_join",
+            "on_member_remove",
+            "on_member_update",
+            "on_user_update",
+        ):
+            bot.add_listener(getattr(self, f"_{name}"), name)
+
+    async def _on_ready(self):
+        self.rebuild(self._bot)
+
+    async def _on_guild_join(self, guild):
+        self.add_guild(guild)
+
+    _on_guild_available = _on_guild_join
+
+    async def _on_guild_remove(self, guild):
+        self.remove_guild(guild)
+
+    async def _on_member_join(self, member):
+        self.add_member(member)
+
+    async def _on_member_remove(self, member):
+        self.remove_member(member)
+        if self._bot.get_user(member.id) is None:
+            # They are not in any other guild we can see.
+            self.remove_user(member)
+
+    async def _on_member_update(self, before, after):
+        if before.nick != after.nick:
+            self.remove_member(before)
+            self.add_member(after)
+
+    async def _on_user_update(self, before, after):
+        if before.name != after.name or before.discriminator != after.discriminator:
+            self.remove_user(before)
+            self.add_user(after)
+
+
+def get_index(bot) -> NameIndex:
+    """Gets the name index for the given bot, building it if it does not yet exist."""
+    index = getattr(bot, "name_index", None)
+    if index is None:
+        index = NameIndex()
+        index.rebuild(bot)
+        index.listen(bot)
+        bot.name_index = index
+    return index
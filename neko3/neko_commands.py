@@ -60,6 +60,7 @@ from discord.ext.commands import Context
 
 import neko3.functional
 from neko3 import embeds
+from neko3 import scheduler
 
 Cog = commands.Cog
 
@@ -688,6 +689,13 @@ def acknowledge(ctx: Context, *, emoji: str = "\N{OK HAND SIGN}", timeout: typin
             should not be destroyed. Defaults to 15 seconds.
     """
 
+    async def destroy(messages):
+        for message in messages:
+            try:
+                await message.delete()
+            except Exception:
+                pass
+
     async def fut():
         messages = [ctx.message]
 
@@ -700,12 +708,7 @@ def acknowledge(ctx: Context, *, emoji: str = "\N{OK HAND SIGN}", timeout: typin
                 pass
         finally:
             if timeout is not None:
-                await asyncio.sleep(timeout)
-                for message in messages:
-                    try:
-                        await message.delete()
-                    except Exception:
-                        pass
+                scheduler.get_scheduler(ctx.bot).call_later(timeout, destroy, messages)
 
     ctx.bot.loop.create_task(fut())
 
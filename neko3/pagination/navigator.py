@@ -44,6 +44,7 @@ import async_timeout
 import discord
 from discord.ext import commands
 
+from neko3 import task_registry
 from . import abc
 
 # Stops looped lookups failing.
@@ -306,21 +307,37 @@ class BaseNavigator(abc.PagABC, Generic[PageT]):
             #: Message that triggered this navigator to be created.
             self.invoked_by = ctx.message
 
+            #: Cog whose command created this navigator, if known.
+            self.cog = getattr(ctx, "cog", None)
+
             super().__init__()
 
     def create_task(self, coro):
         """Creates a task and mutes any errors to single lines."""
-        t = self.loop.create_task(coro)
+        t = self._track(self.loop.create_task(coro))
 
-        @t.add_done_callback
-        def on_done(error):
-            try:
-                t.result()
-            except Exception as ex:
-                _logger.exception(f"{coro} task raised {type(ex).__name__} {ex} because of {error}")
+        if not self._cog_tracks_tasks:
+
+            @t.add_done_callback
+            def on_done(error):
+                try:
+                    t.result()
+                except Exception as ex:
+                    _logger.exception(f"{coro} task raised {type(ex).__name__} {ex} because of {error}")
 
         return t
 
+    @property
+    def _cog_tracks_tasks(self) -> bool:
+        # If so, the cog also logs any errors the tasks raise, so we need not.
+        return hasattr(self.cog, "track_task")
+
+    def _track(self, task):
+        # Lets the cog that made this navigator cancel it if the cog is unloaded.
+        if self._cog_tracks_tasks:
+            self.cog.track_task(task)
+        return task
+
     @property
     def loop(self):
         """The main event loop the bot is running."""
@@ -506,7 +523,9 @@ class BaseNavigator(abc.PagABC, Generic[PageT]):
         Returns an ensured task that can be optionally awaited.
         """
         # noinspection PyAttributeOutsideInit
-        self._startup_task = self.loop.create_task(self._run())
+        self._startup_task = self._track(
+            task_registry.registry.create_task(self._run(), loop=self.loop, owner=self.cog or self)
+        )
 
         @self._startup_task.add_done_callback
         def on_done(_):
@@ -519,7 +538,8 @@ class BaseNavigator(abc.PagABC, Generic[PageT]):
                 # Task was cancelled. That is fine. No need to report an error.
                 pass
             except Exception:
-                _logger.exception(f"Exception occurred in {type(self).__name__}.start()", exc_info=True)
+                if not self._cog_tracks_tasks:
+                    _logger.exception(f"Exception occurred in {type(self).__name__}.start()", exc_info=True)
             finally:
                 try:
                     self._startup_task = None
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Nekozilla is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Nekozilla is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Nekozilla.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Registry of static files that ship with the bot, such as images and data
+files. Each file is read once, and then served from memory. Files larger
+than ``MMAP_THRESHOLD`` are memory mapped rather than read, so the OS can
+page them in and out as needed.
+
+Resources are expected to not change while the bot is running.
+"""
+import collections
+import io
+import mmap
+import os
+import threading
+import time
+import typing
+
+from neko3 import files
+from neko3 import logging_utils
+
+__all__ = ("Resource", "ResourceRegistry", "ResourceStats", "registry", "get_from_here")
+
+# Files at least this large, in bytes, are memory mapped rather than read into memory.
+MMAP_THRESHOLD = 256 * 1024
+
+ResourceStats = collections.namedtuple("ResourceStats", "path size is_mapped load_time hits")
+
+
+class Resource:
+    """
+    A single static file.
+
+    :param path: the absolute path of the file.
+    """
+
+    __slots__ = ("path", "data", "is_mapped", "load_time", "hits")
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        start = time.perf_counter()
+
+        with open(path, "rb") as fp:
+            size = os.fstat(fp.fileno()).st_size
+            # Empty files cannot be mapped.
+            self.is_mapped = size >= MMAP_THRESHOLD
+            if self.is_mapped:
+                self.data = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                self.data = fp.read()
+
+        self.load_time = time.perf_counter() - start
+        self.hits = 0
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} path={self.path!r} size={len(self)} is_mapped={self.is_mapped}>"
+
+    def bytes(self) -> bytes:
+        """Gets a copy of the contents."""
+        return self.data[:] if self.is_mapped else self.data
+
+    def text(self, encoding="utf-8") -> str:
+        """Gets the contents decoded as text."""
+        return str(self.data[:] if self.is_mapped else self.data, encoding)
+
+    def open(self) -> io.BytesIO:
+        """Gets a new stream over a copy of the contents, which the caller may close."""
+        return io.BytesIO(self.bytes())
+
+    @property
+    def stats(self) -> ResourceStats:
+        return ResourceStats(self.path, len(self), self.is_mapped, self.load_time, self.hits)
+
+
+class ResourceRegistry(logging_utils.Loggable):
+    """
+    Loads each resource the first time it is asked for, and keeps it for
+    the lifetime of the registry. This is safe to use from multiple threads.
+    """
+
+    def __init__(self) -> None:
+        self._resources: typing.Dict[str, Resource] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._resources)
+
+    def __contains__(self, path) -> bool:
+        return os.path.abspath(path) in self._resources
+
+    def get(self, path) -> Resource:
+        """
+        Gets the resource at the given path, loading it if it is not already
+        loaded.
+
+        :raises FileNotFoundError: if it does not exist.
+        """
+        path = os.path.abspath(path)
+        resource = self._resources.get(path)
+
+        if resource is None:
+            with self._lock:
+                resource = self._resources.get(path)
+                if resource is None:
+                    resource = Resource(path)
+                    self._resources[path] = resource
+                    self.logger.debug(
+                        "Loaded %s (%s bytes, mapped=%s) in %.2fms",
+                        path,
+                        len(resource),
+                        resource.is_mapped,
+                        resource.load_time * 1000,
+                    )
+        else:
+            resource.hits += 1
+
+        return resource
+
+    def stats(self) -> typing.List[ResourceStats]:
+        """Gets the statistics of every loaded resource, most used first."""
+        return sorted((r.stats for r in list(self._resources.values())), key=lambda s: s.hits, reverse=True)
+
+
+registry = ResourceRegistry()
+
+
+def get_from_here(*paths, nested_by=0) -> Resource:
+    """
+    Gets a resource relative to the file you call this from.
+
+    :param paths: each path fragment to format.
+    :param nested_by: how many function calls to consider this call nested
+        in. See ``files.in_here``.
+    """
+    return registry.get(files.in_here(*paths, nested_by=1 + nested_by))
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Nekozilla is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Nekozilla is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Nekozilla.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+A single timer service for callbacks that should run after a delay, such as
+tidying up a message once it has timed out.
+
+Every pending callback sits in one heap, drained by one background task,
+rather than each having its own sleeping coroutine. Scheduling and
+cancelling are both O(log n).
+"""
+import asyncio
+import heapq
+import itertools
+import typing
+
+from neko3 import logging_utils
+from neko3 import task_registry
+
+__all__ = ("TimerHandle", "Scheduler", "get_scheduler")
+
+# Once more than this many cancelled timers are in the heap, and they make up
+# over half of it, the heap is rebuilt without them.
+COMPACT_THRESHOLD = 64
+
+
+class TimerHandle:
+    """
+    A pending callback. Call ``cancel`` to stop it from running.
+
+    Cancelled timers are left in the heap and skipped when they come due,
+    unless enough of them build up to be worth removing early.
+
+    Whoever scheduled the timer may set ``on_cancel`` to a function that is
+    called with the handle if it is cancelled, so it can forget about it.
+    """
+
+    __slots__ = ("when", "_sequence", "callback", "args", "cancelled", "on_cancel", "_scheduler")
+
+    def __init__(self, when: float, sequence: int, callback: typing.Callable, args: tuple, scheduler) -> None:
+        self.when = when
+        self._sequence = sequence
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+        self.on_cancel: typing.Optional[typing.Callable[["TimerHandle"], None]] = None
+        self._scheduler = scheduler
+
+    def __lt__(self, other: "TimerHandle") -> bool:
+        return (self.when, self._sequence) < (other.when, other._sequence)
+
+    def __repr__(self) -> str:
+        state = "cancelled" if self.cancelled else "pending"
+        return f"<{type(self).__name__} {state} when={self.when:.2f} callback={self.callback!r}>"
+
+    def cancel(self) -> None:
+        if not self.cancelled:
+            self.cancelled = True
+            # Drop the references now rather than when the timer comes due.
+            self.callback, self.args = None, ()
+            if self._scheduler is not None:
+                self._scheduler._on_cancel()
+                self._scheduler = None
+            if self.on_cancel is not None:
+                on_cancel, self.on_cancel = self.on_cancel, None
+                on_cancel(self)
+
+
+class Scheduler(logging_utils.Loggable):
+    """
+    Runs callbacks once their delay has passed.
+
+    Callbacks may be plain functions or coroutine functions. Coroutines are
+    wrapped in a task when they come due, and any error they raise is logged.
+
+    :param loop: the event loop to run on.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        self.loop = loop
+        self._heap: typing.List[TimerHandle] = []
+        self._cancelled = 0
+        self._sequence = itertools.count()
+        self._wake_up = asyncio.Event()
+        self._task: typing.Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        """The number of callbacks that are still pending."""
+        return len(self._heap) - self._cancelled
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} pending={len(self)} cancelled={self._cancelled}>"
+
+    def call_later(self, delay: float, callback: typing.Callable, *args) -> TimerHandle:
+        """
+        Runs the callback with the given arguments after the given delay.
+
+        :param delay: the delay in seconds.
+        :param callback: the function or coroutine function to call.
+        :param args: the positional arguments to call it with.
+        :returns: a handle that can be used to cancel the call.
+        """
+        return self.call_at(self.loop.time() + delay, callback, *args)
+
+    def call_at(self, when: float, callback: typing.Callable, *args) -> TimerHandle:
+        """
+        Runs the callback with the given arguments at the given time, as
+        measured by the event loop's clock.
+        """
+        handle = TimerHandle(when, next(self._sequence), callback, args, self)
+        heapq.heappush(self._heap, handle)
+
+        if self._task is None or self._task.done():
+            self._task = task_registry.registry.create_task(self._run(), loop=self.loop, owner=self, long_lived=True)
+        elif self._heap[0] is handle:
+            # This is now the earliest timer, so the runner must wake up sooner.
+            self._wake_up.set()
+
+        return handle
+
+    def close(self) -> None:
+        """Cancels every pending callback and stops the runner."""
+        for handle in self._heap:
+            handle._scheduler = None
+            handle.cancel()
+        self._heap.clear()
+        self._cancelled = 0
+        if self._task is not None:
+            self._task.cancel()
+
+    def _on_cancel(self) -> None:
+        self._cancelled += 1
+        if self._cancelled > COMPACT_THRESHOLD and self._cancelled * 2 > len(self._heap):
+            self._heap = [handle for handle in self._heap if not handle.cancelled]
+            heapq.heapify(self._heap)
+            self._cancelled = 0
+
+    def _fire(self, handle: TimerHandle) -> None:
+        handle._scheduler = None
+        try:
+            result = handle.callback(*handle.args)
+            if asyncio.iscoroutine(result):
+                self.loop.create_task(result).add_done_callback(self._on_task_done)
+        except Exception:
+            self.logger.exception("Timer callback %s raised an error", handle.callback)
+
+    def _on_task_done(self, task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            self.logger.error("Timer callback task %s raised an error", task, exc_info=task.exception())
+
+    async def _run(self) -> None:
+        while self._heap:
+            head = self._heap[0]
+
+            if head.cancelled:
+                heapq.heappop(self._heap)
+                self._cancelled -= 1
+                continue
+
+            delay = head.when - self.loop.time()
+            if delay > 0:
+                self._wake_up.clear()
+                try:
+                    await asyncio.wait_for(self._wake_up.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                # Something earlier may have been added, or the head cancelled, so look again.
+                continue
+
+            heapq.heappop(self._heap)
+            self._fire(head)
+
+
+def get_scheduler(bot) -> Scheduler:
+    """Gets the scheduler for the given bot, creating it if it does not yet exist."""
+    scheduler = getattr(bot, "scheduler", None)
+    if scheduler is None:
+        scheduler = Scheduler(bot.loop)
+        bot.scheduler = scheduler
+    return scheduler
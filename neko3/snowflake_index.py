@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Nekozilla is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Nekozilla is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Nekozilla.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Index of what each snowflake the bot can see refers to.
+
+Guilds, channels, categories, roles and emojis are indexed here. Users and
+members are not, since discord.py already keeps those in dicts keyed by ID,
+so ``bot.get_user`` and ``guild.get_member`` are already constant time.
+
+The index is built from the bot's cache the first time ``get_index`` is
+called, and then kept up to date from gateway events.
+"""
+import collections
+import enum
+import typing
+
+import discord
+
+from neko3 import logging_utils
+
+__all__ = ("EntityKind", "Entity", "SnowflakeIndex", "get_index")
+
+
+class EntityKind(enum.Enum):
+    GUILD = "guild"
+    CATEGORY = "category"
+    TEXT_CHANNEL = "text channel"
+    VOICE_CHANNEL = "voice channel"
+    CHANNEL = "channel"
+    ROLE = "role"
+    EMOJI = "emoji"
+
+
+#: What a snowflake refers to, and the ID of the guild it is in.
+Entity = collections.namedtuple("Entity", "kind guild_id")
+
+
+def _channel_kind(channel) -> EntityKind:
+    if isinstance(channel, discord.CategoryChannel):
+        return EntityKind.CATEGORY
+    elif isinstance(channel, discord.TextChannel):
+        return EntityKind.TEXT_CHANNEL
+    elif isinstance(channel, discord.VoiceChannel):
+        return EntityKind.VOICE_CHANNEL
+    else:
+        return EntityKind.CHANNEL
+
+
+class SnowflakeIndex(logging_utils.Loggable):
+    """Maps the ID of every guild, channel, role and emoji we can see to an ``Entity``."""
+
+    def __init__(self) -> None:
+        self.entities: typing.Dict[int, Entity] = {}
+        self._bot = None
+
+    def __len__(self) -> int:
+        return len(self.entities)
+
+    def get(self, snowflake: int) -> typing.Optional[Entity]:
+        return self.entities.get(snowflake)
+
+    def add_channel(self, channel) -> None:
+        self.entities[channel.id] = Entity(_channel_kind(channel), channel.guild.id)
+
+    def add_role(self, role) -> None:
+        if role.id == role.guild.id:
+            # The @everyone role shares its ID with the guild, which takes precedence.
+            return
+        self.entities[role.id] = Entity(EntityKind.ROLE, role.guild.id)
+
+    def add_emoji(self, emoji) -> None:
+        self.entities[emoji.id] = Entity(EntityKind.EMOJI, emoji.guild_id)
+
+    def remove(self, obj) -> None:
+        self.entities.pop(obj.id, None)
+
+    def add_guild(self, guild) -> None:
+        self.entities[guild.id] = Entity(EntityKind.GUILD, guild.id)
+        for channel in guild.channels:
+            self.add_channel(channel)
+        for role in guild.roles:
+            self.add_role(role)
+        for emoji in guild.emojis:
+            self.add_emoji(emoji)
+
+    def remove_guild(self, guild) -> None:
+        for snowflake in [s for s, entity in self.entities.items() if entity.guild_id == guild.id]:
+            del self.entities[snowflake]
+
+    def rebuild(self, bot) -> None:
+        """Discards everything, then indexes everything in the bot's cache again."""
+        self.entities = {}
+        for guild in bot.guilds:
+            self.add_guild(guild)
+        self.logger.debug("Indexed %s snowflakes", len(self.entities))
+
+    def listen(self, bot) -> None:
+        """Keeps this index up to date using the bot's events."""
+        self._bot = bot
+        for name in (
+            "on_ready",
+            "on_guild_join",
+            "on_guild_available",
+            "on_guild_remove",
+            "on_guild_channel_create",
+            "on_guild_channel_delete",
+            "on_guild_role_create",
+            "on_guild_role_delete",
+            "on_guild_emojis_update",
+        ):
+            bot.add_listener(getattr(self, f"_{name}"), name)
+
+    async def _on_ready(self):
+        self.rebuild(self._bot)
+
+    async def _on_guild_join(self, guild):
+        self.add_guild(guild)
+
+    _on_guild_available = _on_guild_join
+
+    async def _on_guild_remove(self, guild):
+        self.remove_guild(guild)
+
+    async def _on_guild_channel_create(self, channel):
+        self.add_channel(channel)
+
+    async def _on_guild_channel_delete(self, channel):
+        self.remove(channel)
+
+    async def _on_guild_role_create(self, role):
+        self.add_role(role)
+
+    async def _on_guild_role_delete(self, role):
+        self.remove(role)
+
+    async def _on_guild_emojis_update(self, _guild, before, after):
+        for emoji in before:
+            self.remove(emoji)
+        for emoji in after:
+            self.add_emoji(emoji)
+
+
+def get_index(bot) -> SnowflakeIndex:
+    """Gets the snowflake index for the given bot, building it if it does not yet exist."""
+    index = getattr(bot, "snowflake_index", None)
+    if index is None:
+        index = SnowflakeIndex()
+        index.rebuild(bot)
+        index.listen(bot)
+        bot.snowflake_index = index
+    return index
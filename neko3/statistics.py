@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Nekozilla is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Nekozilla is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Nekozilla.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Member, bot and status counts for each guild and for the whole bot, kept up
+to date from gateway events rather than counted on demand.
+
+The counters are built from the bot's cache the first time ``get_aggregator``
+is called. Each event after that costs constant time.
+"""
+import collections
+import typing
+
+from neko3 import logging_utils
+
+__all__ = ("GuildStats", "BotStats", "StatisticsAggregator", "get_aggregator")
+
+#: Counts for a single guild. ``statuses`` maps status names to member counts.
+GuildStats = collections.namedtuple("GuildStats", "members bots humans statuses")
+
+#: Counts across every guild. ``users`` counts each user once, however many
+#: guilds they share with us, whereas ``members`` counts them once per guild.
+BotStats = collections.namedtuple("BotStats", "guilds users members bots humans statuses")
+
+
+class _Counters:
+    __slots__ = ("members", "bots", "statuses", "member_ids")
+
+    def __init__(self) -> None:
+        self.members = 0
+        self.bots = 0
+        self.statuses = collections.Counter()
+        # Only kept for guilds, so that the guild can be uncounted exactly.
+        self.member_ids: typing.Set[int] = set()
+
+    def add(self, member, sign=1) -> None:
+        self.members += sign
+        self.bots += sign if member.bot else 0
+        self.statuses[str(member.status)] += sign
+
+    def snapshot(self) -> GuildStats:
+        statuses = {status: count for status, count in self.statuses.items() if count > 0}
+        return GuildStats(self.members, self.bots, self.members - self.bots, statuses)
+
+
+class StatisticsAggregator(logging_utils.Loggable):
+    """Keeps counters for every guild, and totals across all of them."""
+
+    def __init__(self) -> None:
+        self.guilds: typing.Dict[int, _Counters] = {}
+        self.totals = _Counters()
+        # Maps user IDs to the number of guilds we share with them.
+        self.user_guild_counts: typing.Counter[int] = collections.Counter()
+        self._bot = None
+
+    def guild(self, guild_id: int) -> GuildStats:
+        """Gets a snapshot of the counts for the given guild."""
+        counters = self.guilds.get(guild_id)
+        return counters.snapshot() if counters is not None else GuildStats(0, 0, 0, {})
+
+    def snapshot(self) -> BotStats:
+        """Gets a snapshot of the counts across every guild."""
+        totals = self.totals.snapshot()
+        return BotStats(len(self.guilds), len(self.user_guild_counts), *totals)
+
+    def add_member(self, member, sign=1) -> None:
+        counters = self.guilds.get(member.guild.id)
+        if counters is None or (member.id in counters.member_ids) == (sign > 0):
+            # Unknown guild, or a member we have already counted or uncounted.
+            return
+
+        if sign > 0:
+            counters.member_ids.add(member.id)
+        else:
+            counters.member_ids.discard(member.id)
+
+        counters.add(member, sign)
+        self.totals.add(member, sign)
+
+        self.user_guild_counts[member.id] += sign
+        if self.user_guild_counts[member.id] <= 0:
+            del self.user_guild_counts[member.id]
+
+    def remove_member(self, member) -> None:
+        self.add_member(member, -1)
+
+    def add_guild(self, guild) -> None:
+        self.remove_guild(guild)
+        self.guilds[guild.id] = _Counters()
+        for member in guild.members:
+            self.add_member(member)
+
+    def remove_guild(self, guild) -> None:
+        # Undo what we counted, since the guild's member cache may have changed since.
+        counters = self.guilds.pop(guild.id, None)
+        if counters is None:
+            return
+
+        self.totals.members -= counters.members
+        self.totals.bots -= counters.bots
+        self.totals.statuses.subtract(counters.statuses)
+
+        for member_id in counters.member_ids:
+            self.user_guild_counts[member_id] -= 1
+            if self.user_guild_counts[member_id] <= 0:
+                del self.user_guild_counts[member_id]
+
+    def rebuild(self, bot) -> None:
+        """Discards everything, then counts everything in the bot's cache again."""
+        self.guilds = {}
+        self.totals = _Counters()
+        self.user_guild_counts = collections.Counter()
+        for guild in bot.guilds:
+            self.add_guild(guild)
+        self.logger.debug("Counted %s users across %s guilds", len(self.user_guild_counts), len(self.guilds))
+
+    def listen(self, bot) -> None:
+        """Keeps the counters up to date using the bot's events."""
+        self._bot = bot
+        for name in (
+            "on_ready",
+            "on_guild_join",
+            "on_guild_available",
+            "on_guild_remove",
+            "on_member_join",
+            "on_member_remove",
+            "on_member_update",
+            # discord.py 1.x reports status changes as member updates, and later versions as presence updates.
+            "on_presence_update",
+        ):
+            bot.add_listener(getattr(self, f"_{name}"), name)
+
+    async def _on_ready(self):
+        self.rebuild(self._bot)
+
+    async def _on_guild_join(self, guild):
+        self.add_guild(guild)
+
+    _on_guild_available = _on_guild_join
+
+    async def _on_guild_remove(self, guild):
+        self.remove_guild(guild)
+
+    async def _on_member_join(self, member):
+        self.add_member(member)
+
+    async def _on_member_remove(self, member):
+        self.remove_member(member)
+
+    async def _on_member_update(self, before, after):
+        if before.status != after.status:
+            counters = self.guilds.get(after.guild.id)
+            if counters is not None:
+                for c in (counters, self.totals):
+                    c.statuses[str(before.status)] -= 1
+                    c.statuses[str(after.status)] += 1
+
+    _on_presence_update = _on_member_update
+
+
+def get_aggregator(bot) -> StatisticsAggregator:
+    """Gets the statistics aggregator for the given bot, building it if it does not yet exist."""
+    aggregator = getattr(bot, "statistics", None)
+    if aggregator is None:
+        aggregator = StatisticsAggregator()
+        aggregator.rebuild(bot)
+        aggregator.listen(bot)
+        bot.statistics = aggregator
+    return aggregator
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Nekozilla is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Nekozilla is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Nekozilla.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+Registry of the tasks the bot spawns, recording what each one is, who
+owns it, where it was created and when.
+
+Registering a task costs a dict insertion and one frame lookup, and nothing
+here walks task stacks, so building the summary stays cheap however many
+tasks are running.
+"""
+import asyncio
+import collections
+import math
+import os
+import sys
+import time
+import typing
+
+from neko3 import logging_utils
+
+__all__ = ("TaskRecord", "TaskGroupStats", "TaskRegistry", "format_site", "registry")
+
+# Tasks not marked as long lived are flagged as possible leaks once they are this old, in seconds.
+LEAK_AGE = 60 * 60
+
+# Used for tasks that were created without going through the registry.
+UNREGISTERED = "<unregistered>"
+UNOWNED = "<unowned>"
+
+#: What we know about a registered task. ``site`` is a ``(filename, line)`` tuple.
+TaskRecord = collections.namedtuple("TaskRecord", "name owner coroutine site started_at long_lived")
+
+#: Aggregated ages, in seconds, of the running tasks for one owner and coroutine.
+#: The ages are None for tasks that were not registered, since we do not know them.
+TaskGroupStats = collections.namedtuple("TaskGroupStats", "owner coroutine count p50 p90 max")
+
+
+def _percentile(sorted_values: typing.Sequence[float], percent: float) -> float:
+    # Nearest rank.
+    index = max(0, min(len(sorted_values) - 1, math.ceil(percent / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def _coroutine_name(coro) -> str:
+    return getattr(coro, "__qualname__", None) or type(coro).__name__
+
+
+def _owner_name(owner) -> str:
+    # Only keep the name so that records do not keep cogs alive after they are unloaded.
+    if owner is None:
+        return UNOWNED
+    return owner if isinstance(owner, str) else type(owner).__name__
+
+
+def format_site(site) -> str:
+    filename, line = site
+    try:
+        filename = os.path.relpath(filename)
+    except ValueError:
+        pass
+    return f"{filename}:{line}"
+
+
+class TaskRegistry(logging_utils.Loggable):
+    """
+    Keeps a record of each registered task until it finishes.
+    """
+
+    def __init__(self) -> None:
+        self._records: typing.Dict[asyncio.Task, TaskRecord] = {}
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __contains__(self, task) -> bool:
+        return task in self._records
+
+    def get(self, task: asyncio.Task) -> typing.Optional[TaskRecord]:
+        return self._records.get(task)
+
+    def create_task(
+        self,
+        coro: typing.Coroutine,
+        *,
+        loop: typing.Optional[asyncio.AbstractEventLoop] = None,
+        name: typing.Optional[str] = None,
+        owner=None,
+        long_lived: bool = False,
+        nested_by: int = 0,
+    ) -> asyncio.Task:
+        """
+        Creates a task and registers it.
+
+        :param coro: the coroutine to run.
+        :param loop: the event loop to run it on, or None to use the current one.
+        :param name: a name for the task. Defaults to the coroutine's name.
+        :param owner: the cog or other object responsible for the task, or
+            its name.
+        :param long_lived: true if the task is expected to run for as long as
+            its owner, so it should never be reported as a possible leak.
+        :param nested_by: how many function calls to consider this call
+            nested in when working out where the task was created.
+        """
+        task = (loop or asyncio.get_event_loop()).create_task(coro)
+        self.register(task, name=name, owner=owner, long_lived=long_lived, nested_by=1 + nested_by)
+        return task
+
+    def register(self, task: asyncio.Task, *, name=None, owner=None, long_lived=False, nested_by=0) -> asyncio.Task:
+        """
+        Registers an existing task. This takes the same arguments as
+        ``create_task``.
+        """
+        frame = sys._getframe(1 + nested_by)
+        coroutine = _coroutine_name(task.get_coro())
+        self._records[task] = TaskRecord(
+            name or coroutine,
+            _owner_name(owner),
+            coroutine,
+            (frame.f_code.co_filename, frame.f_lineno),
+            time.monotonic(),
+            long_lived,
+        )
+        task.add_done_callback(self._discard)
+        return task
+
+    def _discard(self, task: asyncio.Task) -> None:
+        self._records.pop(task, None)
+
+    def records(self, loop=None) -> typing.List[typing.Tuple[asyncio.Task, typing.Optional[TaskRecord]]]:
+        """
+        Gets every unfinished task on the loop, along with its record, or
+        None if it was not registered.
+        """
+        return [(task, self._records.get(task)) for task in asyncio.all_tasks(loop or asyncio.get_event_loop())]
+
+    def summary(self, loop=None) -> typing.List[TaskGroupStats]:
+        """
+        Groups the unfinished tasks on the loop by owner and coroutine, with
+        the number of tasks and their age percentiles in each group, largest
+        groups first. Tasks created without the registry are counted in
+        groups of their own, but their age is not known, so it is None.
+        """
+        now = time.monotonic()
+        ages = collections.defaultdict(list)
+        unregistered = collections.Counter()
+
+        for task, record in self.records(loop):
+            if record is None:
+                unregistered[_coroutine_name(task.get_coro())] += 1
+            else:
+                ages[record.owner, record.coroutine].append(now - record.started_at)
+
+        stats = []
+        for (owner, coroutine), group in ages.items():
+            group.sort()
+            stats.append(
+                TaskGroupStats(owner, coroutine, len(group), _percentile(group, 50), _percentile(group, 90), group[-1])
+            )
+        for coroutine, count in unregistered.items():
+            stats.append(TaskGroupStats(UNREGISTERED, coroutine, count, None, None, None))
+
+        stats.sort(key=lambda s: (-s.count, s.owner, s.coroutine))
+        return stats
+
+    def suspected_leaks(self, min_age: float = LEAK_AGE) -> typing.List[TaskRecord]:
+        """
+        Gets the records of tasks that are not marked as long lived, but have
+        been running for at least ``min_age`` seconds, oldest first.
+        """
+        cutoff = time.monotonic() - min_age
+        leaks = [r for r in self._records.values() if not r.long_lived and r.started_at <= cutoff]
+        leaks.sort(key=lambda r: r.started_at)
+        return leaks
+
+
+registry = TaskRegistry()